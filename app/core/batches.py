@@ -0,0 +1,288 @@
+"""
+Batch transcript processing state: per-video status and progress events.
+
+A batch's status is stored as a small summary (status and counters) plus
+pages of ``BATCH_PAGE_SIZE`` compact per-video records, so a change to one
+video rewrites one page, and neither processing nor a status poll holds
+the whole of a large batch. Uploaded batches (NDJSON or CSV, see
+``read_upload``) are written page by page as the body arrives.
+
+Every change to a batch (a video starting, finishing or failing, the batch
+itself starting or ending) is published as a small delta with a per-batch
+sequence number, instead of clients re-reading the whole batch status. The
+deltas are also kept in the shared state for ``BATCH_EVENTS_TTL_SECONDS``
+so a client that reconnects can resume after the last sequence number it
+saw. A client that starts fresh, or whose deltas have expired, gets a
+snapshot of the batch summary first.
+
+Writers save the batch status before publishing the delta for a change,
+and readers read the sequence number before the snapshot, so a snapshot
+always includes every delta up to the sequence number it is sent with.
+Deltas carry absolute values, so replaying one that a snapshot already
+includes is harmless.
+"""
+
+import asyncio
+import csv
+from enum import Enum
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+import orjson
+
+from app.core.state import SharedState
+from app.schemas.transcripts import ProcessingStatus
+
+# Status lives in the shared state so any worker can answer a poll
+BATCH_TTL_SECONDS = 7 * 24 * 3600
+BATCH_PAGE_SIZE = 500
+BATCH_EVENTS_TTL_SECONDS = 3600
+EVENTS_POLL_SECONDS = 2.0
+MAX_UPLOAD_LINE_BYTES = 64 * 1024
+
+WATCH_URL = "https://www.youtube.com/watch?v={}"
+# A video is stored as a list of these, the URL left out when it is the
+# usual watch URL
+ITEM_FIELDS = ("video_id", "title", "url", "status", "category", "error_message")
+
+
+def pack_item(item: dict) -> list:
+    row = [item.get(field) for field in ITEM_FIELDS]
+    if row[2] == WATCH_URL.format(row[0]):
+        row[2] = None
+    return row
+
+
+def unpack_item(row: list) -> dict:
+    item = dict(zip(ITEM_FIELDS, row))
+    item["url"] = item["url"] or WATCH_URL.format(item["video_id"])
+    return item
+
+
+class BatchStore:
+    def __init__(self, state: SharedState, ttl: float = BATCH_TTL_SECONDS):
+        self.state = state
+        self.ttl = ttl
+
+    @staticmethod
+    def _summary_key(batch_id: str) -> str:
+        return f"batch:{batch_id}"
+
+    @staticmethod
+    def _page_key(batch_id: str, page: int) -> str:
+        return f"batch_items:{batch_id}:{page}"
+
+    async def get_summary(self, batch_id: str) -> Optional[dict]:
+        return await self.state.get(self._summary_key(batch_id))
+
+    async def save_summary(self, summary: dict):
+        await self.state.set(
+            self._summary_key(summary["batch_id"]), summary, ttl=self.ttl
+        )
+
+    async def get_page(self, batch_id: str, page: int) -> List[dict]:
+        rows = await self.state.get(self._page_key(batch_id, page)) or []
+        return [unpack_item(row) for row in rows]
+
+    async def save_page(self, batch_id: str, page: int, items: List[dict]):
+        await self.state.set(
+            self._page_key(batch_id, page),
+            [pack_item(item) for item in items],
+            ttl=self.ttl,
+        )
+
+    async def items(self, batch_id: str, offset: int, limit: int) -> List[dict]:
+        """Videos ``offset`` to ``offset + limit - 1`` of the batch"""
+        found: List[dict] = []
+        page = offset // BATCH_PAGE_SIZE
+        start = offset % BATCH_PAGE_SIZE
+        while len(found) < limit:
+            items = await self.get_page(batch_id, page)
+            found.extend(items[start : start + limit - len(found)])
+            if len(items) < BATCH_PAGE_SIZE:
+                break
+            page, start = page + 1, 0
+        return found
+
+    def writer(self, batch_id: str) -> "BatchWriter":
+        return BatchWriter(self, batch_id)
+
+
+class BatchWriter:
+    """Writes a new batch's videos a page at a time as they arrive"""
+
+    def __init__(self, store: BatchStore, batch_id: str):
+        self.store = store
+        self.batch_id = batch_id
+        self.count = 0
+        self._page: List[dict] = []
+
+    async def append(self, item: dict):
+        self._page.append(item)
+        self.count += 1
+        if len(self._page) == BATCH_PAGE_SIZE:
+            await self._flush()
+
+    async def close(self):
+        if self._page:
+            await self._flush()
+
+    async def discard(self):
+        """Delete the pages written so far, e.g. when the upload is invalid"""
+        pages = -(-self.count // BATCH_PAGE_SIZE)
+        await asyncio.gather(
+            *[
+                self.store.state.delete(self.store._page_key(self.batch_id, page))
+                for page in range(pages)
+            ]
+        )
+
+    async def _flush(self):
+        page = (self.count - 1) // BATCH_PAGE_SIZE
+        await self.store.save_page(self.batch_id, page, self._page)
+        self._page = []
+
+
+class UploadFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+        if len(buffer) > MAX_UPLOAD_LINE_BYTES:
+            raise ValueError("Upload has a line longer than 64 KB")
+    if buffer:
+        yield buffer
+
+
+async def read_upload(
+    chunks: AsyncIterator[bytes], fmt: UploadFormat
+) -> AsyncIterator[Tuple[int, dict]]:
+    """Yield ``(line number, row)`` for each record of an uploaded batch.
+
+    NDJSON has one JSON object per line; CSV has a header row naming the
+    columns and no line breaks inside values. Raises ValueError on the
+    first malformed line.
+    """
+    header = None
+    number = 0
+    async for raw in _lines(chunks):
+        number += 1
+        try:
+            line = raw.decode("utf-8").lstrip("\ufeff").strip()
+        except UnicodeDecodeError as e:
+            raise ValueError(f"Line {number} is not UTF-8") from e
+        if not line:
+            continue
+
+        if fmt == UploadFormat.NDJSON:
+            try:
+                row = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                raise ValueError(f"Line {number} is not valid JSON: {e}") from e
+            if not isinstance(row, dict):
+                raise ValueError(f"Line {number} is not a JSON object")
+        else:
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [value.strip() for value in values]
+                continue
+            if len(values) != len(header):
+                raise ValueError(
+                    f"Line {number} has {len(values)} columns, expected {len(header)}"
+                )
+            row = dict(zip(header, values))
+        yield number, row
+
+
+class BatchProgress:
+    def __init__(self, state: SharedState, ttl: float = BATCH_EVENTS_TTL_SECONDS):
+        self.state = state
+        self.ttl = ttl
+
+    @staticmethod
+    def _seq_key(batch_id: str) -> str:
+        return f"batch_seq:{batch_id}"
+
+    @staticmethod
+    def _delta_key(batch_id: str, seq: int) -> str:
+        return f"batch_delta:{batch_id}:{seq}"
+
+    @staticmethod
+    def _channel(batch_id: str) -> str:
+        return f"batch_events:{batch_id}"
+
+    async def current_seq(self, batch_id: str) -> int:
+        return int(await self.state.get(self._seq_key(batch_id)) or 0)
+
+    async def publish(self, batch_id: str, delta: dict) -> int:
+        """Record ``delta`` as the batch's next change, return its sequence"""
+        seq = await self.state.incr(self._seq_key(batch_id), ttl=self.ttl)
+        delta = {**delta, "seq": seq}
+        await self.state.set(self._delta_key(batch_id, seq), delta, ttl=self.ttl)
+        await self.state.publish(self._channel(batch_id), delta)
+        return seq
+
+    async def events(
+        self,
+        batch_id: str,
+        after: Optional[int],
+        snapshot: Callable[[], Awaitable[Optional[dict]]],
+    ) -> AsyncIterator[dict]:
+        """Yield the batch's changes after sequence ``after`` until it ends.
+
+        Without ``after``, or if deltas after it have expired, a snapshot
+        event holding ``await snapshot()`` comes first.
+        """
+        subscription = self.state.subscribe(self._channel(batch_id))
+        next_update = asyncio.ensure_future(subscription.__anext__())
+        try:
+            last = after
+            while True:
+                if last is None:
+                    seq = await self.current_seq(batch_id)
+                    batch = await snapshot()
+                    if batch is None:
+                        return
+                    yield {"type": "snapshot", "seq": seq, "batch": batch}
+                    if _finished(batch["status"]):
+                        return
+                    last = seq
+
+                # Catch up from the stored deltas, e.g. after a reconnect
+                current = await self.current_seq(batch_id)
+                while last is not None and last < current:
+                    delta = await self.state.get(self._delta_key(batch_id, last + 1))
+                    if delta is None:
+                        last = None  # expired, resync from a snapshot
+                        break
+                    yield delta
+                    last = delta["seq"]
+                    if _finished(delta["batch_status"]):
+                        return
+                if last is None:
+                    continue
+
+                done, _ = await asyncio.wait({next_update}, timeout=EVENTS_POLL_SECONDS)
+                if not done:
+                    continue  # re-read, in case a delta was missed
+                delta = next_update.result()
+                next_update = asyncio.ensure_future(subscription.__anext__())
+                if delta["seq"] == last + 1:
+                    yield delta
+                    last = delta["seq"]
+                    if _finished(delta["batch_status"]):
+                        return
+        finally:
+            next_update.cancel()
+            await asyncio.gather(next_update, return_exceptions=True)
+            await subscription.aclose()
+
+
+def _finished(status: str) -> bool:
+    return status == ProcessingStatus.COMPLETED.value
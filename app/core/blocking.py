@@ -0,0 +1,87 @@
+"""
+Dedicated thread pools for blocking client libraries.
+
+``asyncio.to_thread`` runs everything on the event loop's default executor,
+shared by Firestore, the SQLite state and file I/O, so a burst of slow
+upstream calls could hold every thread while the others wait, and vice
+versa. A ``BlockingPool`` has its own bounded executor and limits the
+concurrent calls to each upstream host with a semaphore, so one slow host
+cannot occupy all of its threads either.
+
+A call cancelled while waiting for a slot (e.g. by its deadline) leaves
+the queue at once. One cancelled while running returns at once too, but
+the thread finishes the call in the background, and the call keeps its
+slot and counts as running until it does, so the limits hold while
+callers time out; the clients' own socket timeouts bound how long that
+takes.
+"""
+
+import asyncio
+import contextvars
+import functools
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+def _call_soon(loop: asyncio.AbstractEventLoop, callback: Callable[[], None]):
+    try:
+        loop.call_soon_threadsafe(callback)
+    except RuntimeError:
+        pass  # the loop is closed, nothing left to release
+
+
+class BlockingPool:
+    def __init__(self, name: str, host_limits: Dict[str, int]):
+        self.name = name
+        self.host_limits = host_limits
+        self.executor = ThreadPoolExecutor(
+            max_workers=sum(host_limits.values()), thread_name_prefix=name
+        )
+        self._semaphores = {
+            host: asyncio.Semaphore(limit) for host, limit in host_limits.items()
+        }
+        self._running: Counter = Counter()
+        self._waiting: Counter = Counter()
+
+    async def run(self, host: str, fn: Callable[..., T], *args) -> T:
+        """Run ``fn(*args)`` on the pool, within ``host``'s concurrency limit"""
+        semaphore = self._semaphores[host]
+        self._waiting[host] += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self._waiting[host] -= 1
+
+        loop = asyncio.get_running_loop()
+        self._running[host] += 1
+
+        def done():
+            self._running[host] -= 1
+            semaphore.release()
+
+        try:
+            # Like asyncio.to_thread, keep the caller's context (deadlines)
+            call = functools.partial(contextvars.copy_context().run, fn, *args)
+            future = self.executor.submit(call)
+        except BaseException:
+            done()
+            raise
+        # Released when the thread is done, not when the caller gives up
+        future.add_done_callback(lambda _: _call_soon(loop, done))
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        return {
+            host: {
+                "limit": limit,
+                "running": self._running[host],
+                "waiting": self._waiting[host],
+            }
+            for host, limit in self.host_limits.items()
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
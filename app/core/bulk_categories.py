@@ -0,0 +1,263 @@
+"""
+Deleting, renaming and merging whole categories, run as admin jobs.
+
+The source collection is drained a batch at a time: each batch deletes (or
+moves to the target's collection) up to ``batch_size`` transcripts, their
+copies in the global ``transcripts`` collection and the counter updates
+they imply, in one Firestore transaction sized to stay under its 500-write
+limit. The transaction re-reads the batch, so transcripts saved or deleted
+meanwhile are counted exactly. A transcript whose video already has a copy
+in the target category is dropped when merging; the target's copy is kept.
+
+Once the source collection is empty, its registry entry and counter shards
+are deleted in a transaction that checks it is still empty. An interrupted
+job leaves every batch it committed consistent; running it again picks up
+what is left.
+
+The sampling pools, the duplicate index and the ETag validators of this
+process are updated as batches commit; other workers catch up when their
+copies expire.
+"""
+
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from app.core import dedupe
+from app.core.counters import COUNTERS, CategoryCounters
+from app.core.firebase import Database
+from app.core.sampling import get_sampling_pools
+from app.core.validators import (
+    CATEGORIES_RESOURCE,
+    category_resource,
+    get_validator_cache,
+    transcript_resource,
+)
+from app.schemas.transcripts import CategoryCreate
+from app.utils.categories import category_collection, sanitize_category
+
+# Two deletes per transcript plus the counter update
+DELETE_BATCH_SIZE = 200
+# Two deletes and two writes per transcript plus counters and registry
+MOVE_BATCH_SIZE = 100
+
+Progress = Optional[Callable[[dict], Awaitable[None]]]
+
+
+def _doc_id(video_id: str, category: str) -> str:
+    return f"{video_id}_{sanitize_category(category)}_transcript"
+
+
+async def _next_batch(db: Database, collection: str, batch_size: int) -> List[str]:
+    rows = await db.select_fields(collection, ["video_id"], limit=batch_size)
+    return [row["doc_id"] for row in rows]
+
+
+async def delete_category(
+    db: Database,
+    counters: CategoryCounters,
+    category: str,
+    batch_size: int = DELETE_BATCH_SIZE,
+    progress: Progress = None,
+) -> dict:
+    summary = {"category": category, "deleted": 0}
+    while True:
+        doc_ids = await _next_batch(db, category_collection(category), batch_size)
+        if not doc_ids:
+            if await _drop_if_empty(db, counters, category):
+                break
+            continue
+
+        removed = await _delete_batch(db, counters, category, doc_ids)
+        await _forget(category, None, removed, [])
+        summary["deleted"] += len(removed)
+        if progress is not None:
+            await progress(dict(summary))
+
+    get_sampling_pools().drop(category)
+    return summary
+
+
+async def _delete_batch(
+    db: Database, counters: CategoryCounters, category: str, doc_ids: List[str]
+) -> List[Tuple[str, str]]:
+    """Delete the transcripts still there, return their doc and video IDs"""
+    collection = db.db.collection(category_collection(category))
+    refs = [collection.document(doc_id) for doc_id in doc_ids]
+
+    def write(transaction) -> List[Tuple[str, str]]:
+        snapshots = [
+            snapshot
+            for snapshot in db.db.get_all(
+                refs, field_paths=["video_id", "token_count"], transaction=transaction
+            )
+            if snapshot.exists
+        ]
+        tokens = 0
+        for snapshot in snapshots:
+            transaction.delete(snapshot.reference)
+            transaction.delete(db.db.collection("transcripts").document(snapshot.id))
+            tokens += snapshot.to_dict().get("token_count") or 0
+        if snapshots:
+            counters.increment(transaction, category, -len(snapshots), -tokens)
+        return [(s.id, s.to_dict().get("video_id", "")) for s in snapshots]
+
+    return await db.run_transaction(write)
+
+
+async def move_category(
+    db: Database,
+    counters: CategoryCounters,
+    category: str,
+    target: str,
+    batch_size: int = MOVE_BATCH_SIZE,
+    progress: Progress = None,
+) -> dict:
+    """Move every transcript of ``category`` into ``target``; a rename if
+    ``target`` is new, a merge if it exists"""
+    if sanitize_category(category) == sanitize_category(target):
+        raise ValueError(f"{category} and {target} are the same category")
+
+    summary = {"category": category, "target": target, "moved": 0, "dropped": 0}
+    while True:
+        doc_ids = await _next_batch(db, category_collection(category), batch_size)
+        if not doc_ids:
+            if await _drop_if_empty(db, counters, category):
+                break
+            continue
+
+        removed, moved = await _move_batch(db, counters, category, target, doc_ids)
+        await _forget(category, target, removed, moved)
+        summary["moved"] += len(moved)
+        summary["dropped"] += len(removed) - len(moved)
+        if progress is not None:
+            await progress(dict(summary))
+
+    pools = get_sampling_pools()
+    pools.drop(category)
+    # Moved transcripts keep their created_at, which an incremental
+    # refresh of the target's pool would not pick up
+    pools.drop(target)
+    return summary
+
+
+async def _move_batch(
+    db: Database,
+    counters: CategoryCounters,
+    category: str,
+    target: str,
+    doc_ids: List[str],
+) -> Tuple[List[Tuple[str, str]], List[Tuple[str, Optional[str]]]]:
+    """Move the transcripts still there. Returns the doc and video IDs of
+    the removed ones and the new doc IDs and signatures of those moved."""
+    source = db.db.collection(category_collection(category))
+    target_collection = category_collection(target)
+    refs = [source.document(doc_id) for doc_id in doc_ids]
+
+    def write(transaction):
+        snapshots = [
+            snapshot
+            for snapshot in db.db.get_all(refs, transaction=transaction)
+            if snapshot.exists
+        ]
+        docs = {snapshot.id: snapshot.to_dict() for snapshot in snapshots}
+        target_refs = {
+            doc_id: db.db.collection(target_collection).document(
+                _doc_id(doc["video_id"], target)
+            )
+            for doc_id, doc in docs.items()
+        }
+        existing = {
+            snapshot.id
+            for snapshot in db.db.get_all(
+                list(target_refs.values()),
+                field_paths=["video_id"],
+                transaction=transaction,
+            )
+            if snapshot.exists
+        }
+
+        removed, moved = [], []
+        tokens_out = tokens_in = 0
+        for snapshot in snapshots:
+            doc = docs[snapshot.id]
+            tokens = doc.get("token_count") or 0
+            transaction.delete(snapshot.reference)
+            transaction.delete(db.db.collection("transcripts").document(snapshot.id))
+            removed.append((snapshot.id, doc["video_id"]))
+            tokens_out += tokens
+
+            new_ref = target_refs[snapshot.id]
+            if new_ref.id in existing:
+                continue  # merging, the target's copy of the video wins
+            data = {
+                **doc,
+                "category": target,
+                "sanitized_category": sanitize_category(target),
+            }
+            transaction.set(new_ref, data)
+            transaction.set(
+                db.db.collection("transcripts").document(new_ref.id),
+                {**data, "collection_ref": target_collection},
+            )
+            moved.append((new_ref.id, doc.get("minhash")))
+            tokens_in += tokens
+
+        if removed:
+            counters.increment(transaction, category, -len(removed), -tokens_out)
+        if moved:
+            transaction.set(
+                db.db.collection("categories").document(sanitize_category(target)),
+                CategoryCreate(name=target).model_dump(by_alias=True),
+            )
+            counters.increment(transaction, target, len(moved), tokens_in)
+        return removed, moved
+
+    return await db.run_transaction(write)
+
+
+async def _drop_if_empty(
+    db: Database, counters: CategoryCounters, category: str
+) -> bool:
+    """Delete the category's registry entry and counters if it has no
+    transcripts left, False if some were saved since the last batch"""
+    sanitized = sanitize_category(category)
+    remaining = db.db.collection(category_collection(category)).limit(1)
+
+    def drop(transaction) -> bool:
+        if list(transaction.get(remaining)):
+            return False
+        transaction.delete(db.db.collection("categories").document(sanitized))
+        for shard in counters.shard_refs(category):
+            transaction.delete(shard)
+        transaction.delete(db.db.collection(COUNTERS).document(sanitized))
+        return True
+
+    dropped = await db.run_transaction(drop)
+    if dropped:
+        await get_validator_cache().invalidate(
+            category_resource(category), CATEGORIES_RESOURCE
+        )
+    return dropped
+
+
+async def _forget(
+    category: str,
+    target: Optional[str],
+    removed: List[Tuple[str, str]],
+    moved: List[Tuple[str, Optional[str]]],
+):
+    """Bring this process's caches in line with a committed batch"""
+    pools = get_sampling_pools()
+    index = dedupe.get_duplicate_detector().index
+    for doc_id, _ in removed:
+        pools.discard(category, doc_id)
+        index.discard(doc_id)
+    for doc_id, minhash in moved:
+        signature = dedupe.decode(minhash)
+        if signature is not None:
+            index.add(doc_id, signature)
+
+    resources = [transcript_resource(video_id, category) for _, video_id in removed]
+    resources += [category_resource(category), CATEGORIES_RESOURCE]
+    if target is not None:
+        resources.append(category_resource(target))
+    await get_validator_cache().invalidate(*resources)
@@ -1,19 +1,43 @@
+import asyncio
+import json
+import logging
 import re
+from contextlib import asynccontextmanager
 from functools import lru_cache
 from typing import List, Optional
 
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 from app.core.config import get_settings
+from app.core.resilience import call_upstream, remaining_time
+from app.core.scheduler import Priority, RateLimitScheduler, estimate_tokens
+from app.core.singleflight import get_single_flight, make_key
 from app.utils.errors import CustomHTTPException
 
-settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+# Shorter than a single categorization's 3,000 characters, so a full group
+# stays well within the model's context
+CATEGORIZE_EXCERPT_CHARS = 1500
 
 
 class ChatGPTClient:
     def __init__(self):
-        self.client = OpenAI(api_key=settings.openai_api_key)
+        self.settings = get_settings()
+        # Retries are handled by app.core.resilience, not the SDK
+        self.client = AsyncOpenAI(
+            api_key=self.settings.openai_api_key, max_retries=0
+        )
         self.default_model = "gpt-3.5-turbo"
+        self.scheduler = RateLimitScheduler(
+            requests_per_minute=self.settings.openai_requests_per_minute,
+            tokens_per_minute=self.settings.openai_tokens_per_minute,
+        )
+
+    async def warmup(self):
+        """Open the HTTP connection pool to the API ahead of the first call"""
+        await self.client.models.retrieve(self.default_model)
 
     async def generate_response(
         self,
@@ -21,16 +45,82 @@ class ChatGPTClient:
         model: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 1000,
+        priority: Priority = Priority.INTERACTIVE,
+        response_format: Optional[dict] = None,
+        n: int = 1,
     ):
-        try:
-            response = self.client.chat.completions.create(
+        """A completion; with ``n`` above 1, ``choices`` holds ``n``
+        independent ones, each with its own ``max_tokens``"""
+        # Identical concurrent requests (same messages and parameters) share
+        # one completion
+        key = make_key(
+            model or self.default_model,
+            messages,
+            temperature,
+            max_tokens,
+            response_format,
+            n,
+        )
+        return await get_single_flight("openai_completions").do(
+            key,
+            lambda: self._generate_response(
+                messages, model, temperature, max_tokens, priority, response_format, n
+            ),
+        )
+
+    async def _generate_response(
+        self,
+        messages: List[dict],
+        model: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        priority: Priority,
+        response_format: Optional[dict] = None,
+        n: int = 1,
+    ):
+        estimated_tokens = estimate_tokens(messages, max_tokens * n)
+        extra = {"response_format": response_format} if response_format else {}
+        if n > 1:
+            extra["n"] = n
+
+        # Every attempt, retries included, queues for its own scheduler
+        # slot at ``priority`` and is charged against the RPM/TPM buckets
+        attempt_usage: dict = {}
+
+        @asynccontextmanager
+        async def admit():
+            async with self.scheduler.slot(
+                estimated_tokens, priority, timeout=remaining_time()
+            ) as usage:
+                attempt_usage.clear()
+                yield
+                usage.update(attempt_usage)
+
+        async def create():
+            response = await self.client.chat.completions.create(
                 model=model or self.default_model,
                 messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens,
+                **extra,
             )
+            attempt_usage["total_tokens"] = response.usage.total_tokens
+            return response
+
+        try:
+            response = await call_upstream(
+                "openai",
+                create,
+                timeout=self.settings.openai_timeout_seconds,
+                retries=3,
+                base_delay=1.0,
+                max_delay=20.0,
+                admit=admit,
+            )
+
             return {
                 "content": response.choices[0].message.content,
+                "choices": [choice.message.content for choice in response.choices],
                 "total_tokens": response.usage.total_tokens,
             }
         except Exception as e:
@@ -43,10 +133,15 @@ class ChatGPTClient:
         model: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 1000,
+        priority: Priority = Priority.INTERACTIVE,
     ):
         messages = [{"role": "user", "content": prompt}]
         return await self.generate_response(
-            messages, model=model, temperature=temperature, max_tokens=max_tokens
+            messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            priority=priority,
         )
 
     async def generate_category(
@@ -61,45 +156,111 @@ class ChatGPTClient:
         Respond ONLY with the category name, nothing else.
         Text: {text[:3000]}"""
 
+        # Transport failures are retried with backoff inside generate_response;
+        # this loop only re-asks when the answer is not a usable category.
         for _ in range(max_retries):
             try:
-                response = await self.generate_completion(category_prompt)
-                raw_category = response["content"].strip()
-
-                clean_category = (
-                    re.sub(r"[^a-zA-Z0-9\s]", "", raw_category).strip().title()
+                response = await self.generate_completion(
+                    category_prompt, priority=Priority.BATCH
                 )
-                if len(clean_category) < 3 or len(clean_category) > 35:
-                    continue
-
-                return clean_category
-
             except Exception:
+                break
+
+            clean_category = _clean_category(response["content"])
+            if clean_category is None:
                 continue
 
+            return clean_category
+
         return "Uncategorized"
 
+    async def generate_categories(
+        self, texts: List[str], existing_categories: List[str] = []
+    ) -> List[str]:
+        """Categorize many texts with one completion per
+        ``categorize_batch_size`` of them, in JSON mode.
+
+        Texts whose answer is missing or unusable, or all of a group if the
+        response does not parse, fall back to ``generate_category``.
+        """
+        size = self.settings.categorize_batch_size
+        groups = [texts[start : start + size] for start in range(0, len(texts), size)]
+        results = await asyncio.gather(
+            *[self._categorize_group(group, existing_categories) for group in groups]
+        )
+        return [category for group in results for category in group]
+
+    async def _categorize_group(
+        self, texts: List[str], existing_categories: List[str]
+    ) -> List[str]:
+        if len(texts) == 1:
+            return [await self.generate_category(texts[0], existing_categories)]
+
+        excerpts = "\n\n".join(
+            f"[{n}] {text[:CATEGORIZE_EXCERPT_CHARS]}"
+            for n, text in enumerate(texts, start=1)
+        )
+        prompt = f"""Suggest the most appropriate category for each numbered text.
+        {
+            f"Choose from existing categories: {', '.join(existing_categories)}"
+            if existing_categories
+            else "Create new concise category names (1 or 2 words)"
+        }
+        Respond ONLY with a JSON object mapping each text number to its category,
+        like {{"categories": {{"1": "Science", "2": "Travel"}}}}.
+
+        {excerpts}"""
+
+        answers = {}
+        try:
+            response = await self.generate_completion(
+                prompt,
+                max_tokens=20 * len(texts) + 50,
+                priority=Priority.BATCH,
+                response_format={"type": "json_object"},
+            )
+            answers = json.loads(response["content"]).get("categories") or {}
+        except Exception as e:
+            logger.warning(f"Batched categorization failed, asking one by one: {e}")
+
+        categories: List[Optional[str]] = []
+        for n in range(1, len(texts) + 1):
+            answer = answers.get(str(n)) if isinstance(answers, dict) else None
+            categories.append(
+                _clean_category(answer) if isinstance(answer, str) else None
+            )
+
+        missing = [n for n, category in enumerate(categories) if category is None]
+        fallback = await asyncio.gather(
+            *[self.generate_category(texts[n], existing_categories) for n in missing]
+        )
+        for n, category in zip(missing, fallback):
+            categories[n] = category
+        return categories
+
     async def generate_story_variations(
         self,
         prompt: str,
         variations: int = 3,
         style: str = "professional",
         length: int = 200,
-    ):
-        system_message = f"""You are a professional writer creating {variations} story variations.
+    ) -> List[str]:
+        """``variations`` independent stories from one request with as many
+        choices, so the prompt is sent once and each story gets its own
+        output budget"""
+        system_message = f"""You are a professional writer creating a story.
         Style: {style}
-        Each variation should be distinct but based on the same source material and should have a word size of {length} or less. Each Variation should start with the word Variation."""
+        The story should be based on the source material and should have a word size of {length} or less."""
 
         response = await self.generate_response(
             messages=[
                 {"role": "user", "content": system_message + prompt},
             ],
-            temperature=0.9,  # Higher creativity
-            max_tokens=2000,
+            temperature=0.9,  # Higher creativity, so the choices differ
+            max_tokens=_story_max_tokens(length),
+            n=variations,
         )
-
-        # Parse response into variations
-        return self._parse_variations(response["content"])
+        return _stories(response)
 
     async def regenerate_from_synopsis(
         self, prompt: str, variations: int, style: str, length: int
@@ -107,27 +268,26 @@ class ChatGPTClient:
         """Generate story variations from a synopsis"""
         try:
             system_prompt = f"""
-            You are a creative story writer. Generate {variations} different story variations based on the provided synopsis.
+            You are a creative story writer. Write a story based on the provided synopsis.
             
             Style: {style}
-            Target length: {length} words per story
+            Target length: {length} words
             
-            Each variation should be unique but follow the same general plot structure.
-            Make each story engaging and well-written.
+            Follow the general plot structure of the synopsis.
+            Make the story engaging and well-written.
             """
 
-            response = await self.client.chat.completions.create(
+            response = await self.generate_response(
                 model="gpt-4",
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": prompt},
                 ],
-                max_tokens=length * 2,
+                max_tokens=_story_max_tokens(length),
                 temperature=0.8,
+                n=variations,
             )
-
-            content = response.choices[0].message.content
-            return self._parse_story_variations(content, variations)
+            return _stories(response)
 
         except Exception as e:
             raise CustomHTTPException(
@@ -137,10 +297,99 @@ class ChatGPTClient:
                 details=str(e),
             )
 
-    def _parse_variations(self, content: str):
-        # Implement parsing logic based on your ChatGPT response format
-        # Example: Split by "Variation X:" markers
-        return [v.strip() for v in content.split("Variation") if v.strip()]
+    async def regenerate_variations(
+        self,
+        synopsis: str,
+        kept_openings: List[str],
+        style: str,
+        length: int,
+        count: int = 1,
+    ) -> List[str]:
+        """``count`` new variations of the synopsis, as choices of one
+        completion. Only the openings of the kept variations are sent,
+        enough to make the new ones differ from them."""
+        kept = ""
+        if kept_openings:
+            openings = "\n".join(f"- {opening}" for opening in kept_openings)
+            kept = (
+                "Other versions of this story begin like this, "
+                f"make yours clearly different:\n{openings}"
+            )
+        system_prompt = f"""
+            You are a creative story writer. Write one story based on the provided synopsis.
+
+            Style: {style}
+            Target length: {length} words
+            {kept}
+
+            Respond ONLY with the story.
+            """
+
+        response = await self.generate_response(
+            model="gpt-4",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": synopsis},
+            ],
+            max_tokens=_story_max_tokens(length),
+            temperature=0.8,
+            n=count,
+        )
+        stories = _stories(response)
+        if len(stories) < count:
+            raise RuntimeError(f"Got {len(stories)} of {count} regenerated stories")
+        return stories[:count]
+
+    async def rewrite_paragraphs(
+        self,
+        synopsis: str,
+        before: str,
+        paragraphs: List[str],
+        after: str,
+        style: str,
+    ) -> str:
+        """A rewrite of ``paragraphs`` that still follows on from ``before``
+        (the end of the text preceding them) and leads into ``after``"""
+        words = sum(len(paragraph.split()) for paragraph in paragraphs)
+        system_prompt = f"""
+            You are a creative story writer revising part of a story.
+            Rewrite the passage between the PASSAGE markers, keeping its plot, about {words} words and {len(paragraphs)} paragraphs.
+            It must still follow on from the text before it and lead into the text after it.
+
+            Style: {style}
+            Story synopsis: {synopsis}
+
+            Respond ONLY with the rewritten passage, paragraphs separated by blank lines.
+            """
+        passage = "\n\n".join(paragraphs)
+        user_prompt = (
+            f"{before}\n\n<<<PASSAGE>>>\n{passage}\n<<<END PASSAGE>>>\n\n{after}"
+        )
+
+        response = await self.generate_response(
+            model="gpt-4",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt.strip()},
+            ],
+            max_tokens=words * 2 + 50,
+            temperature=0.8,
+        )
+        return response["content"].strip()
+
+
+def _story_max_tokens(length: int) -> int:
+    # About 1.3 tokens per English word, with room to finish the story
+    return length * 2
+
+
+def _stories(response: dict) -> List[str]:
+    return [story.strip() for story in response["choices"] if story and story.strip()]
+
+
+def _clean_category(raw: str) -> Optional[str]:
+    category = re.sub(r"[^a-zA-Z0-9\s]", "", raw.strip()).strip().title()
+    return category if 3 <= len(category) <= 35 else None
 
 
 @lru_cache()
@@ -1,14 +1,92 @@
 from functools import lru_cache
+from typing import Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
+# Never returned by /settings; redis URLs may carry a password
+SECRET_SETTINGS = frozenset(
+    {"openai_api_key", "youtube_api_key", "admin_token", "shared_state_url"}
+)
+
 
 class Settings(BaseSettings):
     firebase_config_file: str = Field(alias="firebase_config_file")
     openai_api_key: str = Field(alias="openai_api_key")
     youtube_api_key: str = Field(alias="youtube_api_key")
 
+    # Shared by batch categorization and interactive generation
+    openai_requests_per_minute: int = 3500
+    openai_tokens_per_minute: int = 90000
+
+    # Upstream deadlines and circuit breakers, see app.core.resilience
+    request_budget_seconds: float = 120.0
+    batch_item_budget_seconds: float = 180.0
+    # Videos categorized together in one completion by batch processing
+    categorize_batch_size: int = 10
+    # Largest batch accepted by /transcripts/batch-upload
+    batch_max_videos: int = 100000
+    openai_timeout_seconds: float = 90.0
+    youtube_timeout_seconds: float = 20.0
+    # Concurrent blocking calls per YouTube host, see app.core.blocking
+    youtube_transcript_concurrency: int = 8
+    youtube_api_concurrency: int = 8
+    firestore_timeout_seconds: float = 15.0
+    prisma_timeout_seconds: float = 10.0
+    circuit_failure_threshold: int = 5
+    circuit_reset_seconds: float = 30.0
+
+    # Client warmup in the FastAPI lifespan, see app.core.warmup
+    warmup_on_startup: bool = True
+    warmup_timeout_seconds: float = 20.0
+
+    # YouTube Data API units per day (resets at midnight Pacific time)
+    youtube_daily_quota: int = 10000
+    # Channel listings younger than this are served without any API call
+    channel_cache_ttl_seconds: float = 900.0
+
+    # Per-category sampling pools for generation, see app.core.sampling
+    sampling_pool_ttl_seconds: float = 60.0
+    sampling_pool_rebuild_seconds: float = 3600.0
+    sampling_body_cache_size: int = 200
+    sampling_pool_max_size: int = 5000
+
+    # Near-duplicate transcripts at ingest, see app.core.dedupe.
+    # duplicate_policy is "flag" (save and mark), "skip" (don't save) or "off"
+    duplicate_policy: str = "flag"
+    duplicate_threshold: float = 0.85
+    duplicate_index_ttl_seconds: float = 60.0
+    duplicate_index_rebuild_seconds: float = 3600.0
+
+    # Lifetime of cached ETags for conditional GETs, see app.core.validators
+    etag_ttl_seconds: float = 300.0
+
+    # Write shards per category counter, see app.core.counters
+    category_counter_shards: int = 10
+
+    # Generation job queue, see app.core.jobs
+    job_workers: int = 4
+    job_queue_size: int = 100
+    job_max_per_user: int = 3
+    job_budget_seconds: float = 600.0
+    job_ttl_seconds: float = 24 * 3600
+
+    # Admin endpoints are disabled unless a token is set (X-Admin-Token header)
+    admin_token: Optional[str] = None
+    admin_job_workers: int = 1
+    # Corpus exports are written to and imported from subdirectories of this
+    corpus_dir: str = "corpus"
+
+    # Request profiling, see app.middleware.profiling. Requests are also
+    # profiled on demand with X-Profile: 1 and the admin token
+    profile_sample_rate: float = 0.0
+    profile_interval_seconds: float = 0.005
+    profile_dir: str = "profiles"
+    profile_max_captures: int = 200
+
+    # Cross-worker caches and job state: sqlite:///path, redis://... or memory://
+    shared_state_url: str = "sqlite:///.state/shared_state.db"
+
 
 @lru_cache
 def get_settings():
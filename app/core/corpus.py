@@ -0,0 +1,400 @@
+"""
+Streaming export and import of the transcript corpus.
+
+Export walks every ``transcripts_{category}`` collection with cursor
+pagination, holding one page in memory at a time, and writes NDJSON or
+Parquet chunk files of at most ``chunk_rows`` transcripts each:
+
+    {out_dir}/{collection}/part-00000.ndjson
+
+A chunk is written under a ``.partial`` name and renamed once complete, and
+the cursor after it is saved to ``checkpoint.json``, so an interrupted
+export resumes after the last complete chunk. The global ``transcripts``
+collection only mirrors the per-category ones and is rebuilt on import.
+
+Import reads the chunk files back in bounded batches and writes each batch
+in one Firestore transaction together with the category registry and
+counter updates, so counts stay exact when some transcripts already exist.
+Writes are idempotent; an interrupted import resumes with the first file
+not recorded in ``import_checkpoint.json``. Imported transcripts keep their
+``created_at``, which the incremental refreshes of the sampling pools and
+the duplicate index would not pick up, so after each batch this process
+drops the pools of its categories and indexes its signatures, as bulk
+category moves do; other workers catch up on their next rebuild.
+
+Parquet needs pyarrow (pip install pyarrow).
+"""
+
+import asyncio
+import json
+import os
+import random
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional
+
+import orjson
+
+from app.core import dedupe
+from app.core.counters import CategoryCounters
+from app.core.firebase import Database
+from app.core.sampling import get_sampling_pools
+from app.core.validators import (
+    CATEGORIES_RESOURCE,
+    category_resource,
+    get_validator_cache,
+    transcript_resource,
+)
+from app.models.transcript import Transcript
+from app.schemas.transcripts import CategoryCreate
+from app.utils.categories import category_collection, sanitize_category
+
+FORMATS = ("ndjson", "parquet")
+EXPORT_CHECKPOINT = "checkpoint.json"
+IMPORT_CHECKPOINT = "import_checkpoint.json"
+# Two writes per transcript (category and global collection) plus registry
+# and counter writes must fit in one 500-write commit
+IMPORT_BATCH_SIZE = 200
+
+Progress = Optional[Callable[[dict], Awaitable[None]]]
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError(
+            "Parquet export needs the pyarrow package (pip install pyarrow)"
+        ) from e
+    return pyarrow, pyarrow.parquet
+
+
+def _parquet_schema(pa):
+    return pa.schema(
+        [
+            ("doc_id", pa.string()),
+            ("_id", pa.string()),
+            ("video_id", pa.string()),
+            ("title", pa.string()),
+            ("transcript", pa.string()),
+            ("category", pa.string()),
+            ("sanitized_category", pa.string()),
+            ("metadata", pa.string()),  # JSON, its keys vary between videos
+            ("token_count", pa.int64()),
+            ("created_at", pa.string()),
+            ("random_key", pa.float64()),
+            ("minhash", pa.string()),
+            ("duplicate_of", pa.string()),
+            ("duplicate_similarity", pa.float64()),
+        ]
+    )
+
+
+def _parquet_row(doc: dict) -> dict:
+    row = dict(doc)
+    row["metadata"] = json.dumps(doc.get("metadata") or {}, default=str)
+    if isinstance(doc.get("created_at"), datetime):
+        row["created_at"] = doc["created_at"].isoformat()
+    return row
+
+
+class _NDJSONWriter:
+    suffix = ".ndjson"
+
+    def __init__(self, path: Path):
+        self.file = open(path, "wb")
+
+    def write(self, rows: List[dict]):
+        for row in rows:
+            self.file.write(
+                orjson.dumps(row, default=str, option=orjson.OPT_APPEND_NEWLINE)
+            )
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetWriter:
+    suffix = ".parquet"
+
+    def __init__(self, path: Path):
+        self.pa, pq = _pyarrow()
+        self.schema = _parquet_schema(self.pa)
+        self.writer = pq.ParquetWriter(str(path), self.schema, compression="zstd")
+
+    def write(self, rows: List[dict]):
+        # One row group per page
+        table = self.pa.Table.from_pylist(
+            [_parquet_row(row) for row in rows], schema=self.schema
+        )
+        self.writer.write_table(table)
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {"ndjson": _NDJSONWriter, "parquet": _ParquetWriter}
+
+
+def _read_ndjson(path: Path, batch_size: int) -> Iterator[List[dict]]:
+    batch = []
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                batch.append(orjson.loads(line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def _read_parquet(path: Path, batch_size: int) -> Iterator[List[dict]]:
+    _, pq = _pyarrow()
+    for record_batch in pq.ParquetFile(str(path)).iter_batches(batch_size=batch_size):
+        rows = record_batch.to_pylist()
+        for row in rows:
+            row["metadata"] = json.loads(row["metadata"] or "{}")
+        yield rows
+
+
+READERS = {".ndjson": _read_ndjson, ".parquet": _read_parquet}
+
+
+def _load_checkpoint(path: Path) -> Optional[dict]:
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def _save_checkpoint(path: Path, checkpoint: dict):
+    # Replace atomically, a torn checkpoint would lose the whole export
+    partial = path.with_name(path.name + ".partial")
+    partial.write_text(json.dumps(checkpoint, indent=2))
+    os.replace(partial, path)
+
+
+async def _export_chunk(
+    db: Database,
+    collection: str,
+    directory: Path,
+    fmt: str,
+    position: dict,
+    chunk_rows: int,
+    page_size: int,
+) -> int:
+    """Write the next chunk of ``collection``, return its number of rows"""
+    writer_cls = WRITERS[fmt]
+    final = directory / f"part-{position['chunks']:05d}{writer_cls.suffix}"
+    partial = final.with_name(final.name + ".partial")
+
+    writer = writer_cls(partial)
+    after_id, rows = position["after_id"], 0
+    try:
+        while rows < chunk_rows:
+            limit = min(page_size, chunk_rows - rows)
+            page = await db.read_page(collection, limit, after_id)
+            if page:
+                await asyncio.to_thread(writer.write, page)
+                rows += len(page)
+                after_id = page[-1]["doc_id"]
+            if len(page) < limit:
+                break
+    finally:
+        writer.close()
+
+    if not rows:
+        partial.unlink()
+        return 0
+
+    os.replace(partial, final)
+    position["chunks"] += 1
+    position["rows"] += rows
+    position["after_id"] = after_id
+    return rows
+
+
+async def export_corpus(
+    db: Database,
+    out_dir: str,
+    fmt: str = "ndjson",
+    categories: Optional[List[str]] = None,
+    chunk_rows: int = 10000,
+    page_size: int = 500,
+    progress: Progress = None,
+) -> dict:
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format {fmt}, use one of {FORMATS}")
+
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    checkpoint_path = out / EXPORT_CHECKPOINT
+    checkpoint = _load_checkpoint(checkpoint_path) or {
+        "format": fmt,
+        "collections": {},
+    }
+    if checkpoint["format"] != fmt:
+        raise ValueError(
+            f"{out} holds a {checkpoint['format']} export, resume it in that format"
+        )
+
+    if categories:
+        collections = [category_collection(category) for category in categories]
+    else:
+        collections = await db.collection_ids("transcripts_")
+
+    for collection in collections:
+        position = checkpoint["collections"].setdefault(
+            collection, {"chunks": 0, "rows": 0, "after_id": None, "done": False}
+        )
+        directory = out / collection
+        directory.mkdir(exist_ok=True)
+
+        while not position["done"]:
+            rows = await _export_chunk(
+                db, collection, directory, fmt, position, chunk_rows, page_size
+            )
+            position["done"] = rows < chunk_rows
+            _save_checkpoint(checkpoint_path, checkpoint)
+
+            if progress is not None:
+                await progress(_export_summary(out, checkpoint, collection))
+
+    return _export_summary(out, checkpoint)
+
+
+def _export_summary(out: Path, checkpoint: dict, current: Optional[str] = None):
+    positions = checkpoint["collections"].values()
+    summary = {
+        "out_dir": str(out),
+        "format": checkpoint["format"],
+        "collections": len(positions),
+        "collections_done": sum(p["done"] for p in positions),
+        "files": sum(p["chunks"] for p in positions),
+        "rows": sum(p["rows"] for p in positions),
+    }
+    if current is not None:
+        summary["current_collection"] = current
+    return summary
+
+
+async def _import_batch(
+    db: Database, counters: CategoryCounters, rows: List[dict]
+) -> int:
+    """Write one batch of exported rows, return how many were new"""
+    transcripts = {row["doc_id"]: Transcript(**row) for row in rows}
+    for transcript in transcripts.values():
+        if transcript.random_key is None:
+            # Exported before it had one
+            transcript.random_key = random.random()
+    refs = {
+        doc_id: db.db.collection(category_collection(t.category)).document(doc_id)
+        for doc_id, t in transcripts.items()
+    }
+
+    def write(transaction) -> int:
+        existing = {
+            snapshot.id: snapshot.to_dict()
+            for snapshot in db.db.get_all(list(refs.values()), transaction=transaction)
+            if snapshot.exists
+        }
+
+        deltas: Dict[str, dict] = {}
+        for doc_id, transcript in transcripts.items():
+            data = transcript.model_dump(by_alias=True)
+            collection = category_collection(transcript.category)
+            transaction.set(refs[doc_id], data)
+            transaction.set(
+                db.db.collection("transcripts").document(doc_id),
+                {**data, "collection_ref": collection},
+            )
+
+            old = existing.get(doc_id)
+            delta = deltas.setdefault(
+                sanitize_category(transcript.category),
+                {"name": transcript.category, "transcripts": 0, "tokens": 0},
+            )
+            delta["transcripts"] += 0 if old else 1
+            delta["tokens"] += (transcript.token_count or 0) - (
+                (old or {}).get("token_count") or 0
+            )
+
+        for sanitized, delta in deltas.items():
+            transaction.set(
+                db.db.collection("categories").document(sanitized),
+                CategoryCreate(name=delta["name"]).model_dump(by_alias=True),
+            )
+            counters.increment(
+                transaction, delta["name"], delta["transcripts"], delta["tokens"]
+            )
+
+        return len(transcripts) - len(existing)
+
+    created = await db.run_transaction(write)
+    await _forget(transcripts)
+    return created
+
+
+async def _forget(transcripts: Dict[str, Transcript]):
+    """Bring this process's caches in line with a committed batch"""
+    index = dedupe.get_duplicate_detector().index
+    for doc_id, transcript in transcripts.items():
+        signature = dedupe.decode(transcript.minhash)
+        if signature is not None:
+            index.add(doc_id, signature)
+
+    categories = {
+        sanitize_category(t.category): t.category for t in transcripts.values()
+    }
+    pools = get_sampling_pools()
+    for category in categories.values():
+        pools.drop(category)
+
+    resources = [
+        transcript_resource(t.video_id, t.category) for t in transcripts.values()
+    ]
+    resources += [category_resource(category) for category in categories.values()]
+    await get_validator_cache().invalidate(*resources, CATEGORIES_RESOURCE)
+
+
+async def import_corpus(
+    db: Database,
+    counters: CategoryCounters,
+    path: str,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    progress: Progress = None,
+) -> dict:
+    root = Path(path)
+    if not root.is_dir():
+        raise ValueError(f"No export found at {root}")
+
+    checkpoint_path = root / IMPORT_CHECKPOINT
+    checkpoint = _load_checkpoint(checkpoint_path) or {"files": []}
+    done = set(checkpoint["files"])
+    files = sorted(
+        file for file in root.glob("*/part-*") if file.suffix in READERS
+    )
+    summary = {"path": str(root), "files": len(files), "rows": 0, "created": 0}
+
+    for file in files:
+        name = str(file.relative_to(root))
+        if name in done:
+            continue
+
+        batches = READERS[file.suffix](file, batch_size)
+        while True:
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                break
+            summary["created"] += await _import_batch(db, counters, batch)
+            summary["rows"] += len(batch)
+
+        checkpoint["files"].append(name)
+        _save_checkpoint(checkpoint_path, checkpoint)
+        if progress is not None:
+            await progress(
+                {**summary, "files_done": len(checkpoint["files"]), "current": name}
+            )
+
+    return {**summary, "files_done": len(checkpoint["files"])}
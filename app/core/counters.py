@@ -0,0 +1,90 @@
+"""
+Sharded per-category transcript counters.
+
+Each category keeps its transcript count, total tokens and last update in
+``category_counter_shards`` documents under
+``category_counters/{category}/counter_shards``. A write increments one
+shard picked at random, so a busy category does not contend on a single
+document (Firestore sustains about one write per second per document).
+Increments are queued on the same transaction or batch as the transcript
+write they account for, so the counters cannot drift from the data.
+
+Listing the stats of every category is one collection group query over
+all shards; see scripts/backfill_category_counters.py for categories
+created before the counters existed.
+"""
+
+import random
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, List
+
+from firebase_admin import firestore
+
+from app.core.config import get_settings
+from app.core.firebase import Database, get_firestore_db
+from app.utils.categories import sanitize_category
+
+COUNTERS = "category_counters"
+SHARDS = "counter_shards"
+
+
+class CategoryCounters:
+    def __init__(self, db: Database, shards: int):
+        self.db = db
+        self.shards = shards
+
+    def shard_refs(self, category: str) -> list:
+        shards = (
+            self.db.db.collection(COUNTERS)
+            .document(sanitize_category(category))
+            .collection(SHARDS)
+        )
+        return [shards.document(str(n)) for n in range(self.shards)]
+
+    def increment(self, writer, category: str, transcripts: int, tokens: int):
+        """Queue an increment on ``writer``, a transaction or write batch"""
+        shard = random.choice(self.shard_refs(category))
+        data = {
+            "sanitized_category": sanitize_category(category),
+            "transcripts": firestore.Increment(transcripts),
+            "tokens": firestore.Increment(tokens),
+            "updated_at": datetime.now(timezone.utc),
+        }
+        if transcripts > 0:
+            # Display name as saved, deletes may spell the category differently
+            data["name"] = category
+        writer.set(shard, data, merge=True)
+
+    async def all_stats(self) -> List[dict]:
+        """Stats for every category with counters, from a single query"""
+        totals: Dict[str, dict] = {}
+        for shard in await self.db.get_collection_group(SHARDS):
+            stats = totals.setdefault(
+                shard["sanitized_category"],
+                {
+                    "name": None,
+                    "transcript_count": 0,
+                    "total_tokens": 0,
+                    "last_updated": None,
+                },
+            )
+            stats["name"] = stats["name"] or shard.get("name")
+            stats["transcript_count"] += shard.get("transcripts", 0)
+            stats["total_tokens"] += shard.get("tokens", 0)
+            updated_at = shard.get("updated_at")
+            if updated_at is not None and (
+                stats["last_updated"] is None or updated_at > stats["last_updated"]
+            ):
+                stats["last_updated"] = updated_at
+
+        for sanitized, stats in totals.items():
+            stats["name"] = stats["name"] or sanitized
+        return sorted(totals.values(), key=lambda stats: stats["name"])
+
+
+@lru_cache
+def get_category_counters() -> CategoryCounters:
+    return CategoryCounters(
+        get_firestore_db(), get_settings().category_counter_shards
+    )
@@ -6,6 +6,8 @@ from typing import Optional
 
 from pydantic import BaseModel
 
+from app.core.config import get_settings
+from app.core.resilience import call_upstream
 from prisma import Prisma
 
 
@@ -21,10 +23,17 @@ class TaskCreateRequest(BaseModel):
 class DatabaseService:
     def __init__(self):
         self.prisma = Prisma()
+        self.settings = get_settings()
+
+    async def _call(self, fn, retries: int = 2):
+        """Run a Prisma query under the request deadline and circuit breaker"""
+        return await call_upstream(
+            "prisma", fn, timeout=self.settings.prisma_timeout_seconds, retries=retries
+        )
 
     async def connect(self):
         """Connect to the database"""
-        await self.prisma.connect()
+        await self._call(self.prisma.connect)
 
     async def disconnect(self):
         """Disconnect from the database"""
@@ -33,16 +42,20 @@ class DatabaseService:
     async def create_task(self, task_data: TaskCreateRequest):
         """Create a new task in the channel management project"""
         try:
-            task = await self.prisma.task.create(
-                data={
-                    "title": task_data.title,
-                    "description": task_data.description,
-                    "projectId": task_data.project_id,
-                    "authorId": task_data.author_id,
-                    "assigneeId": task_data.assignee_id,
-                    "storyId": task_data.story_id,
-                    "status": "pending",
-                }
+            # Not idempotent, so never retried
+            task = await self._call(
+                lambda: self.prisma.task.create(
+                    data={
+                        "title": task_data.title,
+                        "description": task_data.description,
+                        "projectId": task_data.project_id,
+                        "authorId": task_data.author_id,
+                        "assigneeId": task_data.assignee_id,
+                        "storyId": task_data.story_id,
+                        "status": "pending",
+                    }
+                ),
+                retries=0,
             )
             return task
         except Exception as e:
@@ -51,7 +64,9 @@ class DatabaseService:
     async def get_project_by_slug(self, slug: str):
         """Get a project by its slug"""
         try:
-            project = await self.prisma.project.find_unique(where={"slug": slug})
+            project = await self._call(
+                lambda: self.prisma.project.find_unique(where={"slug": slug})
+            )
             return project
         except Exception as e:
             raise Exception(f"Failed to get project: {str(e)}")
@@ -59,7 +74,9 @@ class DatabaseService:
     async def get_user_by_username(self, username: str):
         """Get a user by username"""
         try:
-            user = await self.prisma.user.find_unique(where={"username": username})
+            user = await self._call(
+                lambda: self.prisma.user.find_unique(where={"username": username})
+            )
             return user
         except Exception as e:
             raise Exception(f"Failed to get user: {str(e)}")
@@ -67,7 +84,9 @@ class DatabaseService:
     async def get_task_by_story_id(self, story_id: str):
         """Get a task by story ID"""
         try:
-            task = await self.prisma.task.find_first(where={"storyId": story_id})
+            task = await self._call(
+                lambda: self.prisma.task.find_first(where={"storyId": story_id})
+            )
             return task
         except Exception as e:
             raise Exception(f"Failed to get task by story ID: {str(e)}")
@@ -81,8 +100,10 @@ async def get_database_service() -> DatabaseService:
     """Get the global database service instance"""
     global _db_service
     if _db_service is None:
-        _db_service = DatabaseService()
-        await _db_service.connect()
+        db_service = DatabaseService()
+        await db_service.connect()
+        # Only cache a connected service so a failed warmup is retried later
+        _db_service = db_service
     return _db_service
 
 
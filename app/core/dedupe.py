@@ -0,0 +1,294 @@
+"""
+Near-duplicate transcript detection with MinHash and LSH.
+
+A transcript's MinHash signature is ``NUM_PERM`` minimums of its hashed
+5-word shingles under fixed random permutations; the fraction of equal
+positions between two signatures estimates the Jaccard similarity of their
+shingle sets. Signatures are computed once at ingest and stored on the
+transcript (base64, 256 bytes raw).
+
+The in-memory ``DuplicateIndex`` splits each signature into ``BANDS`` bands
+of ``ROWS`` rows and buckets documents by band, so only documents sharing a
+whole band with a query are compared: with 8 bands of 8 rows a pair at 0.85
+similarity becomes a candidate 92% of the time, one at 0.5 under 4%. It
+is loaded with projection queries over the global ``transcripts``
+collection, ``INDEX_PAGE_SIZE`` documents at a time in ``created_at``
+order, and refreshed incrementally like the sampling pools. Documents
+without a ``created_at`` are not indexed.
+
+numpy, when installed, speeds up signing long transcripts; results are
+identical either way. See benchmarks/minhash.py for per-document cost and
+index memory.
+"""
+
+import base64
+import re
+import struct
+import time
+import zlib
+from datetime import datetime, timezone
+from functools import lru_cache
+from random import Random
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import get_settings
+from app.core.firebase import Database, get_firestore_db
+from app.core.singleflight import get_single_flight
+
+try:
+    import numpy
+except ImportError:  # optional dependency
+    numpy = None
+
+NUM_PERM = 64
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+
+# a * h + b stays below 2**64 for 32-bit shingle hashes
+MERSENNE_PRIME = (1 << 31) - 1
+# Fixed seed: signatures must agree across processes and restarts
+_rng = Random(20240601)
+PERMUTATIONS = [
+    (_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(0, MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+SIGNATURE_FORMAT = f"<{NUM_PERM}I"
+# Signatures and timestamps read per query when loading the index
+INDEX_PAGE_SIZE = 1000
+INDEX_FIELDS = ["minhash", "created_at"]
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+WORD_PATTERN = re.compile(r"\w+")
+
+Signature = bytes
+
+
+def shingles(text: str) -> Set[int]:
+    words = WORD_PATTERN.findall(text.lower())
+    if not words:
+        return set()
+    size = min(SHINGLE_SIZE, len(words))
+    return {
+        zlib.crc32(" ".join(words[i : i + size]).encode())
+        for i in range(len(words) - size + 1)
+    }
+
+
+def _minimums(hashes: Iterable[int]) -> List[int]:
+    hashes = list(hashes)
+    if numpy is not None:
+        a = numpy.array([a for a, _ in PERMUTATIONS], dtype=numpy.uint64)[:, None]
+        b = numpy.array([b for _, b in PERMUTATIONS], dtype=numpy.uint64)[:, None]
+        minimums = numpy.full(NUM_PERM, MERSENNE_PRIME, dtype=numpy.uint64)
+        # In chunks, so a very long transcript does not need a huge matrix
+        for start in range(0, len(hashes), 4096):
+            values = numpy.array(hashes[start : start + 4096], dtype=numpy.uint64)
+            permuted = (a * values + b) % MERSENNE_PRIME
+            minimums = numpy.minimum(minimums, permuted.min(axis=1))
+        return minimums.tolist()
+
+    return [
+        min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in PERMUTATIONS
+    ]
+
+
+def signature(text: str) -> Optional[Signature]:
+    """MinHash signature of ``text``, None if it has no words"""
+    hashes = shingles(text)
+    if not hashes:
+        return None
+    return struct.pack(SIGNATURE_FORMAT, *_minimums(hashes))
+
+
+def similarity(first: Signature, second: Signature) -> float:
+    """Estimated Jaccard similarity of the texts behind two signatures"""
+    a = struct.unpack(SIGNATURE_FORMAT, first)
+    b = struct.unpack(SIGNATURE_FORMAT, second)
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def encode(sig: Signature) -> str:
+    return base64.b64encode(sig).decode()
+
+
+def decode(value: Optional[str]) -> Optional[Signature]:
+    if not value:
+        return None
+    sig = base64.b64decode(value)
+    return sig if len(sig) == struct.calcsize(SIGNATURE_FORMAT) else None
+
+
+def _band_keys(sig: Signature) -> List[int]:
+    width = len(sig) // BANDS
+    # Salted with the band number so equal rows in different bands differ
+    return [
+        hash((band, sig[band * width : (band + 1) * width])) for band in range(BANDS)
+    ]
+
+
+class DuplicateIndex:
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.signatures: Dict[str, Signature] = {}
+        # A bucket holds one doc ID, or a list once it is shared
+        self.buckets: Dict[int, object] = {}
+        # Newest (created_at, doc ID) loaded, where the next refresh starts
+        self.watermark = None
+        self.watermark_id: Optional[str] = None
+        self.refreshed_at = 0.0
+        self.rebuilt_at = 0.0
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def add(self, doc_id: str, sig: Signature):
+        if doc_id in self.signatures:
+            self.discard(doc_id)
+        self.signatures[doc_id] = sig
+        for key in _band_keys(sig):
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                self.buckets[key] = doc_id
+            elif isinstance(bucket, list):
+                bucket.append(doc_id)
+            else:
+                self.buckets[key] = [bucket, doc_id]
+
+    def discard(self, doc_id: str):
+        sig = self.signatures.pop(doc_id, None)
+        if sig is None:
+            return
+        for key in _band_keys(sig):
+            bucket = self.buckets.get(key)
+            if bucket == doc_id:
+                del self.buckets[key]
+            elif isinstance(bucket, list) and doc_id in bucket:
+                bucket.remove(doc_id)
+                if len(bucket) == 1:
+                    self.buckets[key] = bucket[0]
+
+    def signature_of(self, doc_id: str) -> Optional[Signature]:
+        return self.signatures.get(doc_id)
+
+    def candidates(self, sig: Signature) -> Set[str]:
+        found: Set[str] = set()
+        for key in _band_keys(sig):
+            bucket = self.buckets.get(key)
+            if isinstance(bucket, list):
+                found.update(bucket)
+            elif bucket is not None:
+                found.add(bucket)
+        return found
+
+    def find_duplicate(
+        self, sig: Signature, exclude_prefix: Optional[str] = None
+    ) -> Optional[Tuple[str, float]]:
+        """Most similar indexed document at or above the threshold.
+
+        ``exclude_prefix`` skips documents whose ID starts with it, e.g. the
+        video being re-processed.
+        """
+        best = None
+        for doc_id in self.candidates(sig):
+            if exclude_prefix and doc_id.startswith(exclude_prefix):
+                continue
+            score = similarity(sig, self.signatures[doc_id])
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (doc_id, score)
+        return best
+
+    def _load(self, rows: List[dict]):
+        for row in rows:
+            sig = decode(row.get("minhash"))
+            if sig is not None:
+                self.add(row["doc_id"], sig)
+            created_at = row.get("created_at")
+            if created_at is not None and (
+                self.watermark is None
+                or (created_at, row["doc_id"]) > (self.watermark, self.watermark_id)
+            ):
+                self.watermark, self.watermark_id = created_at, row["doc_id"]
+
+    async def _load_since(
+        self, db: Database, after: datetime, after_id: Optional[str] = None
+    ):
+        """Page in the documents after ``(after, after_id)`` in
+        ``(created_at, doc ID)`` order; documents sharing a ``created_at``
+        are not skipped at page boundaries"""
+        while True:
+            rows = await db.select_fields(
+                "transcripts",
+                INDEX_FIELDS,
+                after_field="created_at",
+                after_value=after,
+                after_id=after_id,
+                limit=INDEX_PAGE_SIZE,
+            )
+            self._load(rows)
+            if len(rows) < INDEX_PAGE_SIZE:
+                return
+            after, after_id = self.watermark, self.watermark_id
+
+    async def refresh(self, db: Database, ttl: float, rebuild_after: float):
+        now = time.monotonic()
+        if now - self.refreshed_at < ttl:
+            return
+
+        if not self.rebuilt_at or now - self.rebuilt_at >= rebuild_after:
+            # From scratch now and then, to drop deleted documents. Built
+            # aside so lookups meanwhile still see the whole index
+            fresh = DuplicateIndex(self.threshold)
+            await fresh._load_since(db, _EPOCH)
+            self.signatures, self.buckets = fresh.signatures, fresh.buckets
+            self.watermark = fresh.watermark
+            self.watermark_id = fresh.watermark_id
+            self.rebuilt_at = now
+        elif self.watermark is not None:
+            await self._load_since(db, self.watermark, self.watermark_id)
+        else:
+            await self._load_since(db, _EPOCH)
+        self.refreshed_at = now
+
+
+class DuplicateFilter:
+    """Keeps a selection free of near-duplicates of what it already holds"""
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.kept: List[Signature] = []
+
+    def admit(self, sig: Optional[Signature]) -> bool:
+        if sig is None:
+            return True  # nothing to compare, e.g. not yet backfilled
+        if any(similarity(sig, other) >= self.threshold for other in self.kept):
+            return False
+        self.kept.append(sig)
+        return True
+
+
+class DuplicateDetector:
+    """The process-wide index plus its refresh policy"""
+
+    def __init__(self, db: Database):
+        self.db = db
+        self.settings = get_settings()
+        self.index = DuplicateIndex(self.settings.duplicate_threshold)
+
+    async def ready(self) -> DuplicateIndex:
+        await get_single_flight("duplicate_index_refresh").do(
+            "transcripts",
+            lambda: self.index.refresh(
+                self.db,
+                self.settings.duplicate_index_ttl_seconds,
+                self.settings.duplicate_index_rebuild_seconds,
+            ),
+        )
+        return self.index
+
+    def new_filter(self) -> DuplicateFilter:
+        return DuplicateFilter(self.settings.duplicate_threshold)
+
+
+@lru_cache
+def get_duplicate_detector() -> DuplicateDetector:
+    return DuplicateDetector(get_firestore_db())
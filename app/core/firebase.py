@@ -1,71 +1,246 @@
+import asyncio
+import random
+from itertools import islice
 from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, TypeVar
 
 from firebase_admin import App, credentials, firestore, get_app, initialize_app
 
 from app.core.config import get_settings
+from app.core.resilience import call_upstream
 
-settings = get_settings()
-
-config_path = Path.cwd() / settings.firebase_config_file
-
-cred = credentials.Certificate(config_path)
-firebase_app = initialize_app(cred)
+T = TypeVar("T")
 
 
 class Database:
     def __init__(self):
-        self.db = firestore.client()
+        self.settings = get_settings()
+        self.db = firestore.client(get_firebase_client())
+
+    async def _call(self, fn, *args, retries: int = 2):
+        """Run a blocking Firestore operation off the event loop.
+
+        Every operation used here is idempotent, so transient failures are
+        retried.
+        """
+        return await call_upstream(
+            "firestore",
+            lambda: asyncio.to_thread(fn, *args),
+            timeout=self.settings.firestore_timeout_seconds,
+            retries=retries,
+        )
+
+    async def warmup(self):
+        """Open the gRPC channel with a one-document read"""
+        await self._call(self.db.collection("categories").limit(1).get, retries=0)
 
     async def get_document(self, collection: str, doc_id: str) -> Optional[dict]:
         doc_ref = self.db.collection(collection).document(doc_id)
-        doc = doc_ref.get()
+        doc = await self._call(doc_ref.get)
 
         return doc.to_dict() if doc.exists else None
 
     async def get_documents_from_collection(
-        self, collection: str, limit: int
+        self,
+        collection: str,
+        limit: int,
+        order_by: Optional[str] = None,
+        descending: bool = False,
     ) -> List[dict]:
-        doc_ref = self.db.collection(collection).limit(limit)
-        docs = doc_ref.stream()
+        doc_ref = self.db.collection(collection)
+        if order_by is not None:
+            direction = (
+                firestore.Query.DESCENDING if descending else firestore.Query.ASCENDING
+            )
+            doc_ref = doc_ref.order_by(order_by, direction=direction)
+        doc_ref = doc_ref.limit(limit)
+        docs = await self._call(doc_ref.get)
 
         return [doc.to_dict() for doc in docs]
 
+    async def get_documents(
+        self, collection: str, doc_ids: List[str]
+    ) -> Dict[str, dict]:
+        """Batch-read documents by ID in a single round trip"""
+        refs = [self.db.collection(collection).document(doc_id) for doc_id in doc_ids]
+        docs = await self._call(lambda: list(self.db.get_all(refs)))
+
+        return {doc.id: doc.to_dict() for doc in docs if doc.exists}
+
+    async def select_fields(
+        self,
+        collection: str,
+        fields: List[str],
+        after_field: Optional[str] = None,
+        after_value: Any = None,
+        limit: Optional[int] = None,
+        after_id: Optional[str] = None,
+    ) -> List[dict]:
+        """Projection query returning only ``fields`` plus the document ID
+        (as ``doc_id``), optionally limited to ``after_field > after_value``
+        in ``after_field`` order, so it can be paged through. With
+        ``after_id`` it starts after the document ``after_id`` with
+        ``after_value`` instead, in ``(after_field, ID)`` order, so pages
+        cannot skip documents sharing the value at a page boundary.
+        """
+        ref = self.db.collection(collection)
+        query = ref.select(fields)
+        if after_field is not None:
+            query = query.order_by(after_field).order_by("__name__")
+            if after_id is not None:
+                query = query.start_after(
+                    {after_field: after_value, "__name__": ref.document(after_id)}
+                )
+            else:
+                query = query.where(after_field, ">", after_value)
+        if limit is not None:
+            query = query.limit(limit)
+        docs = await self._call(query.get)
+
+        return [{"doc_id": doc.id, **(doc.to_dict() or {})} for doc in docs]
+
+    async def collection_ids(self, prefix: str = "") -> List[str]:
+        collections = await self._call(lambda: list(self.db.collections()))
+        return sorted(col.id for col in collections if col.id.startswith(prefix))
+
+    async def read_page(
+        self, collection: str, limit: int, after_id: Optional[str] = None
+    ) -> List[dict]:
+        """One page of whole documents in document ID order, as dicts with a
+        ``doc_id``. Pass the last ``doc_id`` seen to get the next page."""
+        ref = self.db.collection(collection)
+        query = ref.order_by("__name__").limit(limit)
+        if after_id is not None:
+            query = query.start_after({"__name__": ref.document(after_id)})
+        docs = await self._call(query.get)
+
+        return [{"doc_id": doc.id, **(doc.to_dict() or {})} for doc in docs]
+
+    async def stream(self, query, batch_size: int = 50) -> AsyncIterator[dict]:
+        """Yield the documents of a Firestore ``query`` as they arrive.
+
+        Documents are pulled off the gRPC stream ``batch_size`` at a time in a
+        worker thread, so at most one batch is held in memory. Not retried:
+        a broken stream cannot be resumed from where it stopped.
+        """
+        docs = query.stream()
+        try:
+            while True:
+                batch = await self._call(
+                    lambda: list(islice(docs, batch_size)), retries=0
+                )
+                for doc in batch:
+                    yield {"doc_id": doc.id, **(doc.to_dict() or {})}
+                if len(batch) < batch_size:
+                    return
+        finally:
+            try:
+                docs.close()  # cancels the RPC if the client went away
+            except ValueError:
+                pass  # still running in the worker thread, it ends on its own
+
+    async def get_collection_group(self, collection_id: str) -> List[dict]:
+        """All documents of every collection named ``collection_id``"""
+        docs = await self._call(self.db.collection_group(collection_id).get)
+        return [doc.to_dict() for doc in docs]
+
+    def _first_from_key(self, collection: str, key_field: str, start: float):
+        ref = self.db.collection(collection)
+        docs = ref.where(key_field, ">=", start).order_by(key_field).limit(1).get()
+        if not docs:
+            # Wrap around to the smallest key
+            docs = ref.order_by(key_field).limit(1).get()
+        return docs[0] if docs else None
+
+    async def sample(
+        self, collection: str, k: int, key_field: str = "random_key"
+    ) -> List[dict]:
+        """Pick up to ``k`` distinct documents at random.
+
+        Every document carries a uniform random ``key_field``; each draw is a
+        range query for the first key at or after a fresh random point, so
+        the cost is O(k) reads however large the collection is, and every
+        document is equally likely in expectation. Documents without the key
+        are never picked, see scripts/backfill_random_keys.py.
+        """
+        found: Dict[str, dict] = {}
+        attempts = 0
+        while len(found) < k and attempts < 3 * k:
+            draws = k - len(found)
+            attempts += draws
+            docs = await asyncio.gather(
+                *[
+                    self._call(
+                        self._first_from_key, collection, key_field, random.random()
+                    )
+                    for _ in range(draws)
+                ]
+            )
+            if not any(docs):
+                break  # empty collection
+            for doc in docs:
+                if doc is not None:
+                    found[doc.id] = {"doc_id": doc.id, **doc.to_dict()}
+
+        return list(found.values())
+
     async def set_document(self, collection: str, doc_id: str, data: dict) -> bool:
         doc_ref = self.db.collection(collection).document(doc_id)
-        doc_ref.set(data)
+        await self._call(doc_ref.set, data)
         return True
 
     async def update_document(self, collection: str, doc_id: str, data: dict):
         doc_ref = self.db.collection(collection).document(doc_id)
-        doc_ref.update(data)
+        await self._call(doc_ref.update, data)
         return True
 
+    async def run_transaction(self, fn: Callable[[Any], T]) -> T:
+        """Run ``fn(transaction)`` in a Firestore transaction.
+
+        Firestore re-runs ``fn`` when the documents it read change before the
+        commit, so ``fn`` must do all its reads through the transaction and
+        have no other side effects. Not retried here: a commit whose reply
+        was lost may already have been applied.
+        """
+        return await self._call(
+            lambda: firestore.transactional(fn)(self.db.transaction()), retries=0
+        )
+
     async def delete_document(self, collection: str, doc_id: str):
         doc_ref = self.db.collection(collection).document(doc_id)
-        doc_ref.delete()
+        await self._call(doc_ref.delete)
         return True
 
     async def query_collection(
         self, collection: str, field: str, operator: str, value: any
     ):
-        docs = self.db.collection(collection).where(field, operator, value).stream()
+        query = self.db.collection(collection).where(field, operator, value)
+        docs = await self._call(query.get)
         return [doc.to_dict() for doc in docs]
 
-    async def search(self, collection: str, field: str, value: any):
-        docs = (
+    async def search(
+        self, collection: str, field: str, value: any, limit: Optional[int] = None
+    ):
+        query = (
             self.db.collection(collection)
             .where(field, ">=", value)
             .where(field, "<=", value + "\uf8ff")
-            .stream()
         )
+        if limit is not None:
+            query = query.limit(limit)
+        docs = await self._call(query.get)
         return [doc.to_dict() for doc in docs]
 
 
 @lru_cache
 def get_firebase_client() -> App:
-    return get_app()
+    """Initialize the Firebase app on first use rather than at import time"""
+    try:
+        return get_app()
+    except ValueError:
+        config_path = Path.cwd() / get_settings().firebase_config_file
+        return initialize_app(credentials.Certificate(config_path))
 
 
 @lru_cache
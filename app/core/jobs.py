@@ -0,0 +1,323 @@
+"""
+Background job queue for long-running generation.
+
+Submitting a job stores its record in the shared state and puts it on an
+in-process queue served by a fixed pool of worker tasks, so the request that
+submitted it returns at once. A job runs in the uvicorn worker that accepted
+it, but any worker can answer polls and stream its updates from the shared
+state. Cancellation is broadcast over pub/sub to reach the owning worker.
+
+Handlers may call ``report_progress`` to publish progress on the running
+job. Each user may have ``job_max_per_user`` jobs queued or running at a time;
+the count lives in the shared state so the limit holds across workers.
+"""
+
+import asyncio
+import logging
+import uuid
+from contextvars import ContextVar
+from datetime import datetime
+from functools import lru_cache
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+
+from app.core.config import get_settings
+from app.core.resilience import deadline_scope
+from app.core.state import SharedState, get_shared_state
+from app.schemas.jobs import JobStatus
+from app.utils.errors import JobLimitError
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[dict], Awaitable[dict]]
+
+# Records hold the plain string values, as they come back from the state
+TERMINAL_STATUSES = {
+    JobStatus.COMPLETED.value,
+    JobStatus.FAILED.value,
+    JobStatus.CANCELLED.value,
+}
+EVENTS_POLL_SECONDS = 2.0
+
+_current_job: ContextVar[Optional[str]] = ContextVar("current_job", default=None)
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+class JobQueue:
+    def __init__(
+        self,
+        name: str,
+        state: SharedState,
+        workers: int,
+        queue_size: int,
+        max_per_user: int,
+        budget_seconds: Optional[float],
+        ttl_seconds: float,
+    ):
+        self.name = name
+        self.state = state
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_per_user = max_per_user
+        self.budget_seconds = budget_seconds
+        self.ttl_seconds = ttl_seconds
+        self.handlers: Dict[str, JobHandler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list = []
+        self._local: Set[str] = set()  # jobs accepted by this process
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancelled: Set[str] = set()
+
+    # Keys are namespaced by queue, so one queue never serves another's jobs
+    def _job_key(self, job_id: str) -> str:
+        return f"job:{self.name}:{job_id}"
+
+    def _job_channel(self, job_id: str) -> str:
+        return f"job_events:{self.name}:{job_id}"
+
+    def _active_key(self, user: str) -> str:
+        return f"jobs_active:{self.name}:{user}"
+
+    @property
+    def _cancel_channel(self) -> str:
+        return f"jobs_cancel:{self.name}"
+
+    def register(self, kind: str, handler: JobHandler):
+        self.handlers[kind] = handler
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._listen_for_cancellations()))
+        logger.info(f"Started {self.workers} generation job workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        # Jobs still queued here would never run
+        while self._queue is not None and not self._queue.empty():
+            job_id, _, _, user = self._queue.get_nowait()
+            await self._finish(
+                job_id, user, JobStatus.FAILED, error="Server shut down"
+            )
+        self._queue = None
+
+    async def submit(self, kind: str, payload: dict, user: str) -> dict:
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for job kind {kind}")
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running")
+
+        active_key = self._active_key(user)
+        active = await self.state.incr(active_key, ttl=self.ttl_seconds)
+        if active > self.max_per_user:
+            await self.state.incr(active_key, -1)
+            raise JobLimitError(
+                status_code=429,
+                error_code="job_limit_exceeded",
+                message="Too many active generation jobs",
+                details=f"{active - 1} of {self.max_per_user} jobs already "
+                "queued or running",
+            )
+
+        now = _now()
+        record = {
+            "job_id": str(uuid.uuid4()),
+            "kind": kind,
+            "status": JobStatus.QUEUED.value,
+            "user": user,
+            "created_at": now,
+            "updated_at": now,
+        }
+        # Stored before queueing so a worker never picks up an unknown job
+        await self._save(record)
+
+        try:
+            self._queue.put_nowait((record["job_id"], kind, payload, user))
+        except asyncio.QueueFull:
+            await self.state.delete(self._job_key(record["job_id"]))
+            await self.state.incr(self._active_key(user), -1)
+            raise JobLimitError(
+                status_code=503,
+                error_code="job_queue_full",
+                message="Generation job queue is full",
+                details=f"{self.queue_size} jobs already queued, retry later",
+            )
+
+        self._local.add(record["job_id"])
+        return record
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await self.state.get(self._job_key(job_id))
+
+    async def cancel(self, job_id: str) -> Optional[dict]:
+        record = await self.get(job_id)
+        if record is None or record["status"] in TERMINAL_STATUSES:
+            return record
+
+        if record["status"] == JobStatus.QUEUED:
+            record.update(status=JobStatus.CANCELLED.value, updated_at=_now())
+            await self._save(record)
+        # The owning worker cancels the job if it is running or about to run
+        await self.state.publish(self._cancel_channel, job_id)
+        return record
+
+    async def events(self, job_id: str) -> AsyncIterator[dict]:
+        """Yield the job record now and after every change, until it ends.
+
+        Published updates wake the stream up; the record is also re-read
+        every ``EVENTS_POLL_SECONDS`` so an update published before the
+        subscription was in place is not missed.
+        """
+        subscription = self.state.subscribe(self._job_channel(job_id))
+        next_update = asyncio.ensure_future(subscription.__anext__())
+        try:
+            record, last = await self.get(job_id), None
+            while record is not None:
+                if record != last:
+                    yield record
+                    last = record
+                if record["status"] in TERMINAL_STATUSES:
+                    return
+
+                done, _ = await asyncio.wait(
+                    {next_update}, timeout=EVENTS_POLL_SECONDS
+                )
+                if done:
+                    record = next_update.result()
+                    next_update = asyncio.ensure_future(subscription.__anext__())
+                else:
+                    record = await self.get(job_id)
+        finally:
+            next_update.cancel()
+            await asyncio.gather(next_update, return_exceptions=True)
+            await subscription.aclose()
+
+    async def report_progress(self, progress: dict):
+        """Record progress on the job the calling handler is running"""
+        job_id = _current_job.get()
+        record = await self.get(job_id) if job_id is not None else None
+        if record is None or record["status"] in TERMINAL_STATUSES:
+            return
+        record.update(progress=progress, updated_at=_now())
+        await self._save(record)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers if self._tasks else 0,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": len(self._running),
+            "max_per_user": self.max_per_user,
+        }
+
+    async def _save(self, record: dict):
+        key = self._job_key(record["job_id"])
+        await self.state.set(key, record, ttl=self.ttl_seconds)
+        await self.state.publish(self._job_channel(record["job_id"]), record)
+
+    async def _finish(self, job_id: str, user: str, status: JobStatus, **fields):
+        self._local.discard(job_id)
+        self._cancelled.discard(job_id)
+        await self.state.incr(self._active_key(user), -1)
+
+        record = await self.get(job_id)
+        if record is not None and record["status"] not in TERMINAL_STATUSES:
+            record.update(status=status.value, updated_at=_now(), **fields)
+            await self._save(record)
+
+    async def _worker(self):
+        while True:
+            job_id, kind, payload, user = await self._queue.get()
+            try:
+                await self._run(job_id, kind, payload, user)
+            except asyncio.CancelledError:
+                await self._finish(
+                    job_id, user, JobStatus.FAILED, error="Server shut down"
+                )
+                raise
+            except Exception as e:
+                logger.error(f"Job {job_id} could not be recorded: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str, kind: str, payload: dict, user: str):
+        record = await self.get(job_id)
+        if (
+            record is None
+            or record["status"] == JobStatus.CANCELLED
+            or job_id in self._cancelled
+        ):
+            await self._finish(job_id, user, JobStatus.CANCELLED)
+            return
+
+        now = _now()
+        record.update(status=JobStatus.RUNNING.value, started_at=now, updated_at=now)
+        await self._save(record)
+
+        task = asyncio.create_task(self._execute(job_id, kind, payload))
+        self._running[job_id] = task
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if job_id not in self._cancelled:
+                raise
+            await self._finish(job_id, user, JobStatus.CANCELLED)
+        except Exception as e:
+            logger.error(f"Job {job_id} ({kind}) failed: {e}")
+            await self._finish(job_id, user, JobStatus.FAILED, error=str(e))
+        else:
+            await self._finish(job_id, user, JobStatus.COMPLETED, result=result)
+        finally:
+            self._running.pop(job_id, None)
+
+    async def _execute(self, job_id: str, kind: str, payload: dict) -> dict:
+        _current_job.set(job_id)  # this task's own context
+        # Jobs get their own budget, not the one of the request that queued them
+        with deadline_scope(self.budget_seconds, inherit=False):
+            return await self.handlers[kind](payload)
+
+    async def _listen_for_cancellations(self):
+        async for job_id in self.state.subscribe(self._cancel_channel):
+            if job_id not in self._local:
+                continue
+            self._cancelled.add(job_id)
+            task = self._running.get(job_id)
+            if task is not None:
+                task.cancel()
+
+
+@lru_cache
+def get_job_queue() -> JobQueue:
+    settings = get_settings()
+    return JobQueue(
+        "generation",
+        get_shared_state(),
+        workers=settings.job_workers,
+        queue_size=settings.job_queue_size,
+        max_per_user=settings.job_max_per_user,
+        budget_seconds=settings.job_budget_seconds,
+        ttl_seconds=settings.job_ttl_seconds,
+    )
+
+
+@lru_cache
+def get_admin_job_queue() -> JobQueue:
+    """Maintenance jobs (exports, imports, bulk edits), kept apart so they
+    never hold up generation. They can run for a long time, so no budget."""
+    settings = get_settings()
+    return JobQueue(
+        "admin",
+        get_shared_state(),
+        workers=settings.admin_job_workers,
+        queue_size=settings.job_queue_size,
+        max_per_user=settings.job_queue_size,
+        budget_seconds=None,
+        ttl_seconds=settings.job_ttl_seconds,
+    )
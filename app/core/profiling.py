@@ -0,0 +1,191 @@
+"""
+Sampling profiler for single requests, see app.middleware.profiling.
+
+While a capture runs, a background thread records the Python stack of
+every thread each ``profile_interval_seconds``. Samples from every thread
+are kept, not only the event loop's, because blocking calls (Firestore
+through ``Database``, OpenAI through ``ChatGPTClient``) run in worker
+threads. Other requests running at the same time show up too; the thread
+name tells the event loop apart from the workers.
+
+A capture is stored under ``profile_dir`` as folded stacks
+(``thread;outer;...;inner count`` per line), which flamegraph.pl and
+speedscope render as a flame graph, next to a JSON summary with the
+hottest functions. Only one capture runs at a time.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from app.core.config import get_settings
+
+CAPTURE_NAME_PATTERN = r"^\d{8}T\d{6}-[0-9a-f]{8}$"
+APP_ROOT = Path(__file__).resolve().parent.parent
+HOT_SPOTS = 15
+
+_capture_lock = threading.Lock()
+
+
+def _label(frame) -> str:
+    code = frame.f_code
+    path = Path(code.co_filename)
+    try:
+        filename = str(path.relative_to(APP_ROOT.parent))
+    except ValueError:
+        filename = path.name
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def _is_idle(stack: List[str]) -> bool:
+    # Thread pool workers waiting for work, they would dominate every capture
+    return any(frame.startswith("_worker (") for frame in stack) and (
+        "threading.py" in stack[-1] or "queue.py" in stack[-1]
+    )
+
+
+class StackSampler:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.count = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="request-profiler", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_label(frame))
+                    frame = frame.f_back
+                stack.reverse()
+                if stack and not _is_idle(stack):
+                    thread = names.get(thread_id, str(thread_id))
+                    self.samples[";".join([thread, *stack])] += 1
+            self.count += 1
+
+
+class Capture:
+    """One profiled request"""
+
+    def __init__(self, method: str, path: str, trigger: str):
+        settings = get_settings()
+        self.name = (
+            f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        )
+        self.meta = {
+            "name": self.name,
+            "method": method,
+            "path": path,
+            "trigger": trigger,
+            "started_at": datetime.utcnow().isoformat(),
+        }
+        self.sampler = StackSampler(settings.profile_interval_seconds)
+        self.started = time.perf_counter()
+
+    @classmethod
+    def begin(cls, method: str, path: str, trigger: str) -> Optional["Capture"]:
+        """Start a capture, None if another one is running"""
+        if not _capture_lock.acquire(blocking=False):
+            return None
+        try:
+            capture = cls(method, path, trigger)
+            capture.sampler.start()
+        except BaseException:
+            _capture_lock.release()
+            raise
+        return capture
+
+    def finish(self, status_code: Optional[int]) -> dict:
+        """Stop sampling and write the capture; blocking, run it in a thread"""
+        try:
+            samples = self.sampler.stop()
+        finally:
+            _capture_lock.release()
+
+        self.meta.update(
+            status_code=status_code,
+            duration_ms=round((time.perf_counter() - self.started) * 1000, 1),
+            ticks=self.sampler.count,
+            hot_spots=_hot_spots(samples),
+        )
+        directory = profile_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"{self.name}.folded").write_text(
+            "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+        )
+        (directory / f"{self.name}.json").write_text(json.dumps(self.meta, indent=2))
+        _prune(directory, get_settings().profile_max_captures)
+        return self.meta
+
+
+def _hot_spots(samples: Counter) -> dict:
+    """Functions with the most samples on top of the stack (self) and the
+    innermost app function of each stack (where app code is waiting)"""
+    leaf, app = Counter(), Counter()
+    for stack, count in samples.items():
+        frames = stack.split(";")[1:]
+        leaf[frames[-1]] += count
+        for frame in reversed(frames):
+            if "(app/" in frame:
+                app[frame] += count
+                break
+    return {
+        "self": leaf.most_common(HOT_SPOTS),
+        "app": app.most_common(HOT_SPOTS),
+    }
+
+
+def profile_dir() -> Path:
+    return Path(get_settings().profile_dir)
+
+
+def _prune(directory: Path, keep: int):
+    metas = sorted(directory.glob("*.json"), reverse=True)
+    for meta in metas[keep:]:
+        meta.unlink(missing_ok=True)
+        meta.with_suffix(".folded").unlink(missing_ok=True)
+
+
+def list_captures(limit: int) -> List[dict]:
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    metas = sorted(directory.glob("*.json"), reverse=True)[:limit]
+    captures = []
+    for meta in metas:
+        summary = json.loads(meta.read_text())
+        summary.pop("hot_spots", None)
+        captures.append(summary)
+    return captures
+
+
+def load_capture(name: str, part: str) -> Optional[str]:
+    """The folded stacks (``part="folded"``) or JSON summary of a capture"""
+    if not re.match(CAPTURE_NAME_PATTERN, name):
+        return None
+    path = profile_dir() / f"{name}.{part}"
+    return path.read_text() if os.path.exists(path) else None
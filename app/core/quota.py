@@ -0,0 +1,82 @@
+"""
+YouTube Data API quota accounting.
+
+Each Data API call is charged its documented unit cost against a daily
+budget kept in the shared state, so all workers draw from the same pool.
+The budget resets at midnight Pacific time, like the quota itself.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+from app.core.config import get_settings
+from app.core.state import SharedState, get_shared_state
+from app.utils.errors import QuotaExceededError
+
+try:
+    from zoneinfo import ZoneInfo
+
+    QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+except Exception:  # no tz database in the image
+    QUOTA_TIMEZONE = timezone(timedelta(hours=-8))
+
+logger = logging.getLogger(__name__)
+
+# https://developers.google.com/youtube/v3/determine_quota_cost
+QUOTA_COSTS = {
+    "search.list": 100,
+    "videos.list": 1,
+    "channels.list": 1,
+    "playlistItems.list": 1,
+}
+
+
+class YouTubeQuota:
+    def __init__(self, state: SharedState, daily_budget: int):
+        self.state = state
+        self.daily_budget = daily_budget
+
+    @staticmethod
+    def _key(suffix: str = "") -> str:
+        day = datetime.now(QUOTA_TIMEZONE).strftime("%Y-%m-%d")
+        return f"youtube_quota:{day}{suffix}"
+
+    async def charge(self, method: str) -> int:
+        """Reserve the units for one call, or raise if the budget is spent"""
+        cost = QUOTA_COSTS[method]
+        ttl = 2 * 24 * 3600
+        used = await self.state.incr(self._key(), cost, ttl=ttl)
+        if used > self.daily_budget:
+            await self.state.incr(self._key(), -cost, ttl=ttl)
+            logger.warning(f"YouTube quota exhausted, refusing {method}")
+            raise QuotaExceededError(
+                status_code=429,
+                error_code="youtube_quota_exceeded",
+                message="Daily YouTube API quota exhausted",
+                details=f"{method} costs {cost} units, {used - cost} of "
+                f"{self.daily_budget} already used today",
+            )
+
+        await self.state.incr(self._key(f":{method}"), cost, ttl=ttl)
+        return cost
+
+    async def usage(self) -> dict:
+        by_method = {}
+        for method in QUOTA_COSTS:
+            units = await self.state.get(self._key(f":{method}"))
+            if units:
+                by_method[method] = units
+
+        used = await self.state.get(self._key()) or 0
+        return {
+            "daily_budget": self.daily_budget,
+            "used": used,
+            "remaining": max(0, self.daily_budget - used),
+            "by_method": by_method,
+        }
+
+
+@lru_cache
+def get_youtube_quota() -> YouTubeQuota:
+    return YouTubeQuota(get_shared_state(), get_settings().youtube_daily_quota)
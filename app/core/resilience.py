@@ -0,0 +1,254 @@
+"""
+Shared resilience layer for upstream calls (YouTube, OpenAI, Firestore, Prisma).
+
+Every call runs under a per-call timeout bounded by the remaining request
+budget, is retried with jittered exponential backoff when the failure is
+transient (honoring ``Retry-After``), and goes through a per-dependency
+circuit breaker that fails fast while the dependency is down.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import AsyncContextManager, Awaitable, Callable, Dict, Optional, TypeVar
+
+from app.core.config import get_settings
+from app.utils.errors import CircuitOpenError, DeadlineExceededError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+TRANSIENT_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+TRANSIENT_ERROR_NAMES = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "DeadlineExceeded",
+    "ServiceUnavailable",
+    "InternalServerError",
+    "TooManyRequests",
+    "ResourceExhausted",
+    "Aborted",
+}
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float], inherit: bool = True):
+    """Bound all upstream calls in this context to ``seconds`` from now.
+
+    Nested scopes can only shrink an inherited deadline. ``inherit=False``
+    starts a fresh budget, e.g. for background work that outlives the request
+    that scheduled it; ``seconds=None`` with ``inherit=False`` removes it.
+    """
+    current = _deadline.get() if inherit else None
+    new = time.monotonic() + seconds if seconds is not None else None
+    if current is not None and (new is None or current < new):
+        new = current
+
+    token = _deadline.set(new)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def _call_timeout(timeout: Optional[float], dependency: str) -> Optional[float]:
+    remaining = remaining_time()
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        raise DeadlineExceededError(
+            status_code=504,
+            error_code="deadline_exceeded",
+            message=f"Request budget exhausted before calling {dependency}",
+        )
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def before_call(self):
+        state = self.state
+        if state == self.OPEN or (state == self.HALF_OPEN and self._probe_in_flight):
+            raise CircuitOpenError(
+                status_code=503,
+                error_code="dependency_unavailable",
+                message=f"{self.name} is temporarily unavailable",
+                details=f"Circuit opened after {self.failures} consecutive failures",
+            )
+        if state == self.HALF_OPEN:
+            self._probe_in_flight = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def release_probe(self):
+        """Let another call probe; the cancelled probe tells nothing about
+        the dependency"""
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"Circuit for {self.name} opened")
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures}
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(dependency: str) -> CircuitBreaker:
+    if dependency not in _breakers:
+        settings = get_settings()
+        _breakers[dependency] = CircuitBreaker(
+            dependency,
+            failure_threshold=settings.circuit_failure_threshold,
+            reset_timeout=settings.circuit_reset_seconds,
+        )
+    return _breakers[dependency]
+
+
+def breaker_stats() -> dict:
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
+
+
+def _status_code(exc: Exception) -> Optional[int]:
+    for attr in ("status_code", "code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    resp = getattr(exc, "resp", None)  # googleapiclient HttpError
+    if resp is not None and getattr(resp, "status", None) is not None:
+        return int(resp.status)
+    return None
+
+
+def is_transient(exc: Exception) -> bool:
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    if type(exc).__name__ in TRANSIENT_ERROR_NAMES:
+        return True
+    return _status_code(exc) in TRANSIENT_STATUS_CODES
+
+
+def retry_after(exc: Exception) -> Optional[float]:
+    """Seconds the upstream asked us to wait, from a ``Retry-After`` header."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if headers is None:
+        headers = getattr(exc, "resp", None)  # httplib2 responses are dicts
+    if not headers:
+        return None
+
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(max_delay, base_delay * 2**attempt))
+
+
+async def call_upstream(
+    dependency: str,
+    fn: Callable[[], Awaitable[T]],
+    *,
+    timeout: Optional[float] = None,
+    retries: int = 0,
+    base_delay: float = 0.5,
+    max_delay: float = 10.0,
+    retry_on: Callable[[Exception], bool] = is_transient,
+    admit: Optional[Callable[[], AsyncContextManager]] = None,
+) -> T:
+    """Run ``fn()`` against ``dependency`` with deadline, retries and breaker.
+
+    ``fn`` must build a fresh awaitable on every call so it can be retried.
+    Only transient failures count against the circuit breaker; errors such
+    as "not found" are passed straight through. ``admit``, e.g. a rate
+    limiter's slot, is entered around every attempt, before its timeout
+    starts and released before the backoff, so each retry queues and is
+    charged again.
+    """
+    breaker = get_breaker(dependency)
+    attempt = 0
+
+    while True:
+        async with admit() if admit is not None else nullcontext():
+            call_timeout = _call_timeout(timeout, dependency)
+            breaker.before_call()
+            try:
+                result = await asyncio.wait_for(fn(), timeout=call_timeout)
+            except asyncio.CancelledError:
+                breaker.release_probe()
+                raise
+            except Exception as e:
+                error = e
+            else:
+                breaker.record_success()
+                return result
+
+        if not retry_on(error):
+            breaker.record_success()
+            raise error
+        breaker.record_failure()
+        if attempt >= retries:
+            raise error
+
+        delay = retry_after(error)
+        if delay is None:
+            delay = backoff_delay(attempt, base_delay, max_delay)
+        remaining = remaining_time()
+        if remaining is not None and delay >= remaining:
+            # Waiting would blow the budget, no point in trying again
+            raise error
+
+        logger.warning(
+            f"{dependency} call failed ({type(error).__name__}), "
+            f"retrying in {delay:.2f}s (attempt {attempt + 1}/{retries})"
+        )
+        attempt += 1
+        await asyncio.sleep(delay)
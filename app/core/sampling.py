@@ -0,0 +1,214 @@
+"""
+Materialized per-category sampling pools for story generation.
+
+A pool holds the IDs and token counts of every transcript in a category,
+loaded with a projection query (no transcript bodies). Categories larger
+than ``sampling_pool_max_size`` are not materialized; they are sampled with
+``Database.sample`` instead, which costs O(k) reads at any size. Pools are refreshed
+incrementally by ``created_at`` once they are older than
+``sampling_pool_ttl_seconds`` and rebuilt from scratch every
+``sampling_pool_rebuild_seconds`` to drop deleted documents. Weighted
+sampling then happens locally; only the bodies of the sampled transcripts
+are read, in one batched read per category, through a small LRU cache.
+
+With ``dedupe``, twice as many transcripts are drawn and near-duplicates
+(by their MinHash signatures, see app.core.dedupe) are dropped before any
+body is read.
+"""
+
+import asyncio
+import math
+import random
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from cachetools import LRUCache
+
+from app.core import dedupe
+from app.core.config import get_settings
+from app.core.firebase import Database, get_firestore_db
+from app.core.singleflight import get_single_flight
+from app.schemas.transcripts import CategoryWeight
+from app.utils.categories import category_collection
+
+POOL_FIELDS = ["video_id", "token_count", "created_at"]
+
+
+@dataclass(frozen=True)
+class PoolEntry:
+    doc_id: str
+    video_id: str
+    token_count: Optional[int]
+
+
+class CategoryPool:
+    def __init__(self, collection: str):
+        self.collection = collection
+        self.entries: Dict[str, PoolEntry] = {}
+        self.watermark = None  # newest created_at seen
+        self.refreshed_at = 0.0
+        self.rebuilt_at = 0.0
+        self.oversized = False
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _add(self, rows: List[dict]):
+        for row in rows:
+            self.entries[row["doc_id"]] = PoolEntry(
+                doc_id=row["doc_id"],
+                video_id=row.get("video_id", ""),
+                token_count=row.get("token_count"),
+            )
+            created_at = row.get("created_at")
+            if created_at is not None and (
+                self.watermark is None or created_at > self.watermark
+            ):
+                self.watermark = created_at
+
+    async def refresh(
+        self, db: Database, ttl: float, rebuild_after: float, max_size: int
+    ):
+        now = time.monotonic()
+        if now - self.refreshed_at < ttl:
+            return
+
+        if not self.rebuilt_at or now - self.rebuilt_at >= rebuild_after:
+            rows = await db.select_fields(
+                self.collection, POOL_FIELDS, limit=max_size + 1
+            )
+            self.entries, self.watermark = {}, None
+            self.oversized = len(rows) > max_size
+            if not self.oversized:
+                self._add(rows)
+            self.rebuilt_at = now
+        elif self.oversized:
+            pass  # re-checked on the next rebuild
+        elif self.watermark is not None:
+            self._add(
+                await db.select_fields(
+                    self.collection,
+                    POOL_FIELDS,
+                    after_field="created_at",
+                    after_value=self.watermark,
+                )
+            )
+        else:
+            # Nothing with a created_at to page from, fall back to a rebuild
+            self.rebuilt_at = 0.0
+            return await self.refresh(db, ttl, rebuild_after, max_size)
+
+        self.refreshed_at = now
+
+    def discard(self, doc_id: str):
+        self.entries.pop(doc_id, None)
+
+    def sample(self, k: int) -> List[PoolEntry]:
+        return random.sample(list(self.entries.values()), min(k, len(self.entries)))
+
+
+class SamplingPools:
+    def __init__(self, db: Database):
+        self.db = db
+        self.settings = get_settings()
+        self.pools: Dict[str, CategoryPool] = {}
+        self.bodies = LRUCache(maxsize=self.settings.sampling_body_cache_size)
+
+    async def get_pool(self, category: str) -> CategoryPool:
+        collection = category_collection(category)
+        pool = self.pools.setdefault(collection, CategoryPool(collection))
+        # Concurrent generations for the same category share one refresh
+        await get_single_flight("sampling_pool_refresh").do(
+            collection,
+            lambda: pool.refresh(
+                self.db,
+                self.settings.sampling_pool_ttl_seconds,
+                self.settings.sampling_pool_rebuild_seconds,
+                self.settings.sampling_pool_max_size,
+            ),
+        )
+        return pool
+
+    def discard(self, category: str, doc_id: str):
+        collection = category_collection(category)
+        if collection in self.pools:
+            self.pools[collection].discard(doc_id)
+        self.bodies.pop((collection, doc_id), None)
+
+    def drop(self, category: str):
+        """Forget the category's pool, it is rebuilt from scratch on next use"""
+        self.pools.pop(category_collection(category), None)
+
+    async def load_bodies(
+        self, collection: str, entries: List[PoolEntry]
+    ) -> List[str]:
+        missing = [
+            e.doc_id for e in entries if (collection, e.doc_id) not in self.bodies
+        ]
+        if missing:
+            docs = await self.db.get_documents(collection, missing)
+            for doc_id, doc in docs.items():
+                self.bodies[(collection, doc_id)] = doc["transcript"]
+
+        return [
+            self.bodies[(collection, e.doc_id)]
+            for e in entries
+            if (collection, e.doc_id) in self.bodies
+        ]
+
+    async def sample_material(
+        self,
+        weights: List[CategoryWeight],
+        material_per_category: int,
+        dedupe_material: bool = False,
+    ) -> Dict[str, List[str]]:
+        """Draw transcripts per category in proportion to the weights.
+
+        A category gets ``weight`` of the total ``material_per_category *
+        len(weights)`` draws, at least one if its weight is non-zero and at
+        most ``material_per_category``. With ``dedupe_material`` no two
+        drawn transcripts are near-duplicates, across all categories.
+        """
+        pools = await asyncio.gather(*[self.get_pool(w.name) for w in weights])
+        size = material_per_category * len(weights)
+
+        index, unique = None, None
+        if dedupe_material:
+            detector = dedupe.get_duplicate_detector()
+            index, unique = await detector.ready(), detector.new_filter()
+        oversample = 2 if dedupe_material else 1
+
+        async def draw(item: CategoryWeight, pool: CategoryPool) -> List[str]:
+            if item.weight <= 0:
+                return []
+            k = min(material_per_category, max(1, math.floor(item.weight * size)))
+            if pool.oversized:
+                docs = await self.db.sample(pool.collection, k * oversample)
+                if unique is not None:
+                    docs = [
+                        doc
+                        for doc in docs
+                        if unique.admit(dedupe.decode(doc.get("minhash")))
+                    ]
+                return [doc["transcript"] for doc in docs[:k]]
+
+            entries = pool.sample(k * oversample)
+            if unique is not None:
+                entries = [
+                    entry
+                    for entry in entries
+                    if unique.admit(index.signature_of(entry.doc_id))
+                ]
+            return await self.load_bodies(pool.collection, entries[:k])
+
+        material = await asyncio.gather(
+            *[draw(item, pool) for item, pool in zip(weights, pools)]
+        )
+        return {item.name: texts for item, texts in zip(weights, material)}
+
+
+@lru_cache
+def get_sampling_pools() -> SamplingPools:
+    return SamplingPools(get_firestore_db())
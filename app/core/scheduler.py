@@ -0,0 +1,186 @@
+"""
+Rate-limit-aware scheduler for OpenAI calls.
+
+Requests-per-minute and tokens-per-minute limits are enforced with token
+buckets; callers wait in a priority queue so interactive generations are
+served ahead of batch categorization when the limits are tight.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Rough average for English text with the GPT tokenizers
+CHARS_PER_TOKEN = 4
+# Per-message framing overhead added by the chat format
+TOKENS_PER_MESSAGE = 4
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BATCH = 10
+
+
+def estimate_text_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def estimate_tokens(messages: List[dict], max_tokens: int = 0) -> int:
+    """Estimate the tokens a chat completion counts against the TPM limit.
+
+    OpenAI reserves the prompt tokens plus ``max_tokens`` of output when a
+    request is admitted, so both are included.
+    """
+    prompt_tokens = sum(
+        TOKENS_PER_MESSAGE + estimate_text_tokens(str(m.get("content", "")))
+        for m in messages
+    )
+    return prompt_tokens + max_tokens
+
+
+class TokenBucket:
+    def __init__(self, capacity: int, per_seconds: float = 60.0):
+        self.capacity = float(capacity)
+        self.rate = capacity / per_seconds
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        refilled = self.tokens + (now - self.updated_at) * self.rate
+        self.tokens = min(self.capacity, refilled)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` tokens are available (0 if they are now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float):
+        """Give back (positive) or take (negative) tokens after the fact."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + delta)
+
+
+class RateLimitScheduler:
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._queue: list = []
+        self._counter = itertools.count()
+        self._cond: Optional[asyncio.Condition] = None
+        self._in_flight = 0
+        self._waits = {p: {"count": 0, "total": 0.0, "max": 0.0} for p in Priority}
+
+    @property
+    def cond(self) -> asyncio.Condition:
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def acquire(self, tokens: int, priority: Priority = Priority.INTERACTIVE):
+        entry = (int(priority), next(self._counter), tokens)
+        enqueued_at = time.monotonic()
+
+        async with self.cond:
+            heapq.heappush(self._queue, entry)
+            try:
+                while True:
+                    timeout = None
+                    if self._queue[0] is entry:
+                        timeout = max(
+                            self.requests.wait_time(1), self.tokens.wait_time(tokens)
+                        )
+                        if timeout <= 0:
+                            heapq.heappop(self._queue)
+                            self.requests.consume(1)
+                            self.tokens.consume(tokens)
+                            break
+                    try:
+                        await asyncio.wait_for(self.cond.wait(), timeout=timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                if entry in self._queue:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                self.cond.notify_all()
+                raise
+
+            # Let the next caller re-check against the new head of the queue
+            self.cond.notify_all()
+
+        self._in_flight += 1
+        self._record_wait(priority, time.monotonic() - enqueued_at)
+
+    def release(self, estimated_tokens: int, actual_tokens: Optional[int] = None):
+        self._in_flight -= 1
+        if actual_tokens is not None:
+            self.tokens.adjust(estimated_tokens - actual_tokens)
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        tokens: int,
+        priority: Priority = Priority.INTERACTIVE,
+        timeout: Optional[float] = None,
+    ):
+        """Hold a scheduler slot for one call.
+
+        The yielded dict may be given ``total_tokens`` after the call so the
+        TPM bucket is corrected from the estimate to the real usage. With a
+        ``timeout`` the wait in the queue raises ``asyncio.TimeoutError``.
+        """
+        await asyncio.wait_for(self.acquire(tokens, priority), timeout=timeout)
+        usage: dict = {}
+        try:
+            yield usage
+        finally:
+            self.release(tokens, usage.get("total_tokens"))
+
+    def _record_wait(self, priority: Priority, waited: float):
+        stats = self._waits[Priority(priority)]
+        stats["count"] += 1
+        stats["total"] += waited
+        stats["max"] = max(stats["max"], waited)
+        if waited > 1:
+            logger.info(
+                f"OpenAI call ({Priority(priority).name.lower()}) waited "
+                f"{waited:.2f}s for rate limits, queue depth {len(self._queue)}"
+            )
+
+    def stats(self) -> dict:
+        depth = {p.name.lower(): 0 for p in Priority}
+        for priority, _, _ in self._queue:
+            depth[Priority(priority).name.lower()] += 1
+
+        return {
+            "queue_depth": len(self._queue),
+            "queue_depth_by_priority": depth,
+            "in_flight": self._in_flight,
+            "available_requests": round(self.requests.tokens, 2),
+            "available_tokens": round(self.tokens.tokens, 2),
+            "wait_seconds": {
+                p.name.lower(): {
+                    "count": s["count"],
+                    "avg": round(s["total"] / s["count"], 4) if s["count"] else 0.0,
+                    "max": round(s["max"], 4),
+                }
+                for p, s in self._waits.items()
+            },
+        }
@@ -0,0 +1,300 @@
+"""
+Shared state for caches and job tracking across uvicorn workers.
+
+``SharedState`` is a small key/value interface with TTLs, atomic increments
+and pub/sub. Values are anything JSON-serializable. Backends:
+
+- ``SQLiteState``: a WAL-mode SQLite file, for several workers on one host.
+- ``RedisState``: wraps any client with the ``redis.asyncio.Redis`` API
+  (Redis, Valkey, KeyDB, or a local stand-in such as fakeredis).
+- ``MemoryState``: in-process only, for a single worker and tests.
+
+The backend is chosen with the ``shared_state_url`` setting.
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import get_settings
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+class SharedState(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        """Return the value for ``key``, or None if missing or expired"""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store ``value``, expiring after ``ttl`` seconds if given"""
+
+    @abstractmethod
+    async def delete(self, key: str):
+        pass
+
+    @abstractmethod
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """Atomically add ``amount`` and return the new value.
+
+        ``ttl`` only applies when the counter is created, so a counter keyed
+        by e.g. day expires on its own.
+        """
+
+    @abstractmethod
+    async def publish(self, channel: str, message: Any):
+        pass
+
+    @abstractmethod
+    def subscribe(self, channel: str) -> AsyncIterator[Any]:
+        """Yield messages published to ``channel`` after subscribing"""
+
+    async def close(self):
+        pass
+
+    async def get_or_set(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+    ) -> Any:
+        """Memoize ``factory()`` under ``key``. Not a lock: concurrent
+        misses may each call the factory."""
+        value = await self.get(key)
+        if value is None:
+            value = await factory()
+            if value is not None:
+                await self.set(key, value, ttl=ttl)
+        return value
+
+
+class MemoryState(SharedState):
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+
+    def _live(self, key: str) -> Optional[tuple]:
+        entry = self._data.get(key)
+        if entry and entry[1] is not None and entry[1] <= time.time():
+            del self._data[key]
+            return None
+        return entry
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._live(key)
+        return json.loads(entry[0]) if entry else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.time() + ttl if ttl is not None else None
+        self._data[key] = (_dumps(value), expires_at)
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        entry = self._live(key)
+        if entry:
+            value, expires_at = int(json.loads(entry[0])) + amount, entry[1]
+        else:
+            value = amount
+            expires_at = time.time() + ttl if ttl is not None else None
+        self._data[key] = (_dumps(value), expires_at)
+        return value
+
+    async def publish(self, channel: str, message: Any):
+        for queue in self._subscribers.get(channel, []):
+            queue.put_nowait(json.loads(_dumps(message)))
+
+    async def subscribe(self, channel: str) -> AsyncIterator[Any]:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(channel, []).append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers[channel].remove(queue)
+
+
+class SQLiteState(SharedState):
+    # Published messages are kept this long for slow pollers, then pruned
+    MESSAGE_RETENTION_SECONDS = 3600
+    PRUNE_EVERY = 500
+
+    def __init__(self, path: str, poll_interval: float = 0.2):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(
+            path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages (id INTEGER PRIMARY KEY "
+            "AUTOINCREMENT, channel TEXT NOT NULL, payload TEXT NOT NULL, "
+            "created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS messages_channel ON messages (channel, id)"
+        )
+
+    def _execute(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    async def _run(self, sql: str, params: tuple = ()) -> list:
+        return await asyncio.to_thread(self._execute, sql, params)
+
+    async def _maybe_prune(self):
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY:
+            return
+        now = time.time()
+        await self._run("DELETE FROM kv WHERE expires_at <= ?", (now,))
+        await self._run(
+            "DELETE FROM messages WHERE created_at <= ?",
+            (now - self.MESSAGE_RETENTION_SECONDS,),
+        )
+
+    async def get(self, key: str) -> Optional[Any]:
+        rows = await self._run(
+            "SELECT value FROM kv WHERE key = ? "
+            "AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time()),
+        )
+        return json.loads(rows[0][0]) if rows else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.time() + ttl if ttl is not None else None
+        await self._run(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, _dumps(value), expires_at),
+        )
+        await self._maybe_prune()
+
+    async def delete(self, key: str):
+        await self._run("DELETE FROM kv WHERE key = ?", (key,))
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        # A single UPSERT statement, so concurrent workers cannot lose updates
+        rows = await self._run(
+            "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET "
+            "value = CASE WHEN kv.expires_at <= ? THEN excluded.value "
+            "ELSE CAST(kv.value AS INTEGER) + excluded.value END, "
+            "expires_at = CASE WHEN kv.expires_at <= ? THEN excluded.expires_at "
+            "ELSE kv.expires_at END "
+            "RETURNING value",
+            (key, str(amount), expires_at, now, now),
+        )
+        await self._maybe_prune()
+        return int(rows[0][0])
+
+    async def publish(self, channel: str, message: Any):
+        await self._run(
+            "INSERT INTO messages (channel, payload, created_at) VALUES (?, ?, ?)",
+            (channel, _dumps(message), time.time()),
+        )
+        await self._maybe_prune()
+
+    async def subscribe(self, channel: str) -> AsyncIterator[Any]:
+        rows = await self._run("SELECT COALESCE(MAX(id), 0) FROM messages")
+        last_id = rows[0][0]
+        while True:
+            rows = await self._run(
+                "SELECT id, payload FROM messages WHERE channel = ? AND id > ? "
+                "ORDER BY id",
+                (channel, last_id),
+            )
+            for message_id, payload in rows:
+                last_id = message_id
+                yield json.loads(payload)
+            if not rows:
+                await asyncio.sleep(self.poll_interval)
+
+    async def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RedisState(SharedState):
+    def __init__(self, client):
+        self.client = client
+
+    @staticmethod
+    def _loads(raw) -> Any:
+        if isinstance(raw, bytes):
+            raw = raw.decode()
+        return json.loads(raw)
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(key)
+        return self._loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        px = max(1, int(ttl * 1000)) if ttl is not None else None
+        await self.client.set(key, _dumps(value), px=px)
+
+    async def delete(self, key: str):
+        await self.client.delete(key)
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        value = await self.client.incrby(key, amount)
+        if ttl is not None and value == amount:
+            await self.client.pexpire(key, max(1, int(ttl * 1000)))
+        return int(value)
+
+    async def publish(self, channel: str, message: Any):
+        await self.client.publish(channel, _dumps(message))
+
+    async def subscribe(self, channel: str) -> AsyncIterator[Any]:
+        pubsub = self.client.pubsub()
+        await pubsub.subscribe(channel)
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    yield self._loads(message["data"])
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.close()
+
+    async def close(self):
+        await self.client.close()
+
+
+def create_shared_state(url: str) -> SharedState:
+    if url.startswith("memory://"):
+        return MemoryState()
+    if url.startswith("sqlite:///"):
+        return SQLiteState(url[len("sqlite:///") :])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        try:
+            from redis.asyncio import Redis
+        except ImportError as e:
+            raise RuntimeError(
+                "shared_state_url points at Redis but the redis package is not "
+                "installed (pip install redis)"
+            ) from e
+        return RedisState(Redis.from_url(url))
+    raise ValueError(f"Unsupported shared_state_url: {url}")
+
+
+@lru_cache
+def get_shared_state() -> SharedState:
+    return create_shared_state(get_settings().shared_state_url)
@@ -0,0 +1,134 @@
+"""
+Story edits with optimistic concurrency and revision history.
+
+Each story carries a ``revision`` number. An edit writes only the fields
+that changed, in a Firestore transaction that also bumps the revision, and
+can be made conditional on the revision the editor last saw. Alongside it,
+the transaction stores a reverse diff in ``stories/{id}/revisions/{n}``
+holding what revision ``n`` looked like: the previous value of short
+fields and a word-level diff for ``content``. Older revisions are rebuilt
+by walking these diffs back from the current story.
+"""
+
+from datetime import datetime
+from typing import List, Optional
+
+from app.core.firebase import Database
+from app.utils.diff import apply_diff, make_diff
+from app.utils.errors import RevisionConflictError
+
+STORIES = "stories"
+REVISIONS = "revisions"
+DIFFED_FIELDS = {"content"}
+
+
+def revisions_collection(story_id: str) -> str:
+    return f"{STORIES}/{story_id}/{REVISIONS}"
+
+
+def _reverse_entry(current: dict, changed: dict, replaced_at: datetime) -> dict:
+    """What it takes to get ``current`` back once ``changed`` is applied"""
+    fields, diffs = {}, {}
+    for field, value in changed.items():
+        old = current.get(field)
+        if field in DIFFED_FIELDS and isinstance(old, str) and isinstance(value, str):
+            diffs[field] = make_diff(value, old)
+        else:
+            fields[field] = old
+
+    return {
+        "revision": current.get("revision", 0),
+        "updated_at": current.get("updated_at"),
+        "replaced_at": replaced_at,
+        "changed_fields": sorted(changed),
+        "fields": fields,
+        "diffs": diffs,
+    }
+
+
+async def update_story(
+    db: Database,
+    story_id: str,
+    changes: dict,
+    expected_revision: Optional[int] = None,
+) -> Optional[dict]:
+    """Apply ``changes`` to a story as a field-level update.
+
+    Returns the updated story, or None if it does not exist. Raises
+    ``RevisionConflictError`` if ``expected_revision`` is given and the
+    story has moved on since.
+    """
+    ref = db.db.collection(STORIES).document(story_id)
+
+    def apply(transaction) -> Optional[dict]:
+        snapshot = ref.get(transaction=transaction)
+        if not snapshot.exists:
+            return None
+
+        current = snapshot.to_dict()
+        revision = current.get("revision", 0)  # stories saved before revisions
+        if expected_revision is not None and expected_revision != revision:
+            raise RevisionConflictError(
+                status_code=412,
+                error_code="revision_conflict",
+                message="Story was modified by someone else",
+                details=f"Expected revision {expected_revision}, "
+                f"current revision is {revision}",
+            )
+
+        changed = {
+            field: value
+            for field, value in changes.items()
+            if current.get(field) != value
+        }
+        if not changed:
+            return current
+
+        now = datetime.utcnow()
+        transaction.set(
+            ref.collection(REVISIONS).document(str(revision)),
+            _reverse_entry(current, changed, now),
+        )
+        update = {**changed, "revision": revision + 1, "updated_at": now}
+        transaction.update(ref, update)
+        return {**current, **update}
+
+    return await db.run_transaction(apply)
+
+
+async def list_revisions(db: Database, story_id: str, limit: int) -> List[dict]:
+    """Newest first, without the diffs"""
+    entries = await db.get_documents_from_collection(
+        revisions_collection(story_id), limit, order_by="revision", descending=True
+    )
+    return [
+        {key: entry.get(key) for key in ("revision", "replaced_at", "changed_fields")}
+        for entry in entries
+    ]
+
+
+async def story_at_revision(
+    db: Database, story_id: str, revision: int
+) -> Optional[dict]:
+    story = await db.get_document(STORIES, story_id)
+    if story is None:
+        return None
+
+    current = story.get("revision", 0)
+    if revision > current:
+        return None
+    if revision == current:
+        return story
+
+    entries = await db.query_collection(
+        revisions_collection(story_id), "revision", ">=", revision
+    )
+    for entry in sorted(entries, key=lambda e: e["revision"], reverse=True):
+        for field, diff in entry.get("diffs", {}).items():
+            story[field] = apply_diff(story.get(field) or "", diff)
+        story.update(entry.get("fields", {}))
+        story["revision"] = entry["revision"]
+        story["updated_at"] = entry.get("updated_at")
+
+    # History may have been lost, e.g. for stories edited before revisions
+    return story if story.get("revision", 0) == revision else None
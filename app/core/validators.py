@@ -0,0 +1,172 @@
+"""
+Conditional GETs (``ETag`` / ``If-None-Match``) for stories, transcripts
+and category listings.
+
+A response's ETag is a hash of its serialized body, so it changes exactly
+when what the client would receive changes. The latest ETag of every
+variant of a resource (e.g. each ``limit`` of a listing) is kept in the
+shared state; a request whose ``If-None-Match`` matches it is answered 304
+without reading Firestore. Writes invalidate the resource's validators.
+Entries also expire after ``etag_ttl_seconds``, which bounds how long a
+stale validator can be served if a read races a write or something writes
+to Firestore without going through the API.
+
+Firestore reads and response bytes saved are counted in the shared state,
+see ``GET /health/etag``.
+"""
+
+import asyncio
+import hashlib
+from functools import lru_cache
+from typing import Any, Optional
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+from app.core.config import get_settings
+from app.core.state import SharedState, get_shared_state
+from app.utils.categories import sanitize_category
+
+# Cached copies must be revalidated before every use
+CACHE_CONTROL = "private, no-cache"
+STATS = ("not_modified", "reads_saved", "bytes_saved", "validator_misses")
+
+
+def story_resource(story_id: str) -> str:
+    return f"story:{story_id}"
+
+
+def transcript_resource(video_id: str, category: str) -> str:
+    return f"transcript:{video_id}:{sanitize_category(category)}"
+
+
+def category_resource(category: str) -> str:
+    return f"category:{sanitize_category(category)}"
+
+
+CATEGORIES_RESOURCE = "categories"
+
+
+def make_etag(body: bytes) -> str:
+    # Weak, the compression middleware may re-encode the body
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(",")
+    )
+
+
+@lru_cache(maxsize=None)
+def _adapter(response_model) -> TypeAdapter:
+    return TypeAdapter(response_model)
+
+
+def _prepare(value: Any) -> Any:
+    # As FastAPI does before validating against a response_model
+    if isinstance(value, BaseModel):
+        return value.model_dump(by_alias=True)
+    if isinstance(value, list):
+        return [_prepare(item) for item in value]
+    return value
+
+
+def serialize(response_model, value: Any) -> bytes:
+    """The body FastAPI would send for ``value`` under ``response_model``.
+
+    Validates once, or not at all if ``value`` already is a
+    ``response_model`` instance, where FastAPI would dump and re-validate.
+    """
+    adapter = _adapter(response_model)
+    if not (isinstance(response_model, type) and isinstance(value, response_model)):
+        value = adapter.validate_python(_prepare(value))
+    return adapter.dump_json(value, by_alias=True)
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(
+        status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    )
+
+
+class ValidatorCache:
+    def __init__(self, state: SharedState, ttl: float):
+        self.state = state
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(resource: str) -> str:
+        return f"etag:{resource}"
+
+    async def not_modified(
+        self, resource: str, if_none_match: Optional[str], variant: str = ""
+    ) -> Optional[Response]:
+        """A 304 if the client's copy is current, without loading anything"""
+        if not if_none_match:
+            return None
+        entry = (await self.state.get(self._key(resource)) or {}).get(variant)
+        if entry is None or not etag_matches(if_none_match, entry["etag"]):
+            await self._count(validator_misses=1)
+            return None
+        await self._count(not_modified=1, reads_saved=1, bytes_saved=entry["bytes"])
+        return _not_modified(entry["etag"])
+
+    async def respond(
+        self,
+        resource: str,
+        response_model,
+        value: Any,
+        if_none_match: Optional[str] = None,
+        variant: str = "",
+    ) -> Response:
+        """Serialize ``value``, remember its ETag and answer 304 if it matches"""
+        body = serialize(response_model, value)
+        etag = make_etag(body)
+
+        key = self._key(resource)
+        entries = await self.state.get(key) or {}
+        if entries.get(variant, {}).get("etag") != etag:
+            entries[variant] = {"etag": etag, "bytes": len(body)}
+            await self.state.set(key, entries, ttl=self.ttl)
+
+        if etag_matches(if_none_match, etag):
+            # Loaded anyway, the validator was missing or expired
+            await self._count(not_modified=1, bytes_saved=len(body))
+            return _not_modified(etag)
+        return Response(
+            body,
+            media_type="application/json",
+            headers={"ETag": etag, "Cache-Control": CACHE_CONTROL},
+        )
+
+    async def invalidate(self, *resources: str):
+        await asyncio.gather(
+            *[self.state.delete(self._key(resource)) for resource in resources]
+        )
+
+    async def _count(self, **amounts: int):
+        await asyncio.gather(
+            *[
+                self.state.incr(f"etag_stats:{name}", amount)
+                for name, amount in amounts.items()
+                if amount
+            ]
+        )
+
+    async def stats(self) -> dict:
+        values = await asyncio.gather(
+            *[self.state.get(f"etag_stats:{name}") for name in STATS]
+        )
+        return {name: int(value or 0) for name, value in zip(STATS, values)}
+
+
+@lru_cache
+def get_validator_cache() -> ValidatorCache:
+    return ValidatorCache(get_shared_state(), get_settings().etag_ttl_seconds)
@@ -0,0 +1,95 @@
+"""
+Partial regeneration of generated story variations.
+
+Replacing one weak variation, or a few paragraphs inside one, costs a
+completion sized for what is replaced instead of all ``variations_count``
+stories. The text that is kept goes into the prompt only as compact
+context: the opening of each kept variation, so a regenerated one stays
+distinct from them, or the paragraphs just before and after a rewritten
+range, so the story still reads through.
+"""
+
+import re
+from typing import List, Sequence
+
+from app.core.chatgpt import ChatGPTClient
+
+# Context sent for the text that is kept
+OPENING_CHARS = 300
+NEIGHBOUR_CHARS = 800
+SYNOPSIS_CHARS = 2000
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def split_paragraphs(text: str) -> List[str]:
+    return [p.strip() for p in _PARAGRAPH_BREAK.split(text) if p.strip()]
+
+
+def join_paragraphs(paragraphs: Sequence[str]) -> str:
+    return "\n\n".join(paragraphs)
+
+
+def _head(text: str, chars: int) -> str:
+    if len(text) <= chars:
+        return text
+    return text[:chars].rsplit(maxsplit=1)[0] + " ..."
+
+
+def _tail(text: str, chars: int) -> str:
+    if len(text) <= chars:
+        return text
+    return "... " + text[-chars:].split(maxsplit=1)[-1]
+
+
+async def regenerate_variations(
+    chatgpt: ChatGPTClient,
+    synopsis: str,
+    variations: List[str],
+    indices: List[int],
+    style: str,
+    length: int,
+) -> List[str]:
+    """``variations`` with the ones at ``indices`` generated anew, as the
+    choices of a single completion"""
+    replaced = sorted(set(indices))
+    kept = [
+        _head(variation, OPENING_CHARS)
+        for n, variation in enumerate(variations)
+        if n not in replaced
+    ]
+    new = await chatgpt.regenerate_variations(
+        synopsis, kept, style, length, count=len(replaced)
+    )
+    result = list(variations)
+    for n, variation in zip(replaced, new):
+        result[n] = variation
+    return result
+
+
+async def regenerate_paragraphs(
+    chatgpt: ChatGPTClient,
+    synopsis: str,
+    variation: str,
+    start: int,
+    stop: int,
+    style: str,
+) -> str:
+    """``variation`` with paragraphs ``start`` to ``stop - 1`` rewritten"""
+    paragraphs = split_paragraphs(variation)
+    if not 0 <= start < stop <= len(paragraphs):
+        raise ValueError(
+            f"Paragraph range {start}:{stop} is outside the variation's "
+            f"{len(paragraphs)} paragraphs"
+        )
+
+    rewritten = await chatgpt.rewrite_paragraphs(
+        _head(synopsis, SYNOPSIS_CHARS),
+        _tail(join_paragraphs(paragraphs[:start]), NEIGHBOUR_CHARS),
+        paragraphs[start:stop],
+        _head(join_paragraphs(paragraphs[stop:]), NEIGHBOUR_CHARS),
+        style,
+    )
+    return join_paragraphs(
+        paragraphs[:start] + split_paragraphs(rewritten) + paragraphs[stop:]
+    )
@@ -0,0 +1,81 @@
+"""
+Parallel client warmup, run from the FastAPI lifespan.
+
+Nothing in ``app.core`` touches the network or credentials at import time;
+the clients are built here instead so cold starts pay for them once, in
+parallel, before the first request rather than inside it. A failing
+dependency is logged and retried lazily on first use instead of taking the
+process down.
+"""
+
+import asyncio
+import logging
+import time
+
+from app.core.chatgpt import get_chatgpt_client
+from app.core.config import get_settings
+from app.core.database import get_database_service
+from app.core.firebase import get_firestore_db
+from app.core.youtube import get_youtube_api, get_youtube_service
+
+logger = logging.getLogger(__name__)
+
+
+async def _warm_firestore():
+    db = await asyncio.to_thread(get_firestore_db)
+    await db.warmup()
+
+
+async def _warm_openai():
+    chatgpt = await asyncio.to_thread(get_chatgpt_client)
+    await chatgpt.warmup()
+
+
+async def _warm_youtube():
+    await asyncio.to_thread(get_youtube_api)
+
+
+async def _timed(name: str, warm) -> dict:
+    started = time.perf_counter()
+    try:
+        await warm()
+        ok, error = True, None
+    except Exception as e:
+        ok, error = False, str(e)
+        logger.warning(f"Warmup of {name} failed: {error}")
+
+    return {
+        "name": name,
+        "ok": ok,
+        "seconds": round(time.perf_counter() - started, 4),
+        "error": error,
+    }
+
+
+async def warmup_clients() -> list:
+    """Build and connect the Firestore, OpenAI, YouTube and Prisma clients"""
+    settings = get_settings()
+    tasks = [
+        _timed("firestore", _warm_firestore),
+        _timed("openai", _warm_openai),
+        _timed("youtube", _warm_youtube),
+        _timed("prisma", get_database_service),
+    ]
+
+    try:
+        results = await asyncio.wait_for(
+            asyncio.gather(*tasks), timeout=settings.warmup_timeout_seconds
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Client warmup timed out, continuing with lazy startup")
+        return []
+
+    # Depends on the Firestore and OpenAI singletons built above
+    try:
+        get_youtube_service()
+    except Exception as e:
+        logger.warning(f"Warmup of youtube service failed: {e}")
+
+    for result in results:
+        logger.info(f"Warmed up {result['name']} in {result['seconds']}s")
+    return results
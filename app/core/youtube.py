@@ -1,8 +1,15 @@
+import asyncio
 import logging
+import random
 import re
+import threading
+import time
+from datetime import datetime, timezone
 from functools import lru_cache
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
 
+import httplib2
+import requests
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from youtube_transcript_api import YouTubeTranscriptApi
@@ -10,74 +17,262 @@ from youtube_transcript_api._errors import NoTranscriptFound, TranscriptsDisable
 
 from app.core.chatgpt import get_chatgpt_client
 from app.core.config import get_settings
-from app.core.firebase import Database
-from app.models.transcript import Transcript
+from app.core import dedupe
+from app.core.blocking import BlockingPool
+from app.core.counters import get_category_counters
+from app.core.firebase import get_firestore_db
+from app.core.quota import get_youtube_quota
+from app.core.resilience import call_upstream, deadline_scope, is_transient
+from app.core.sampling import get_sampling_pools
+from app.core.scheduler import estimate_text_tokens
+from app.core.singleflight import get_single_flight
+from app.core.state import get_shared_state
+from app.core.validators import (
+    CATEGORIES_RESOURCE,
+    category_resource,
+    get_validator_cache,
+    transcript_resource,
+)
+from app.models.transcript import Transcript, TranscriptRecord
 from app.schemas.transcripts import CategoryCreate
-from app.utils.errors import CustomHTTPException, NoChannelFoundError, NoVideoFoundError
+from app.utils.categories import category_collection, sanitize_category
+from app.utils.errors import (
+    CircuitOpenError,
+    CustomHTTPException,
+    DeadlineExceededError,
+    NoChannelFoundError,
+    NoVideoFoundError,
+    QuotaExceededError,
+)
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+MAX_CHANNEL_VIDEOS = 500
+# Transcript fields listed when the transcript text itself is not wanted
+LISTING_FIELDS = ["video_id", "title", "category", "token_count", "created_at"]
+# Expired listings are kept this long so they can still be revalidated by ETag
+CHANNEL_CACHE_MAX_AGE = 7 * 24 * 3600
+# Upstream hosts, each with its own concurrency limit in the I/O pool
+TRANSCRIPT_HOST = "www.youtube.com"
+DATA_API_HOST = "youtube.googleapis.com"
+
+# Neither httplib2.Http nor requests.Session is safe to share between
+# threads, so each I/O pool thread keeps its own, and their connections
+# stay open between calls
+_thread_clients = threading.local()
+
+
+def _thread_http() -> httplib2.Http:
+    http = getattr(_thread_clients, "http", None)
+    if http is None:
+        http = httplib2.Http(timeout=get_settings().youtube_timeout_seconds)
+        _thread_clients.http = http
+    return http
+
+
+def _thread_transcript_api() -> YouTubeTranscriptApi:
+    api = getattr(_thread_clients, "transcript_api", None)
+    if api is None:
+        api = YouTubeTranscriptApi(http_client=requests.Session())
+        _thread_clients.transcript_api = api
+    return api
+
+
+def _execute_request(request):
+    return request.execute(http=_thread_http())
+
+
+def _retry_data_api(exc: Exception) -> bool:
+    # A spent quota answers 429 too, but stays spent until midnight
+    return not isinstance(exc, QuotaExceededError) and is_transient(exc)
+
 
 class YouTubeService:
     def __init__(self):
         self.settings = get_settings()
         self.ChatGPTClient = get_chatgpt_client()
-        self.db = Database()  # Firebase Firestore database instance
-        self.youtube = YouTubeTranscriptApi()
+        self.db = get_firestore_db()  # Firebase Firestore database instance
+        self.api = get_youtube_api()
+        self.io = get_youtube_io_pool()
+        self.state = get_shared_state()
+        self.quota = get_youtube_quota()
+        self.counters = get_category_counters()
+        self.duplicates = dedupe.get_duplicate_detector()
+        self.validators = get_validator_cache()
 
     async def get_channel_videos(
         self, channel_id: str, max_results: int = 50, order: str = "date"
     ) -> List[dict]:
-        youtube = build("youtube", "v3", developerKey=self.settings.youtube_api_key)
+        try:
+            if order == "date":
+                return await self._get_channel_uploads(channel_id, max_results)
+            # The uploads playlist is only available in upload order
+            return await self._search_channel_videos(channel_id, max_results, order)
+
+        except HttpError as e:
+            logger.error(f"YouTube API error: {str(e)}")
+            raise CustomHTTPException(
+                status_code=e.status_code,
+                error_code="youtube_api_error",
+                message="YouTube API request failed",
+                details=str(e),
+            )
+
+    async def _search_channel_videos(
+        self, channel_id: str, max_results: int, order: str
+    ) -> List[dict]:
+        """List via search.list, 100 quota units per page"""
         video_data = []
         next_page_token = None
 
-        try:
-            while True:
-                request = youtube.search().list(
-                    part="id,snippet",
-                    channelId=channel_id,
-                    maxResults=max_results,
-                    pageToken=next_page_token,
-                    type="video",
-                    order=order,
+        while True:
+            request = self.api.search().list(
+                part="id,snippet",
+                channelId=channel_id,
+                maxResults=max_results,
+                pageToken=next_page_token,
+                type="video",
+                order=order,
+            )
+            response = await self._execute(request, "search.list")
+
+            if not response.get("items"):
+                raise NoChannelFoundError(
+                    status_code=404,
+                    error_code="no_channel_found",
+                    message="Channel not found or has no videos",
                 )
-                response = request.execute()
 
-                if not response.get("items"):
+            for item in response["items"]:
+                video_data.append(
+                    {
+                        "video_id": item["id"]["videoId"],
+                        "title": item["snippet"]["title"],
+                        "published_at": item["snippet"]["publishedAt"],
+                        "thumbnail": item["snippet"]["thumbnails"]["default"]["url"],
+                    }
+                )
+
+            next_page_token = response.get("nextPageToken")
+            if not next_page_token or len(video_data) >= MAX_CHANNEL_VIDEOS:
+                break
+
+        return video_data
+
+    async def _get_uploads_playlist_id(self, channel_id: str) -> str:
+        # Channel IDs are "UC" + suffix and their uploads playlist "UU" + suffix
+        if channel_id.startswith("UC"):
+            return "UU" + channel_id[2:]
+
+        request = self.api.channels().list(part="contentDetails", id=channel_id)
+        response = await self._execute(request, "channels.list")
+        if not response.get("items"):
+            raise NoChannelFoundError(
+                status_code=404,
+                error_code="no_channel_found",
+                message="Channel not found or has no videos",
+            )
+        return response["items"][0]["contentDetails"]["relatedPlaylists"]["uploads"]
+
+    async def _get_channel_uploads(
+        self, channel_id: str, max_results: int
+    ) -> List[dict]:
+        """List via the channel's uploads playlist, 1 quota unit per page.
+
+        Listings are cached in the shared state. Within
+        ``channel_cache_ttl_seconds`` the cache is served as-is; after that
+        the first page is re-requested with ``If-None-Match`` and, if it
+        changed, only the pages up to the newest cached video are fetched.
+        """
+        cache_key = f"channel_videos:{channel_id}"
+        cached = await self.state.get(cache_key)
+        now = time.time()
+        fresh_for = self.settings.channel_cache_ttl_seconds
+        if cached and now - cached["fetched_at"] < fresh_for:
+            return cached["videos"]
+
+        playlist_id = await self._get_uploads_playlist_id(channel_id)
+        known_video_id = cached["videos"][0]["video_id"] if cached else None
+        new_videos = []
+        etag = None
+        next_page_token = None
+        reached_cache = False
+
+        while True:
+            request = self.api.playlistItems().list(
+                part="snippet,contentDetails",
+                playlistId=playlist_id,
+                maxResults=max_results,
+                pageToken=next_page_token,
+            )
+            if cached and next_page_token is None:
+                request.headers["If-None-Match"] = cached["etag"]
+
+            try:
+                response = await self._execute(request, "playlistItems.list")
+            except HttpError as e:
+                if e.resp.status == 304:
+                    cached["fetched_at"] = now
+                    await self.state.set(cache_key, cached, ttl=CHANNEL_CACHE_MAX_AGE)
+                    return cached["videos"]
+                if e.resp.status == 404:
                     raise NoChannelFoundError(
                         status_code=404,
                         error_code="no_channel_found",
                         message="Channel not found or has no videos",
                     )
-
-                for item in response["items"]:
-                    video_data.append(
-                        {
-                            "video_id": item["id"]["videoId"],
-                            "title": item["snippet"]["title"],
-                            "published_at": item["snippet"]["publishedAt"],
-                            "thumbnail": item["snippet"]["thumbnails"]["default"][
-                                "url"
-                            ],
-                        }
-                    )
-
-                next_page_token = response.get("nextPageToken")
-                if not next_page_token or len(video_data) >= 500:  # Limit to 500 videos
+                raise
+
+            etag = etag or response.get("etag")
+            for item in response.get("items", []):
+                video = self._playlist_item_to_video(item)
+                if video is None:
+                    continue
+                if video["video_id"] == known_video_id:
+                    reached_cache = True
                     break
+                new_videos.append(video)
+
+            next_page_token = response.get("nextPageToken")
+            if (
+                reached_cache
+                or not next_page_token
+                or len(new_videos) >= MAX_CHANNEL_VIDEOS
+            ):
+                break
+
+        videos = new_videos + (cached["videos"] if reached_cache else [])
+        videos = videos[:MAX_CHANNEL_VIDEOS]
+        if not videos:
+            raise NoChannelFoundError(
+                status_code=404,
+                error_code="no_channel_found",
+                message="Channel not found or has no videos",
+            )
 
-            return video_data
+        await self.state.set(
+            cache_key,
+            {"etag": etag, "videos": videos, "fetched_at": now},
+            ttl=CHANNEL_CACHE_MAX_AGE,
+        )
+        return videos
 
-        except HttpError as e:
-            logger.error(f"YouTube API error: {str(e)}")
-            raise CustomHTTPException(
-                status_code=e.status_code,
-                error_code="youtube_api_error",
-                message="YouTube API request failed",
-                details=str(e),
-            )
+    @staticmethod
+    def _playlist_item_to_video(item: dict) -> Optional[dict]:
+        snippet = item["snippet"]
+        thumbnail = snippet.get("thumbnails", {}).get("default")
+        if not thumbnail:
+            # Private and deleted videos stay in the playlist without details
+            return None
+        return {
+            "video_id": snippet["resourceId"]["videoId"],
+            "title": snippet["title"],
+            "published_at": item.get("contentDetails", {}).get(
+                "videoPublishedAt", snippet["publishedAt"]
+            ),
+            "thumbnail": thumbnail["url"],
+        }
 
     @staticmethod
     def extract_video_id(url: str) -> str:
@@ -101,23 +296,54 @@ class YouTubeService:
             details="Could not extract video ID from provided URL",
         )
 
+    async def _execute(self, request, method: str, retries: int = 2):
+        """Execute a Data API request off the event loop under a deadline.
+
+        ``method`` (e.g. "videos.list") is charged against the daily quota
+        on every attempt, retries included.
+        """
+
+        async def attempt():
+            await self.quota.charge(method)
+            return await self.io.run(DATA_API_HOST, _execute_request, request)
+
+        return await call_upstream(
+            "youtube",
+            attempt,
+            timeout=self.settings.youtube_timeout_seconds,
+            retries=retries,
+            retry_on=_retry_data_api,
+        )
+
+    @staticmethod
+    def _fetch_transcript_text(video_id: str, languages: List[str]) -> str:
+        transcript_list = _thread_transcript_api().list(video_id=video_id)
+
+        try:
+            transcript = transcript_list.find_manually_created_transcript(languages)
+        except:  # noqa: E722
+            transcript = transcript_list.find_generated_transcript(languages)
+
+        return " ".join([entry["text"] for entry in transcript.fetch()])
+
     async def get_video_transcript(
         self, video_id: str, languages: List[str] = ["en"]
     ) -> Optional[str]:
         try:
-            transcript_list = self.youtube.list(video_id=video_id)
-
-            try:
-                transcript = transcript_list.find_manually_created_transcript(languages)
-            except:  # noqa: E722
-                transcript = transcript_list.find_generated_transcript(languages)
-
-            transcript_text = " ".join([entry["text"] for entry in transcript.fetch()])
-            return transcript_text
+            return await call_upstream(
+                "youtube",
+                lambda: self.io.run(
+                    TRANSCRIPT_HOST, self._fetch_transcript_text, video_id, languages
+                ),
+                timeout=self.settings.youtube_timeout_seconds,
+                retries=2,
+            )
 
         except (TranscriptsDisabled, NoTranscriptFound):
             logger.warning(f"No transcript available for video {video_id}")
             return None
+        except (DeadlineExceededError, CircuitOpenError):
+            raise
         except Exception as e:
             logger.error(f"Transcript retrieval failed for {video_id}: {str(e)}")
             raise CustomHTTPException(
@@ -134,11 +360,14 @@ class YouTubeService:
         transcript: str,
         category: str,
         metadata: Optional[dict] = None,
+        minhash: Optional[str] = None,
+        duplicate_of: Optional[str] = None,
+        duplicate_similarity: Optional[float] = None,
     ) -> str:
         if not category:
             raise ValueError("Category is required for transcript organization")
 
-        sanitized_category = re.sub(r"[^a-zA-Z0-9_]", "_", category.lower())
+        sanitized_category = sanitize_category(category)
         collection_name = f"transcripts_{sanitized_category}"
         doc_id = f"{video_id}_{sanitized_category}_transcript"
 
@@ -149,30 +378,50 @@ class YouTubeService:
             category=category,
             sanitized_category=sanitized_category,
             metadata=metadata or {},
+            token_count=estimate_text_tokens(transcript),
+            created_at=datetime.now(timezone.utc),
+            random_key=random.random(),
+            minhash=minhash,
+            duplicate_of=duplicate_of,
+            duplicate_similarity=duplicate_similarity,
         )
 
-        try:
-            await self.db.set_document(
-                collection=collection_name,
-                doc_id=doc_id,
-                data=transcript_data.model_dump(by_alias=True),
+        data = transcript_data.model_dump(by_alias=True)
+        category_ref = self.db.db.collection(collection_name).document(doc_id)
+
+        def write(transaction):
+            existing = category_ref.get(transaction=transaction)
+            old_tokens = (
+                (existing.to_dict().get("token_count") or 0) if existing.exists else 0
             )
 
-            await self.db.set_document(
-                "categories",
-                sanitized_category,
+            transaction.set(category_ref, data)
+            transaction.set(
+                self.db.db.collection("categories").document(sanitized_category),
                 CategoryCreate(name=category).model_dump(by_alias=True),
             )
-
-            await self.db.set_document(
-                collection="transcripts",
-                doc_id=doc_id,
-                data={
-                    **transcript_data.model_dump(by_alias=True),
-                    "collection_ref": collection_name,
-                },
+            transaction.set(
+                self.db.db.collection("transcripts").document(doc_id),
+                {**data, "collection_ref": collection_name},
+            )
+            # Re-processing a video replaces its transcript, it is not a new one
+            self.counters.increment(
+                transaction,
+                category,
+                transcripts=0 if existing.exists else 1,
+                tokens=transcript_data.token_count - old_tokens,
             )
 
+        try:
+            await self.db.run_transaction(write)
+            # A re-saved transcript must not be sampled with its old body;
+            # its pool entry comes back with the next refresh
+            get_sampling_pools().discard(category, doc_id)
+            signature = dedupe.decode(minhash)
+            if signature is not None:
+                self.duplicates.index.add(doc_id, signature)
+            await self._invalidate_validators(video_id, category)
+
             logger.info(f"Transcript saved for video {video_id} in category {category}")
             return doc_id
 
@@ -189,7 +438,7 @@ class YouTubeService:
         self, video_id: str, category: Optional[str] = None
     ) -> Optional[Transcript]:
         if category:
-            sanitized_category = re.sub(r"[^a-zA-Z0-9_]", "_", category.lower())
+            sanitized_category = sanitize_category(category)
             collection_name = f"transcripts_{sanitized_category}"
             doc_id = f"{video_id}_{sanitized_category}_transcript"
             doc_data = await self.db.get_document(collection_name, doc_id)
@@ -207,96 +456,279 @@ class YouTubeService:
     async def process_youtube_video(
         self, url: str, category: Optional[str] = None, auto_categorize: bool = True
     ) -> dict:
+        """Fetch, categorize and store a video's transcript.
+
+        Concurrent calls for the same video with the same options (e.g. two
+        batches containing it) share a single run.
+        """
         try:
             video_id = self.extract_video_id(url)
-            transcript = await self.get_video_transcript(video_id)
+        except NoVideoFoundError:
+            video_id = url  # the run itself reports the invalid URL
 
-            if not transcript:
-                raise NoVideoFoundError(
-                    status_code=404,
-                    error_code="no_transcript",
-                    message="No transcript available for this video",
-                )
+        return await get_single_flight("process_youtube_video").do(
+            (video_id, category, auto_categorize),
+            lambda: self._process_youtube_video(url, category, auto_categorize),
+        )
 
-            if not category and auto_categorize:
+    async def _process_youtube_video(
+        self, url: str, category: Optional[str], auto_categorize: bool
+    ) -> dict:
+        try:
+            video = await self._fetch_for_processing(url)
+            skipped = self._skip_duplicate(video, category)
+            if skipped is not None:
+                return skipped
+
+            auto_generated = auto_categorize and not category
+            if auto_generated:
                 existing_categories = await self.get_existing_categories()
                 category = await self.ChatGPTClient.generate_category(
-                    transcript, existing_categories=existing_categories
+                    video["transcript"], existing_categories=existing_categories
                 )
+            return await self._store_processed(video, category, auto_generated)
 
-            video_info = await self.get_video_info(video_id)
-            await self.save_transcript(
-                video_id=video_id,
-                video_title=video_info["title"],
-                transcript=transcript,
-                category=category,
-                metadata={
-                    "auto_generated_category": auto_categorize and not bool(category)
-                },
-            )
+        except Exception as e:
+            raise _processing_error(e)
 
-            return {
-                "status": "success",
-                "video_id": video_id,
-                "category": category,
-                "auto_generated": auto_categorize and not bool(category),
-            }
+    async def process_youtube_videos(
+        self,
+        videos: List[Tuple[str, Optional[str]]],
+        auto_categorize: bool,
+        item_budget: Optional[float] = None,
+    ) -> List[Union[dict, Exception]]:
+        """Process several ``(url, category)`` pairs for batch processing.
+
+        Like ``process_youtube_video`` for each, except that the videos
+        needing a category get it from a single batched completion. Each
+        step of a video runs within ``item_budget``. Returns a result or
+        the exception per video, in order.
+        """
+
+        async def fetch(url: str) -> dict:
+            with deadline_scope(item_budget, inherit=False):
+                return await self._fetch_for_processing(url)
+
+        fetched = await asyncio.gather(
+            *[fetch(url) for url, _ in videos], return_exceptions=True
+        )
+        categories = [category for _, category in videos]
+        auto_generated = [auto_categorize and not category for category in categories]
+
+        # Duplicates that will be skipped need no category
+        pending = [
+            n
+            for n, video in enumerate(fetched)
+            if auto_generated[n]
+            and not isinstance(video, BaseException)
+            and self._skip_duplicate(video, None) is None
+        ]
+        uncategorized: Dict[int, Exception] = {}
+        if pending:
+            try:
+                # Without the existing categories every video would get a
+                # new one, so a failure here fails these videos instead
+                with deadline_scope(item_budget, inherit=False):
+                    existing_categories = await self.get_existing_categories()
+                with deadline_scope(item_budget, inherit=False):
+                    answers = await self.ChatGPTClient.generate_categories(
+                        [fetched[n]["transcript"] for n in pending],
+                        existing_categories=existing_categories,
+                    )
+                for n, category in zip(pending, answers):
+                    categories[n] = category
+            except Exception as e:
+                uncategorized = {n: e for n in pending}
+
+        async def store(n: int) -> dict:
+            video = fetched[n]
+            if isinstance(video, BaseException):
+                raise video
+            if n in uncategorized:
+                raise uncategorized[n]
+            skipped = self._skip_duplicate(video, categories[n])
+            if skipped is not None:
+                return skipped
+            with deadline_scope(item_budget, inherit=False):
+                return await self._store_processed(
+                    video, categories[n], auto_generated[n]
+                )
 
-        except Exception as e:
-            logger.error(f"Video processing failed: {str(e)}")
-            raise CustomHTTPException(
+        results = await asyncio.gather(
+            *[store(n) for n in range(len(videos))], return_exceptions=True
+        )
+        return [
+            _processing_error(result) if isinstance(result, Exception) else result
+            for result in results
+        ]
+
+    async def _fetch_for_processing(self, url: str) -> dict:
+        """Fetch a video's transcript and check it for near-duplicates.
+
+        Concurrent fetches of the same video, e.g. from overlapping batches,
+        share one run.
+        """
+        video_id = self.extract_video_id(url)
+        return await get_single_flight("fetch_for_processing").do(
+            video_id, lambda: self._fetch_video(video_id)
+        )
+
+    async def _fetch_video(self, video_id: str) -> dict:
+        transcript = await self.get_video_transcript(video_id)
+
+        if not transcript:
+            raise NoVideoFoundError(
                 status_code=404,
-                error_code="processing error",
-                message="Processing error",
-                details="Could not process video",
+                error_code="no_transcript",
+                message="No transcript available for this video",
             )
 
-    async def get_transcripts_by_category(self, category: str, limit: int = 20):
-        sanitized_category = re.sub(r"[^a-zA-Z0-9_]", "_", category.lower())
+        signature = await asyncio.to_thread(dedupe.signature, transcript)
+        duplicate = None
+        if signature is not None and self.settings.duplicate_policy != "off":
+            index = await self.duplicates.ready()
+            # Another category's copy of this same video is not a duplicate
+            duplicate = index.find_duplicate(signature, exclude_prefix=f"{video_id}_")
+
+        return {
+            "video_id": video_id,
+            "transcript": transcript,
+            "signature": signature,
+            "duplicate": duplicate,
+        }
+
+    def _skip_duplicate(self, video: dict, category: Optional[str]) -> Optional[dict]:
+        """The result for a duplicate that is not saved, checked before
+        categorizing so it costs no LLM call"""
+        duplicate = video["duplicate"]
+        if duplicate is None or self.settings.duplicate_policy != "skip":
+            return None
+
+        logger.info(
+            f"Skipped video {video['video_id']}, near-duplicate of {duplicate[0]} "
+            f"({duplicate[1]:.2f})"
+        )
+        return {
+            "status": "duplicate",
+            "video_id": video["video_id"],
+            "category": category,
+            "auto_generated": False,
+            "duplicate_of": duplicate[0],
+            "duplicate_similarity": duplicate[1],
+        }
+
+    async def _store_processed(
+        self, video: dict, category: str, auto_generated: bool
+    ) -> dict:
+        """Save a fetched video; concurrent saves of the same video to the
+        same category share one run"""
+        return await get_single_flight("store_processed").do(
+            (video["video_id"], sanitize_category(category), auto_generated),
+            lambda: self._store_video(video, category, auto_generated),
+        )
+
+    async def _store_video(
+        self, video: dict, category: str, auto_generated: bool
+    ) -> dict:
+        video_id, signature, duplicate = (
+            video["video_id"],
+            video["signature"],
+            video["duplicate"],
+        )
+        video_info = await self.get_video_info(video_id)
+        await self.save_transcript(
+            video_id=video_id,
+            video_title=video_info["title"],
+            transcript=video["transcript"],
+            category=category,
+            metadata={"auto_generated_category": auto_generated},
+            minhash=dedupe.encode(signature) if signature is not None else None,
+            duplicate_of=duplicate[0] if duplicate else None,
+            duplicate_similarity=duplicate[1] if duplicate else None,
+        )
+
+        return {
+            "status": "success",
+            "video_id": video_id,
+            "category": category,
+            "auto_generated": auto_generated,
+            "duplicate_of": duplicate[0] if duplicate else None,
+            "duplicate_similarity": duplicate[1] if duplicate else None,
+        }
+
+    async def get_transcripts_by_category(
+        self, category: str, limit: int = 20
+    ) -> List[TranscriptRecord]:
+        sanitized_category = sanitize_category(category)
         collection_name = f"transcripts_{sanitized_category}"
 
         try:
-            docs = await self.db.get_documents_from_collection(
-                collection_name, limit=limit
+            # Editors opening the same category page share one Firestore read
+            docs = await get_single_flight("transcripts_by_category").do(
+                (collection_name, limit),
+                lambda: self.db.get_documents_from_collection(
+                    collection_name, limit=limit
+                ),
             )
-            return [Transcript(**doc) for doc in docs]
+            return [TranscriptRecord.from_doc(doc) for doc in docs]
         except Exception as e:
             logger.error(f"Error getting transcripts: {str(e)}")
             raise
 
+    def stream_transcripts_by_category(
+        self, category: str, limit: int, include_material: bool = True
+    ) -> AsyncIterator[dict]:
+        """Listing fields of the transcripts, read lazily for streamed
+        responses"""
+        fields = LISTING_FIELDS + ["transcript"] if include_material else LISTING_FIELDS
+        query = self.db.db.collection(category_collection(category)).select(fields)
+        return self.db.stream(query.limit(limit))
+
+    def stream_transcripts_by_search_query(
+        self, query: str, category: str, limit: int
+    ) -> AsyncIterator[dict]:
+        firestore_query = (
+            self.db.db.collection(category_collection(category))
+            .where("transcript", ">=", query)
+            .where("transcript", "<=", query + "\uf8ff")
+            .limit(limit)
+        )
+        return self.db.stream(firestore_query)
+
     async def get_transcripts_by_search_query(
         self, query: str, category: str, limit: int = 20
-    ):
-        sanitized_category = re.sub(r"[^a-zA-Z0-9_]", "_", category.lower())
+    ) -> List[dict]:
+        """Raw documents, validated once when the response is serialized"""
+        sanitized_category = sanitize_category(category)
         collection_name = f"transcripts_{sanitized_category}"
 
         try:
-            docs = await self.db.search(
-                collection=collection_name, field="transcript", value=query
+            return await self.db.search(
+                collection=collection_name,
+                field="transcript",
+                value=query,
+                limit=limit,
             )
-            return [Transcript(**doc) for doc in docs]
         except Exception as e:
             logger.error(f"Error getting transcripts: {str(e)}")
             raise
 
     async def get_existing_categories(self) -> List[str]:
         try:
-            collections = self.db.collections()
+            collections = await self.db.collection_ids("transcripts_")
             return [
-                col.id.replace("transcripts_", "")
-                for col in collections
-                if col.id.startswith("transcripts_")
+                collection.replace("transcripts_", "") for collection in collections
             ]
         except Exception as e:
+            # Raised, as categorizing against no categories would create
+            # duplicates of the existing ones
             logger.error(f"Error fetching categories: {str(e)}")
-            return []
+            raise
 
     async def get_video_info(self, video_id: str) -> dict:
-        youtube = build("youtube", "v3", developerKey=self.settings.youtube_api_key)
-
         try:
-            request = youtube.videos().list(part="snippet", id=video_id)
-            response = request.execute()
+            request = self.api.videos().list(part="snippet", id=video_id)
+            response = await self._execute(request, "videos.list")
             snippet = response["items"][0]["snippet"]
 
             return {
@@ -318,21 +750,48 @@ class YouTubeService:
                 details=str(e),
             )
 
+    async def _invalidate_validators(self, video_id: str, category: str):
+        # Counts in /categories?with_stats=true change with every save too
+        await self.validators.invalidate(
+            transcript_resource(video_id, category),
+            category_resource(category),
+            CATEGORIES_RESOURCE,
+        )
+
     async def delete_transcript(self, video_id: str, category: str) -> None:
         """Delete a transcript from the database"""
         try:
-            # Get the transcript to find its ID
-            transcript = await self.get_transcript(video_id, category)
-            if not transcript:
+            sanitized_category = sanitize_category(category)
+            collection_name = category_collection(category)
+            doc_id = f"{video_id}_{sanitized_category}_transcript"
+            category_ref = self.db.db.collection(collection_name).document(doc_id)
+
+            def remove(transaction) -> bool:
+                existing = category_ref.get(transaction=transaction)
+                if not existing.exists:
+                    return False
+
+                # Delete from both collections
+                global_ref = self.db.db.collection("transcripts").document(doc_id)
+                transaction.delete(category_ref)
+                transaction.delete(global_ref)
+                self.counters.increment(
+                    transaction,
+                    category,
+                    transcripts=-1,
+                    tokens=-(existing.to_dict().get("token_count") or 0),
+                )
+                return True
+
+            if not await self.db.run_transaction(remove):
                 raise NoVideoFoundError(
                     status_code=404,
                     error_code="transcript_not_found",
                     message="Transcript not found",
                 )
-
-            # Delete from both collections
-            await self.db.delete_document("transcripts", transcript.id)
-            await self.db.delete_document(f"transcripts_{category}", transcript.id)
+            get_sampling_pools().discard(category, doc_id)
+            self.duplicates.index.discard(doc_id)
+            await self._invalidate_validators(video_id, category)
 
         except Exception as e:
             logger.error(f"Failed to delete transcript {video_id}: {str(e)}")
@@ -344,6 +803,45 @@ class YouTubeService:
             )
 
 
+def _processing_error(error: Exception) -> Exception:
+    """What a failed video reports: budget and circuit errors as they are,
+    anything else as a generic processing error"""
+    if isinstance(error, (DeadlineExceededError, CircuitOpenError)):
+        return error
+    logger.error(f"Video processing failed: {str(error)}")
+    return CustomHTTPException(
+        status_code=404,
+        error_code="processing error",
+        message="Processing error",
+        details="Could not process video",
+    )
+
+
+@lru_cache
+def get_youtube_api():
+    """Data API client, built once since parsing the discovery document is slow"""
+    return build(
+        "youtube",
+        "v3",
+        developerKey=get_settings().youtube_api_key,
+        cache_discovery=False,
+    )
+
+
+@lru_cache
+def get_youtube_io_pool() -> BlockingPool:
+    """Threads for the blocking YouTube clients, apart from the default
+    executor that Firestore calls use"""
+    settings = get_settings()
+    return BlockingPool(
+        "youtube-io",
+        {
+            TRANSCRIPT_HOST: settings.youtube_transcript_concurrency,
+            DATA_API_HOST: settings.youtube_api_concurrency,
+        },
+    )
+
+
 @lru_cache
 def get_youtube_service() -> YouTubeService:
     return YouTubeService()
@@ -1,25 +1,56 @@
+import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
+from app.core.config import get_settings
 from app.core.database import close_database_connection
+from app.core.jobs import get_admin_job_queue, get_job_queue
+from app.core.warmup import warmup_clients
+from app.core.youtube import get_youtube_io_pool
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.deadline import DeadlineMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.router.admin import register_admin_job_handlers
+from app.router.admin import router as admin_router
 from app.router.category import router as category_router
 from app.router.common import router as common_router
+from app.router.generation import register_job_handlers
 from app.router.generation import router as generation_router
 from app.router.stories import router as story_router
 from app.router.transcripts import router as transcript_router
 
 
+logger = logging.getLogger(__name__)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    try:
+        if get_settings().warmup_on_startup:
+            await warmup_clients()
+    except Exception as e:
+        # Clients are built lazily on first use if warmup could not run
+        logger.error(f"Startup warmup failed: {e}")
+
+    job_queue = get_job_queue()
+    register_job_handlers(job_queue)
+    await job_queue.start()
+    admin_job_queue = get_admin_job_queue()
+    register_admin_job_handlers(admin_job_queue)
+    await admin_job_queue.start()
     yield
     # Shutdown
+    await job_queue.stop()
+    await admin_job_queue.stop()
     await close_database_connection()
+    get_youtube_io_pool().shutdown()
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -28,9 +59,16 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(DeadlineMiddleware)
+# Level 4 is ~4x faster than gzip's default on multi-MB transcript listings
+# for ~20% larger output, see benchmarks/serialization.py
+app.add_middleware(CompressionMiddleware, minimum_size=1024, gzip_level=4)
+# Outermost, so captures include the other middleware
+app.add_middleware(ProfilingMiddleware)
 
 app.include_router(story_router)
 app.include_router(transcript_router)
 app.include_router(generation_router)
 app.include_router(category_router)
 app.include_router(common_router)
+app.include_router(admin_router)
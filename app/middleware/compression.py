@@ -0,0 +1,180 @@
+"""
+Response compression with brotli/gzip negotiation.
+
+Brotli is used when the optional ``brotli`` package is installed and the
+client prefers it; otherwise gzip. Small bodies are sent as-is, and
+server-sent event streams are never compressed so events are not held back.
+"""
+
+import zlib
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+UNCOMPRESSIBLE_TYPES = (b"text/event-stream", b"image/", b"video/", b"audio/")
+
+
+def _accepted_encodings(header: str) -> dict:
+    encodings = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if token:
+            encodings[token.strip().lower()] = q
+    return encodings
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = _accepted_encodings(accept_encoding)
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_q = None, 0.0
+    for encoding in candidates:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressingResponder(
+            send,
+            _Compressor(encoding, self.gzip_level, self.brotli_quality),
+            self.minimum_size,
+        )
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    def __init__(self, send, compressor: _Compressor, minimum_size: int):
+        self._send = send
+        self.compressor = compressor
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.passthrough = False
+        self.started = False
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = dict(message.get("headers", []))
+            content_type = headers.get(b"content-type", b"")
+            self.passthrough = b"content-encoding" in headers or (
+                content_type.startswith(UNCOMPRESSIBLE_TYPES)
+            )
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        if self.passthrough:
+            await self._flush_start()
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self._flush_start()
+                await self._send(message)
+                return
+
+            compressed = self.compressor.compress(body, final=not more_body)
+            self._set_encoding_headers(None if more_body else len(compressed))
+            await self._flush_start()
+            await self._send(
+                {
+                    "type": "http.response.body",
+                    "body": compressed,
+                    "more_body": more_body,
+                }
+            )
+            return
+
+        await self._send(
+            {
+                "type": "http.response.body",
+                "body": self.compressor.compress(body, final=not more_body),
+                "more_body": more_body,
+            }
+        )
+
+    def _set_encoding_headers(self, content_length: Optional[int]):
+        headers = []
+        has_vary = False
+        for name, value in self.start_message.get("headers", []):
+            if name == b"content-length":
+                continue
+            if name == b"vary":
+                has_vary = True
+                if b"accept-encoding" not in value.lower():
+                    value = value + b", Accept-Encoding"
+            headers.append((name, value))
+
+        if not has_vary:
+            headers.append((b"vary", b"Accept-Encoding"))
+        headers.append((b"content-encoding", self.compressor.encoding.encode()))
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode()))
+        self.start_message = {**self.start_message, "headers": headers}
+
+    async def _flush_start(self):
+        if not self.started:
+            self.started = True
+            await self._send(self.start_message)
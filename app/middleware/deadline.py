@@ -0,0 +1,32 @@
+from app.core.config import get_settings
+from app.core.resilience import deadline_scope
+
+BUDGET_HEADER = b"x-request-budget"
+
+
+class DeadlineMiddleware:
+    """Give every request a time budget that upstream calls are bounded by.
+
+    Clients may ask for a tighter budget with an ``X-Request-Budget`` header
+    (seconds); it can never exceed ``request_budget_seconds``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        budget = get_settings().request_budget_seconds
+        for name, value in scope["headers"]:
+            if name == BUDGET_HEADER:
+                try:
+                    budget = min(budget, float(value))
+                except ValueError:
+                    pass
+                break
+
+        with deadline_scope(budget):
+            await self.app(scope, receive, send)
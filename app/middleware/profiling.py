@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import random
+
+from app.core.config import get_settings
+from app.core.profiling import Capture
+from app.utils.security import is_admin_token
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+ADMIN_TOKEN_HEADER = b"x-admin-token"
+CAPTURE_HEADER = b"x-profile-capture"
+EVENT_STREAM = b"text/event-stream"
+
+
+class ProfilingMiddleware:
+    """Profile a request on demand, see app.core.profiling.
+
+    A request is profiled if it carries ``X-Profile: 1`` together with a
+    valid ``X-Admin-Token``, or at random with ``profile_sample_rate``. The
+    capture's name comes back in an ``X-Profile-Capture`` header. Other
+    requests only pay for a header lookup, and nothing at all while no
+    admin token is configured and the sample rate is 0.
+
+    Streamed responses (server-sent events, NDJSON listings) can stay open
+    for as long as the client listens, so their capture stops once the
+    response starts, for event streams, or at the first streamed chunk,
+    rather than holding the one capture slot until the client disconnects.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _trigger(self, scope) -> str:
+        settings = get_settings()
+        if settings.profile_sample_rate and random.random() < (
+            settings.profile_sample_rate
+        ):
+            return "sampled"
+        if not settings.admin_token:
+            return ""
+
+        headers = dict(scope["headers"])
+        if headers.get(PROFILE_HEADER) in (b"1", b"true") and is_admin_token(
+            headers.get(ADMIN_TOKEN_HEADER, b"").decode("latin-1")
+        ):
+            return "header"
+        return ""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trigger = self._trigger(scope)
+        capture = (
+            Capture.begin(scope["method"], scope["path"], trigger) if trigger else None
+        )
+        if capture is None:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = None
+        finished = False
+
+        async def finish():
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            try:
+                await asyncio.to_thread(capture.finish, status_code)
+            except Exception as e:
+                logger.error(f"Could not save profile {capture.name}: {e}")
+
+        async def send_with_capture(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (CAPTURE_HEADER, capture.name.encode()),
+                ]
+            await send(message)
+
+            if message["type"] == "http.response.start":
+                content_type = dict(message["headers"]).get(b"content-type", b"")
+                if content_type.startswith(EVENT_STREAM):
+                    await finish()
+            elif message["type"] == "http.response.body" and message.get("more_body"):
+                await finish()
+
+        try:
+            await self.app(scope, receive, send_with_capture)
+        finally:
+            await finish()
@@ -19,6 +19,7 @@ class Story(BaseModel):
     project_id: Optional[int] = Field(default=None)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: Optional[datetime] = None
+    revision: int = Field(default=0)
 
 
 class StoryCreate(BaseModel):
@@ -32,7 +33,9 @@ class StoryUpdate(BaseModel):
     content: Optional[str] = None
     status: Optional[StoryStatus] = None
     project_id: Optional[int] = None
-    updated_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None  # ignored, set by the server
+    # The revision the edit is based on; if set, a stale edit is rejected
+    revision: Optional[int] = None
 
 
 class StoryFinalizeRequest(BaseModel):
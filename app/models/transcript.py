@@ -1,3 +1,5 @@
+from dataclasses import dataclass
+from datetime import datetime
 from typing import Optional
 from uuid import uuid4
 
@@ -12,6 +14,44 @@ class Transcript(BaseModel):
     category: str = Field(...)
     sanitized_category: str = Field(...)
     metadata: Optional[dict] = None
+    token_count: Optional[int] = None
+    created_at: Optional[datetime] = None
+    # Uniform in [0, 1), used by Database.sample for random selection. Set
+    # when a transcript is written, legacy documents have none until
+    # scripts/backfill_random_keys.py runs
+    random_key: Optional[float] = None
+    # Base64 MinHash signature and near-duplicate flag, see app.core.dedupe
+    minhash: Optional[str] = None
+    duplicate_of: Optional[str] = None
+    duplicate_similarity: Optional[float] = None
+
+
+@dataclass(frozen=True, slots=True)
+class TranscriptRecord:
+    """Read-only view of a stored transcript for internal bulk reads.
+
+    Built straight from Firestore documents, which were validated when they
+    were written, so listing a page does not pay for a pydantic model per
+    document. See benchmarks/models.py.
+    """
+
+    video_id: str
+    title: str
+    category: str
+    transcript: Optional[str]
+    token_count: Optional[int]
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "TranscriptRecord":
+        return cls(
+            video_id=doc.get("video_id", ""),
+            title=doc.get("title", ""),
+            category=doc.get("category", ""),
+            transcript=doc.get("transcript"),
+            token_count=doc.get("token_count"),
+            created_at=doc.get("created_at"),
+        )
 
 
 class TranscriptUpdate(BaseModel):
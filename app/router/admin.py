@@ -0,0 +1,246 @@
+import asyncio
+import json
+from datetime import datetime
+from pathlib import Path
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from app.core.bulk_categories import delete_category, move_category
+from app.core.config import get_settings
+from app.core.corpus import export_corpus, import_corpus
+from app.core.counters import get_category_counters
+from app.core.firebase import Database, get_firestore_db
+from app.core.jobs import JobQueue, get_admin_job_queue
+from app.core.profiling import list_captures, load_capture
+from app.schemas.admin import (
+    AdminJobResponse,
+    CategoryMoveRequest,
+    CorpusExportRequest,
+    CorpusImportRequest,
+)
+from app.utils.categories import sanitize_category
+from app.utils.security import require_admin
+
+router = APIRouter(
+    prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)]
+)
+
+ADMIN_USER = "admin"
+
+
+@router.post(
+    "/corpus/export",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=AdminJobResponse,
+    response_model_exclude_none=True,
+)
+async def start_corpus_export(
+    request: CorpusExportRequest, queue: JobQueue = Depends(get_admin_job_queue)
+):
+    payload = request.model_dump()
+    payload["name"] = request.name or datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    return await queue.submit("corpus-export", payload, ADMIN_USER)
+
+
+@router.post(
+    "/corpus/import",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=AdminJobResponse,
+    response_model_exclude_none=True,
+)
+async def start_corpus_import(
+    request: CorpusImportRequest, queue: JobQueue = Depends(get_admin_job_queue)
+):
+    if not _corpus_path(request.name).is_dir():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Export not found"
+        )
+    return await queue.submit("corpus-import", request.model_dump(), ADMIN_USER)
+
+
+@router.delete(
+    "/categories/{category}",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=AdminJobResponse,
+    response_model_exclude_none=True,
+)
+async def start_category_delete(
+    category: str,
+    db: Database = Depends(get_firestore_db),
+    queue: JobQueue = Depends(get_admin_job_queue),
+):
+    """Delete a category with all its transcripts"""
+    await _require_category(db, category)
+    return await queue.submit("category-delete", {"category": category}, ADMIN_USER)
+
+
+@router.post(
+    "/categories/{category}/rename",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=AdminJobResponse,
+    response_model_exclude_none=True,
+)
+async def start_category_rename(
+    category: str,
+    request: CategoryMoveRequest,
+    db: Database = Depends(get_firestore_db),
+    queue: JobQueue = Depends(get_admin_job_queue),
+):
+    """Move a category's transcripts to a new category"""
+    await _require_category(db, category)
+    _require_distinct(category, request.target)
+    if await _category_exists(db, request.target):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Target category exists, merge into it instead",
+        )
+    return await queue.submit(
+        "category-move", {"category": category, "target": request.target}, ADMIN_USER
+    )
+
+
+@router.post(
+    "/categories/{category}/merge",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=AdminJobResponse,
+    response_model_exclude_none=True,
+)
+async def start_category_merge(
+    category: str,
+    request: CategoryMoveRequest,
+    db: Database = Depends(get_firestore_db),
+    queue: JobQueue = Depends(get_admin_job_queue),
+):
+    """Move a category's transcripts into an existing category; videos the
+    target already has keep the target's transcript"""
+    await _require_category(db, category)
+    _require_distinct(category, request.target)
+    if not await _category_exists(db, request.target):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Target category not found"
+        )
+    return await queue.submit(
+        "category-move", {"category": category, "target": request.target}, ADMIN_USER
+    )
+
+
+@router.get("/profiles")
+async def list_profiles(limit: int = Query(50, ge=1, le=500)):
+    """Request profiles, newest first"""
+    return await asyncio.to_thread(list_captures, limit)
+
+
+@router.get("/profiles/{name}", response_class=PlainTextResponse)
+async def get_profile(name: str):
+    """Folded stacks, for flamegraph.pl or speedscope"""
+    folded = await asyncio.to_thread(load_capture, name, "folded")
+    if folded is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found"
+        )
+    return folded
+
+
+@router.get("/profiles/{name}/summary")
+async def get_profile_summary(name: str):
+    """Duration, status and the hottest functions of a profiled request"""
+    summary = await asyncio.to_thread(load_capture, name, "json")
+    if summary is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found"
+        )
+    return json.loads(summary)
+
+
+@router.get(
+    "/jobs/{job_id}", response_model=AdminJobResponse, response_model_exclude_none=True
+)
+async def get_admin_job(job_id: str, queue: JobQueue = Depends(get_admin_job_queue)):
+    record = await queue.get(job_id)
+    if record is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found or expired"
+        )
+    return record
+
+
+@router.delete(
+    "/jobs/{job_id}", response_model=AdminJobResponse, response_model_exclude_none=True
+)
+async def cancel_admin_job(
+    job_id: str, queue: JobQueue = Depends(get_admin_job_queue)
+):
+    record = await queue.cancel(job_id)
+    if record is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found or expired"
+        )
+    return record
+
+
+async def _category_exists(db: Database, category: str) -> bool:
+    return await db.get_document("categories", sanitize_category(category)) is not None
+
+
+async def _require_category(db: Database, category: str):
+    if not await _category_exists(db, category):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Category not found"
+        )
+
+
+def _require_distinct(category: str, target: str):
+    if sanitize_category(category) == sanitize_category(target):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Both names map to the same category",
+        )
+
+
+def _corpus_path(name: str) -> Path:
+    return Path(get_settings().corpus_dir) / name
+
+
+def register_admin_job_handlers(queue: JobQueue):
+    """Maintenance work run on the admin job queue, see app.core.jobs"""
+
+    async def corpus_export(payload: dict) -> dict:
+        return await export_corpus(
+            get_firestore_db(),
+            str(_corpus_path(payload["name"])),
+            fmt=payload["format"],
+            categories=payload["categories"],
+            chunk_rows=payload["chunk_rows"],
+            progress=queue.report_progress,
+        )
+
+    async def corpus_import(payload: dict) -> dict:
+        return await import_corpus(
+            get_firestore_db(),
+            get_category_counters(),
+            str(_corpus_path(payload["name"])),
+            progress=queue.report_progress,
+        )
+
+    async def category_delete(payload: dict) -> dict:
+        return await delete_category(
+            get_firestore_db(),
+            get_category_counters(),
+            payload["category"],
+            progress=queue.report_progress,
+        )
+
+    async def category_move(payload: dict) -> dict:
+        return await move_category(
+            get_firestore_db(),
+            get_category_counters(),
+            payload["category"],
+            payload["target"],
+            progress=queue.report_progress,
+        )
+
+    queue.register("corpus-export", corpus_export)
+    queue.register("corpus-import", corpus_import)
+    queue.register("category-delete", category_delete)
+    queue.register("category-move", category_move)
@@ -1,20 +1,59 @@
-from typing import List
+from typing import List, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 
+from app.core.counters import CategoryCounters, get_category_counters
 from app.core.firebase import Database, get_firestore_db
-from app.schemas.transcripts import CategoryResponse
+from app.core.validators import (
+    CATEGORIES_RESOURCE,
+    ValidatorCache,
+    get_validator_cache,
+)
+from app.schemas.transcripts import CategoryResponse, CategoryStatsResponse
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
 
-@router.get("/", response_model=List[CategoryResponse])
-async def get_categories(db: Database = Depends(get_firestore_db)):
+@router.get(
+    "/", response_model=Union[List[CategoryStatsResponse], List[CategoryResponse]]
+)
+async def get_categories(
+    with_stats: bool = Query(
+        False, description="Include transcript count, total tokens and last update"
+    ),
+    if_none_match: Optional[str] = Header(None),
+    db: Database = Depends(get_firestore_db),
+    counters: CategoryCounters = Depends(get_category_counters),
+    validators: ValidatorCache = Depends(get_validator_cache),
+):
     try:
+        variant = "stats" if with_stats else ""
+        not_modified = await validators.not_modified(
+            CATEGORIES_RESOURCE, if_none_match, variant
+        )
+        if not_modified is not None:
+            return not_modified
+
+        if with_stats:
+            # One query over the counter shards, no transcript reads
+            return await validators.respond(
+                CATEGORIES_RESOURCE,
+                List[CategoryStatsResponse],
+                await counters.all_stats(),
+                if_none_match,
+                variant,
+            )
+
         categories = await db.query_collection(
             "categories", field="name", operator="!=", value=""
         )
-        return categories
+        return await validators.respond(
+            CATEGORIES_RESOURCE,
+            List[CategoryResponse],
+            categories,
+            if_none_match,
+            variant,
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
@@ -1,9 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 
-from app.core.config import get_settings
+from app.core.chatgpt import ChatGPTClient, get_chatgpt_client
+from app.core.config import SECRET_SETTINGS, get_settings
 from app.core.firebase import App, get_firebase_client
-from app.core.youtube import YouTubeService, get_youtube_service
+from app.core.jobs import JobQueue, get_job_queue
+from app.core.quota import YouTubeQuota, get_youtube_quota
+from app.core.resilience import breaker_stats
+from app.core.singleflight import single_flight_stats
+from app.core.validators import ValidatorCache, get_validator_cache
+from app.core.youtube import YouTubeService, get_youtube_io_pool, get_youtube_service
 from app.schemas.common import ChannelVideosResponse
+from app.utils.errors import QuotaExceededError
 
 router = APIRouter(prefix="", tags=["common"])
 
@@ -22,15 +29,51 @@ async def get_channel_videos(
             channel_id=channel_id, max_results=max_results, order=order
         )
         return {"channel_id": channel_id, "total_videos": len(videos), "videos": videos}
+    except QuotaExceededError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
+@router.get("/youtube/quota")
+async def youtube_quota_usage(quota: YouTubeQuota = Depends(get_youtube_quota)):
+    return await quota.usage()
+
+
 @router.get("/settings")
 async def main():
-    return {"message": "Hello World", "settings": get_settings().model_dump()}
+    settings = get_settings().model_dump(exclude=SECRET_SETTINGS)
+    return {"message": "Hello World", "settings": settings}
 
 
 @router.get("/firebase")
 async def firebase_settings(firebase_client: App = Depends(get_firebase_client)):
     return {"firebase_client_name": firebase_client.project_id}
+
+
+@router.get("/openai/scheduler")
+async def openai_scheduler_stats(chatgpt: ChatGPTClient = Depends(get_chatgpt_client)):
+    return chatgpt.scheduler.stats()
+
+
+@router.get("/health/dependencies")
+async def dependency_health():
+    return {"circuits": breaker_stats(), "youtube_io": get_youtube_io_pool().stats()}
+
+
+@router.get("/health/single-flight")
+async def single_flight_health():
+    return {"groups": single_flight_stats()}
+
+
+@router.get("/health/jobs")
+async def job_queue_health(queue: JobQueue = Depends(get_job_queue)):
+    return queue.stats()
+
+
+@router.get("/health/etag")
+async def conditional_get_stats(
+    validators: ValidatorCache = Depends(get_validator_cache),
+):
+    """304s served, and the Firestore reads and response bytes they saved"""
+    return await validators.stats()
@@ -1,55 +1,43 @@
-import math
-import random
+import hashlib
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
 
 from app.core.chatgpt import ChatGPTClient, get_chatgpt_client
 from app.core.firebase import Database, get_firestore_db
-from app.core.youtube import YouTubeService, get_youtube_service
+from app.core.jobs import JobQueue, get_job_queue
+from app.core.sampling import SamplingPools, get_sampling_pools
+from app.core.state import SharedState, get_shared_state
+from app.core.variations import regenerate_paragraphs, regenerate_variations
+from app.schemas.jobs import JobKind, JobResponse
 from app.schemas.stories import (
     GeneratedStoryResponse,
+    PromptMode,
     StoryGenerationFromTranscriptsRequest,
     StoryGenerationRequest,
     StoryRegenerationFromSynopsis,
+    VariationRegenerationRequest,
 )
 from app.schemas.transcripts import CategoryWeight
 
 router = APIRouter(prefix="/generate", tags=["generation"])
 
+PROMPT_TTL_SECONDS = 24 * 3600
 
-@router.post("/story", response_model=GeneratedStoryResponse)
+
+@router.post(
+    "/story", response_model=GeneratedStoryResponse, response_model_exclude_none=True
+)
 async def generate_story(
     request: StoryGenerationRequest,
-    youtube_service: YouTubeService = Depends(get_youtube_service),
+    pools: SamplingPools = Depends(get_sampling_pools),
     chatgpt: ChatGPTClient = Depends(get_chatgpt_client),
+    state: SharedState = Depends(get_shared_state),
 ):
     try:
-        category_material = {}
-        for category in request.category_weights:
-            transcripts = await youtube_service.get_transcripts_by_category(
-                category.name, limit=request.material_per_category
-            )
-            category_material[category.name] = [t.transcript for t in transcripts]
-
-        prompt = await _create_weighted_prompt(
-            category_material,
-            request.category_weights,
-            request.material_per_category,
-        )
-
-        variations = await chatgpt.generate_story_variations(
-            prompt=prompt,
-            variations=request.variations_count,
-            style=request.style,
-            length=request.length,
-        )
-
-        return {
-            "variations": variations,
-            "prompt": prompt,
-            "category_weights": request.category_weights,
-        }
+        return await _generate_story(request, pools, chatgpt, state)
 
     except Exception as e:
         raise HTTPException(
@@ -57,43 +45,19 @@ async def generate_story(
         )
 
 
-@router.post("/story-from-transcripts", response_model=GeneratedStoryResponse)
+@router.post(
+    "/story-from-transcripts",
+    response_model=GeneratedStoryResponse,
+    response_model_exclude_none=True,
+)
 async def generate_story_from_transcripts(
     request: StoryGenerationFromTranscriptsRequest,
     db: Database = Depends(get_firestore_db),
     chatgpt: ChatGPTClient = Depends(get_chatgpt_client),
+    state: SharedState = Depends(get_shared_state),
 ):
     try:
-        transcripts = []
-        for transcript_id in request.transcript_ids:
-            transcript = await db.get_document("transcripts", transcript_id)
-            if not transcript:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Transcript {transcript_id} not found",
-                )
-            transcripts.append(transcript["transcript"])
-
-        combined_text = " ".join(transcripts)
-        prompt = f"""
-        Create a cohesive story using the following content:
-        {combined_text}
-
-        Style: {request.style}
-        Length: {request.length} words
-        """
-
-        variations = await chatgpt.generate_story_variations(
-            prompt=prompt,
-            variations=request.variations_count,
-            style=request.style,
-            length=request.length,
-        )
-
-        return {
-            "variations": variations,
-            "transcript_ids": request.transcript_ids,
-        }
+        return await _generate_story_from_transcripts(request, db, chatgpt, state)
 
     except Exception as e:
         raise HTTPException(
@@ -104,47 +68,337 @@ async def generate_story_from_transcripts(
 @router.post("/story-from-synopsis", response_model=GeneratedStoryResponse)
 async def generated_story_from_synopsis(
     request: StoryRegenerationFromSynopsis,
-    db: Database = Depends(get_firestore_db),
     chatgpt: ChatGPTClient = Depends(get_chatgpt_client),
 ):
     try:
-        prompt = f"""
-        Create a cohesive story using the following content:
-        {request.story}
-
-        Style: {request.style}
-        Length: {request.length} words
-        """
-
-        variations = await chatgpt.regenerate_from_synopsis(
-            prompt=prompt,
-            variations=request.variations_count,
-            style=request.style,
-            length=request.length,
+        return await _generate_story_from_synopsis(request, chatgpt)
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
         )
 
-        return {
-            "variations": variations,
-        }
 
+@router.post("/story-from-synopsis/partial", response_model=GeneratedStoryResponse)
+async def regenerate_story_variations(
+    request: VariationRegenerationRequest,
+    chatgpt: ChatGPTClient = Depends(get_chatgpt_client),
+):
+    """Regenerate only the selected variations, or a paragraph range of one,
+    and return every variation, the others unchanged"""
+    _check_regeneration(request)
+    try:
+        return await _regenerate_story_variations(request, chatgpt)
+
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
         )
 
 
+@router.post(
+    "/jobs/story",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=JobResponse,
+    response_model_exclude_none=True,
+)
+async def submit_story_job(
+    request: StoryGenerationRequest,
+    http_request: Request,
+    queue: JobQueue = Depends(get_job_queue),
+):
+    return await _submit_job(queue, JobKind.STORY, request, http_request)
+
+
+@router.post(
+    "/jobs/story-from-transcripts",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=JobResponse,
+    response_model_exclude_none=True,
+)
+async def submit_story_from_transcripts_job(
+    request: StoryGenerationFromTranscriptsRequest,
+    http_request: Request,
+    queue: JobQueue = Depends(get_job_queue),
+):
+    return await _submit_job(
+        queue, JobKind.STORY_FROM_TRANSCRIPTS, request, http_request
+    )
+
+
+@router.post(
+    "/jobs/story-from-synopsis",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=JobResponse,
+    response_model_exclude_none=True,
+)
+async def submit_story_from_synopsis_job(
+    request: StoryRegenerationFromSynopsis,
+    http_request: Request,
+    queue: JobQueue = Depends(get_job_queue),
+):
+    return await _submit_job(queue, JobKind.STORY_FROM_SYNOPSIS, request, http_request)
+
+
+@router.get(
+    "/jobs/{job_id}", response_model=JobResponse, response_model_exclude_none=True
+)
+async def get_job(job_id: str, queue: JobQueue = Depends(get_job_queue)):
+    record = await queue.get(job_id)
+    if record is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found or expired"
+        )
+    return record
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, queue: JobQueue = Depends(get_job_queue)):
+    """Server-sent events with the job record on every status change"""
+    if await queue.get(job_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found or expired"
+        )
+
+    async def events():
+        async for record in queue.events(job_id):
+            data = JobResponse.model_validate(record).model_dump_json(
+                exclude_none=True
+            )
+            yield f"event: {record['status']}\ndata: {data}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@router.delete(
+    "/jobs/{job_id}", response_model=JobResponse, response_model_exclude_none=True
+)
+async def cancel_job(job_id: str, queue: JobQueue = Depends(get_job_queue)):
+    record = await queue.cancel(job_id)
+    if record is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found or expired"
+        )
+    return record
+
+
+@router.get("/prompts/{prompt_ref}", response_class=PlainTextResponse)
+async def get_prompt(prompt_ref: str, state: SharedState = Depends(get_shared_state)):
+    prompt = await state.get(f"prompt:{prompt_ref}")
+    if prompt is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Prompt not found or expired"
+        )
+    return prompt
+
+
+async def _prompt_fields(prompt: str, mode: PromptMode, state: SharedState) -> dict:
+    """Response fields for the prompt; it can be hundreds of KB of transcript
+    text, so by default it is left out of the response."""
+    if mode == PromptMode.INLINE:
+        return {"prompt": prompt}
+    if mode == PromptMode.REFERENCE:
+        # Content-addressed, so regenerating from the same material is stored once
+        prompt_ref = hashlib.sha256(prompt.encode()).hexdigest()[:32]
+        await state.set(f"prompt:{prompt_ref}", prompt, ttl=PROMPT_TTL_SECONDS)
+        return {"prompt_ref": prompt_ref}
+    return {}
+
+
+def _job_user(request: Request) -> str:
+    """Who a job is counted against for the per-user concurrency limit"""
+    user = request.headers.get("X-User-Id")
+    if user:
+        return user
+    return request.client.host if request.client else "anonymous"
+
+
+async def _submit_job(
+    queue: JobQueue, kind: JobKind, request: BaseModel, http_request: Request
+) -> dict:
+    return await queue.submit(
+        kind.value, request.model_dump(mode="json"), _job_user(http_request)
+    )
+
+
+def register_job_handlers(queue: JobQueue):
+    """Run the generation endpoints' work as queued jobs, see app.core.jobs"""
+
+    async def story(payload: dict) -> dict:
+        result = await _generate_story(
+            StoryGenerationRequest.model_validate(payload),
+            get_sampling_pools(),
+            get_chatgpt_client(),
+            get_shared_state(),
+        )
+        return _job_result(result)
+
+    async def story_from_transcripts(payload: dict) -> dict:
+        result = await _generate_story_from_transcripts(
+            StoryGenerationFromTranscriptsRequest.model_validate(payload),
+            get_firestore_db(),
+            get_chatgpt_client(),
+            get_shared_state(),
+        )
+        return _job_result(result)
+
+    async def story_from_synopsis(payload: dict) -> dict:
+        result = await _generate_story_from_synopsis(
+            StoryRegenerationFromSynopsis.model_validate(payload),
+            get_chatgpt_client(),
+        )
+        return _job_result(result)
+
+    queue.register(JobKind.STORY.value, story)
+    queue.register(JobKind.STORY_FROM_TRANSCRIPTS.value, story_from_transcripts)
+    queue.register(JobKind.STORY_FROM_SYNOPSIS.value, story_from_synopsis)
+
+
+def _job_result(result: dict) -> dict:
+    return GeneratedStoryResponse(**result).model_dump(mode="json", exclude_none=True)
+
+
+async def _generate_story(
+    request: StoryGenerationRequest,
+    pools: SamplingPools,
+    chatgpt: ChatGPTClient,
+    state: SharedState,
+) -> dict:
+    prompt = await _create_weighted_prompt(
+        pools,
+        request.category_weights,
+        request.material_per_category,
+        request.dedupe_material,
+    )
+
+    variations = await chatgpt.generate_story_variations(
+        prompt=prompt,
+        variations=request.variations_count,
+        style=request.style,
+        length=request.length,
+    )
+
+    return {
+        "variations": variations,
+        **await _prompt_fields(prompt, request.prompt_mode, state),
+    }
+
+
+async def _generate_story_from_transcripts(
+    request: StoryGenerationFromTranscriptsRequest,
+    db: Database,
+    chatgpt: ChatGPTClient,
+    state: SharedState,
+) -> dict:
+    transcripts = []
+    for transcript_id in request.transcript_ids:
+        transcript = await db.get_document("transcripts", transcript_id)
+        if not transcript:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Transcript {transcript_id} not found",
+            )
+        transcripts.append(transcript["transcript"])
+
+    combined_text = " ".join(transcripts)
+    prompt = f"""
+    Create a cohesive story using the following content:
+    {combined_text}
+
+    Style: {request.style}
+    Length: {request.length} words
+    """
+
+    variations = await chatgpt.generate_story_variations(
+        prompt=prompt,
+        variations=request.variations_count,
+        style=request.style,
+        length=request.length,
+    )
+
+    return {
+        "variations": variations,
+        **await _prompt_fields(prompt, request.prompt_mode, state),
+    }
+
+
+async def _generate_story_from_synopsis(
+    request: StoryRegenerationFromSynopsis, chatgpt: ChatGPTClient
+) -> dict:
+    prompt = f"""
+    Create a cohesive story using the following content:
+    {request.story}
+
+    Style: {request.style}
+    Length: {request.length} words
+    """
+
+    variations = await chatgpt.regenerate_from_synopsis(
+        prompt=prompt,
+        variations=request.variations_count,
+        style=request.style,
+        length=request.length,
+    )
+
+    return {
+        "variations": variations,
+    }
+
+
+def _check_regeneration(request: VariationRegenerationRequest):
+    invalid = [n for n in request.indices if not 0 <= n < len(request.variations)]
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No variations at indices {invalid}",
+        )
+    if request.paragraphs is not None and len(set(request.indices)) != 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A paragraph range applies to exactly one variation",
+        )
+
+
+async def _regenerate_story_variations(
+    request: VariationRegenerationRequest, chatgpt: ChatGPTClient
+) -> dict:
+    if request.paragraphs is None:
+        variations = await regenerate_variations(
+            chatgpt,
+            request.story,
+            request.variations,
+            request.indices,
+            request.style,
+            request.length,
+        )
+        return {"variations": variations}
+
+    index = request.indices[0]
+    variations = list(request.variations)
+    variations[index] = await regenerate_paragraphs(
+        chatgpt,
+        request.story,
+        variations[index],
+        request.paragraphs.start,
+        request.paragraphs.stop,
+        request.style,
+    )
+    return {"variations": variations}
+
+
 async def _create_weighted_prompt(
-    material: dict, weights: List[CategoryWeight], material_per_category: int
+    pools: SamplingPools,
+    weights: List[CategoryWeight],
+    material_per_category: int,
+    dedupe_material: bool = False,
 ):
+    material = await pools.sample_material(
+        weights, material_per_category, dedupe_material
+    )
+
     combined_prompt = []
-    size = material_per_category * len(weights)
     for item in weights:
-        category, weight = item.name, item.weight
-        sample_size = (
-            len(material[category])
-            if len(material[category]) <= material_per_category
-            else math.floor(weight * size) - 1
-        )
-
-        combined_prompt.extend(random.sample(material[category], sample_size))
+        combined_prompt.extend(material[item.name])
     return " ".join(combined_prompt)
@@ -1,10 +1,13 @@
 from datetime import datetime
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 from pydantic import BaseModel
 
+from app.core import stories
 from app.core.database import DatabaseService, TaskCreateRequest, get_database_service
 from app.core.firebase import Database, get_firestore_db
+from app.core.validators import ValidatorCache, get_validator_cache, story_resource
 from app.models.stories import (
     Story,
     StoryCreate,
@@ -12,7 +15,7 @@ from app.models.stories import (
     StoryStatus,
     StoryUpdate,
 )
-from app.schemas.stories import StoryResponse
+from app.schemas.stories import StoryResponse, StoryRevisionResponse
 
 
 class ProjectResponse(BaseModel):
@@ -48,35 +51,79 @@ async def create_story(story: StoryCreate, db: Database = Depends(get_firestore_
 
 
 @router.get("/{story_id}", response_model=StoryResponse)
-async def get_story(story_id: str, db: Database = Depends(get_firestore_db)):
+async def get_story(
+    story_id: str,
+    if_none_match: Optional[str] = Header(None),
+    db: Database = Depends(get_firestore_db),
+    validators: ValidatorCache = Depends(get_validator_cache),
+):
+    resource = story_resource(story_id)
+    not_modified = await validators.not_modified(resource, if_none_match)
+    if not_modified is not None:
+        return not_modified
+
     story_data = await db.get_document("stories", story_id)
     if not story_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Story not found"
         )
-    return Story(**story_data)
+    return await validators.respond(
+        resource, StoryResponse, Story(**story_data), if_none_match
+    )
 
 
 @router.put("/{story_id}", response_model=StoryResponse)
 async def update_story(
-    story_id: str, update_data: StoryUpdate, db: Database = Depends(get_firestore_db)
+    story_id: str,
+    update_data: StoryUpdate,
+    db: Database = Depends(get_firestore_db),
+    validators: ValidatorCache = Depends(get_validator_cache),
 ):
-    existing = await db.get_document("stories", story_id)
-    if not existing:
+    """Update the given fields only. Pass the ``revision`` the edit is based
+    on to have it rejected with 412 if someone else saved in the meantime."""
+    changes = update_data.model_dump(
+        exclude_unset=True, exclude={"revision", "updated_at"}
+    )
+    updated = await stories.update_story(
+        db, story_id, changes, expected_revision=update_data.revision
+    )
+    await validators.invalidate(story_resource(story_id))
+    if updated is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Story not found"
         )
+    return Story(**updated)
 
-    updated_story = Story(**existing).model_copy(
-        update=update_data.model_dump(exclude_unset=True)
-    )
-    await db.set_document("stories", story_id, updated_story.model_dump(by_alias=True))
-    return updated_story
+
+@router.get("/{story_id}/revisions", response_model=list[StoryRevisionResponse])
+async def list_story_revisions(
+    story_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    db: Database = Depends(get_firestore_db),
+):
+    return await stories.list_revisions(db, story_id, limit)
+
+
+@router.get("/{story_id}/revisions/{revision}", response_model=StoryResponse)
+async def get_story_revision(
+    story_id: str, revision: int, db: Database = Depends(get_firestore_db)
+):
+    story_data = await stories.story_at_revision(db, story_id, revision)
+    if story_data is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Revision not found"
+        )
+    return Story(**story_data)
 
 
 @router.delete("/{story_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_story(story_id: str, db: Database = Depends(get_firestore_db)):
+async def delete_story(
+    story_id: str,
+    db: Database = Depends(get_firestore_db),
+    validators: ValidatorCache = Depends(get_validator_cache),
+):
     success = await db.delete_document("stories", story_id)
+    await validators.invalidate(story_resource(story_id))
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Story not found"
@@ -90,6 +137,7 @@ async def finalize_story(
     finalize_request: StoryFinalizeRequest,
     db: Database = Depends(get_firestore_db),
     db_service: DatabaseService = Depends(get_database_service),
+    validators: ValidatorCache = Depends(get_validator_cache),
 ):
     """Finalize a story and create a task in the channel management project"""
     try:
@@ -140,17 +188,14 @@ async def finalize_story(
         await db_service.create_task(task_data)
 
         # Update story status to finalized
-        updated_story = story.model_copy(
-            update={
-                "status": StoryStatus.FINALIZED,
-                "project_id": project.id,
-                "updated_at": datetime.utcnow(),
-            }
+        updated = await stories.update_story(
+            db,
+            story_id,
+            {"status": StoryStatus.FINALIZED, "project_id": project.id},
         )
+        await validators.invalidate(story_resource(story_id))
 
-        await db.set_document("stories", story_id, updated_story.model_dump())
-
-        return updated_story
+        return Story(**updated)
 
     except HTTPException:
         raise
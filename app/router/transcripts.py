@@ -1,24 +1,130 @@
 import uuid
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional, Sequence
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+import orjson
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    status,
+)
+from fastapi.responses import Response, StreamingResponse
+from pydantic import ValidationError
 
+from app.core.batches import (
+    BATCH_PAGE_SIZE,
+    WATCH_URL,
+    BatchProgress,
+    BatchStore,
+    UploadFormat,
+    read_upload,
+)
+from app.core.config import get_settings
+from app.core.state import SharedState, get_shared_state
+from app.core.validators import (
+    ValidatorCache,
+    category_resource,
+    get_validator_cache,
+    serialize,
+    transcript_resource,
+)
 from app.core.youtube import YouTubeService, get_youtube_service
+from app.utils.streaming import StreamFormat, stream_rows
 from app.schemas.transcripts import (
     BatchProcessRequest,
     BatchProcessResponse,
     BatchStatusResponse,
+    BatchSummary,
+    BatchUploadResponse,
     CategoryMaterialResponse,
     ProcessingStatus,
+    TranscriptListItem,
     TranscriptProcessResponse,
     TranscriptResponse,
+    VideoProcessingItem,
 )
 
 router = APIRouter(prefix="/transcripts", tags=["transcripts"])
 
-# In-memory storage for batch processing (in production, use Redis or database)
-batch_storage = {}
+
+def _new_summary(batch_id: str, total_videos: int) -> BatchSummary:
+    now = datetime.utcnow().isoformat()
+    return BatchSummary(
+        batch_id=batch_id,
+        status=ProcessingStatus.PENDING,
+        total_videos=total_videos,
+        processed_count=0,
+        failed_count=0,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+async def _record_changes(
+    store: BatchStore,
+    progress: BatchProgress,
+    summary: BatchSummary,
+    page: Optional[int] = None,
+    items: Optional[List[dict]] = None,
+    positions: Sequence[int] = (),
+):
+    """Save the batch, then publish what changed: the videos at
+    ``positions`` of ``page`` or, without a page, the batch status"""
+    summary.updated_at = datetime.utcnow().isoformat()
+    if page is not None:
+        await store.save_page(summary.batch_id, page, items)
+    await store.save_summary(summary.model_dump(mode="json"))
+
+    delta = {
+        "type": "batch",
+        "batch_status": summary.status.value,
+        "processed_count": summary.processed_count,
+        "failed_count": summary.failed_count,
+        "updated_at": summary.updated_at,
+    }
+    if page is None:
+        await progress.publish(summary.batch_id, delta)
+    for position in positions:
+        item = items[position]
+        await progress.publish(
+            summary.batch_id,
+            {
+                **delta,
+                "type": "video",
+                "index": page * BATCH_PAGE_SIZE + position,
+                "video": {
+                    field: item[field]
+                    for field in ("video_id", "status", "category", "error_message")
+                },
+            },
+        )
+
+
+def _upload_item(number: int, row: dict) -> dict:
+    """A video of an uploaded batch; ``video_id`` or ``url`` is required"""
+    video_id, url = row.get("video_id") or None, row.get("url") or None
+    if video_id is None:
+        if url is None:
+            raise ValueError(f"Line {number} has neither a video_id nor a url")
+        try:
+            video_id = YouTubeService.extract_video_id(url)
+        except Exception:
+            raise ValueError(f"Line {number} has no YouTube video URL") from None
+    try:
+        item = VideoProcessingItem(
+            video_id=video_id,
+            title=row.get("title") or "",
+            url=url or WATCH_URL.format(video_id),
+            category=row.get("category") or None,
+        )
+    except ValidationError as e:
+        raise ValueError(f"Line {number}: {e}") from e
+    return item.model_dump(mode="json")
 
 
 @router.post("/process", response_model=TranscriptProcessResponse)
@@ -42,27 +148,28 @@ async def batch_process_videos(
     request: BatchProcessRequest,
     background_tasks: BackgroundTasks,
     youtube_service: YouTubeService = Depends(get_youtube_service),
+    state: SharedState = Depends(get_shared_state),
 ):
     try:
         batch_id = str(uuid.uuid4())
+        store = BatchStore(state)
 
-        # Initialize batch status
-        batch_status = BatchStatusResponse(
-            batch_id=batch_id,
-            status=ProcessingStatus.PENDING,
-            total_videos=len(request.videos),
-            processed_count=0,
-            failed_count=0,
-            videos=request.videos,
-            created_at=datetime.utcnow().isoformat(),
-            updated_at=datetime.utcnow().isoformat(),
+        writer = store.writer(batch_id)
+        for video in request.videos:
+            await writer.append(video.model_dump(mode="json"))
+        await writer.close()
+        await store.save_summary(
+            _new_summary(batch_id, len(request.videos)).model_dump(mode="json")
         )
 
-        batch_storage[batch_id] = batch_status
-
         # Start background processing
         background_tasks.add_task(
-            process_videos_background, batch_id, request, youtube_service
+            process_videos_background,
+            batch_id,
+            request.auto_categorize,
+            request.default_category,
+            youtube_service,
+            state,
         )
 
         return BatchProcessResponse(
@@ -79,87 +186,279 @@ async def batch_process_videos(
         )
 
 
+@router.post(
+    "/batch-upload",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=BatchUploadResponse,
+)
+async def upload_batch(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    fmt: Optional[UploadFormat] = Query(
+        None,
+        alias="format",
+        description="Defaults to csv for a text/csv body, else ndjson",
+    ),
+    auto_categorize: bool = Query(True, description="Enable AI category generation"),
+    default_category: Optional[str] = Query(None),
+    youtube_service: YouTubeService = Depends(get_youtube_service),
+    state: SharedState = Depends(get_shared_state),
+):
+    """Start a batch from a streamed NDJSON or CSV body, one video per line
+    with ``video_id`` and/or ``url`` plus optional ``title`` and
+    ``category``. The body is read as it arrives and stored a page at a
+    time, so uploads of any size use the same memory."""
+    if fmt is None:
+        content_type = request.headers.get("content-type", "")
+        fmt = UploadFormat.CSV if "csv" in content_type else UploadFormat.NDJSON
+    max_videos = get_settings().batch_max_videos
+
+    batch_id = str(uuid.uuid4())
+    store = BatchStore(state)
+    writer = store.writer(batch_id)
+    try:
+        async for number, row in read_upload(request.stream(), fmt):
+            if writer.count >= max_videos:
+                raise ValueError(f"Batches are limited to {max_videos} videos")
+            await writer.append(_upload_item(number, row))
+        await writer.close()
+        if not writer.count:
+            raise ValueError("Upload has no videos")
+    except ValueError as e:
+        await writer.discard()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception:
+        await writer.discard()  # e.g. the client went away mid-upload
+        raise
+
+    await store.save_summary(
+        _new_summary(batch_id, writer.count).model_dump(mode="json")
+    )
+    background_tasks.add_task(
+        process_videos_background,
+        batch_id,
+        auto_categorize,
+        default_category,
+        youtube_service,
+        state,
+    )
+    return BatchUploadResponse(batch_id=batch_id, total_videos=writer.count)
+
+
 @router.get("/batch-status/{batch_id}", response_model=BatchStatusResponse)
-async def get_batch_status(batch_id: str):
-    if batch_id not in batch_storage:
+async def get_batch_status(
+    batch_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(BATCH_PAGE_SIZE, ge=1, le=BATCH_PAGE_SIZE),
+    state: SharedState = Depends(get_shared_state),
+):
+    """The batch's counters and a page of its videos from ``offset``;
+    ``next_offset`` is where the next page starts, if there is one"""
+    store = BatchStore(state)
+    summary = await store.get_summary(batch_id)
+    if summary is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Batch not found"
         )
 
-    return batch_storage[batch_id]
+    videos = await store.items(batch_id, offset, limit)
+    end = offset + len(videos)
+    return {
+        **summary,
+        "videos": videos,
+        "offset": offset,
+        "next_offset": end if end < summary["total_videos"] else None,
+    }
 
 
-async def process_videos_background(
-    batch_id: str, request: BatchProcessRequest, youtube_service: YouTubeService
+@router.get("/batch-status/{batch_id}/events")
+async def stream_batch_events(
+    batch_id: str,
+    after: Optional[int] = Query(
+        None, ge=0, description="Resume after this sequence number"
+    ),
+    last_event_id: Optional[str] = Header(None),
+    state: SharedState = Depends(get_shared_state),
 ):
-    """Background task to process videos in batch"""
-    batch_status = batch_storage[batch_id]
-    batch_status.status = ProcessingStatus.PROCESSING
-    batch_status.updated_at = datetime.utcnow().isoformat()
+    """Server-sent events with each change to the batch, until it completes.
 
-    for video_item in batch_status.videos:
-        try:
-            video_item.status = ProcessingStatus.PROCESSING
-            batch_status.updated_at = datetime.utcnow().isoformat()
+    The first event is a snapshot of the batch summary, then every
+    change is a delta for one video (or for the batch status) with a
+    sequence number as its event ID. Reconnecting with ``Last-Event-ID``
+    (browsers do this automatically) or ``after`` resumes after it.
+    """
+    store = BatchStore(state)
+    if await store.get_summary(batch_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Batch not found"
+        )
+    if after is None and last_event_id and last_event_id.isdigit():
+        after = int(last_event_id)
 
-            # Construct YouTube URL from video_id
-            youtube_url = f"https://www.youtube.com/watch?v={video_item.video_id}"
+    async def events():
+        async for event in BatchProgress(state).events(
+            batch_id, after, lambda: store.get_summary(batch_id)
+        ):
+            data = orjson.dumps(event).decode()
+            yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {data}\n\n"
 
-            # Process the video
-            result = await youtube_service.process_youtube_video(
-                youtube_url,
-                category=video_item.category or request.default_category,
-                auto_categorize=request.auto_categorize,
-            )
+    return StreamingResponse(events(), media_type="text/event-stream")
 
-            video_item.status = ProcessingStatus.COMPLETED
-            # result may be a dict, so use .get() to access 'category' safely
-            video_item.category = (
-                result.get("category")
-                if isinstance(result, dict)
-                else getattr(result, "category", None)
-            )
-            batch_status.processed_count += 1
 
-        except Exception as e:
-            video_item.status = ProcessingStatus.FAILED
-            video_item.error_message = str(e)
-            batch_status.failed_count += 1
+async def process_videos_background(
+    batch_id: str,
+    auto_categorize: bool,
+    default_category: Optional[str],
+    youtube_service: YouTubeService,
+    state: SharedState,
+):
+    """Background task to process videos in batch"""
+    settings = get_settings()
+    store = BatchStore(state)
+    progress = BatchProgress(state)
+    summary = BatchSummary.model_validate(await store.get_summary(batch_id))
+    summary.status = ProcessingStatus.PROCESSING
+    await _record_changes(store, progress, summary)
+
+    # One page of videos is loaded at a time. Its videos are processed a
+    # group at a time so their categories come from one batched completion
+    # instead of one call per video
+    size = settings.categorize_batch_size
+    pages = -(-summary.total_videos // BATCH_PAGE_SIZE)
+    for page in range(pages):
+        items = await store.get_page(batch_id, page)
+        for start in range(0, len(items), size):
+            positions = range(start, min(start + size, len(items)))
+            for position in positions:
+                items[position]["status"] = ProcessingStatus.PROCESSING.value
+            await _record_changes(store, progress, summary, page, items, positions)
+
+            # Each video gets its own budget instead of the (long finished)
+            # request's, so a hung upstream call only costs this one item
+            results = await youtube_service.process_youtube_videos(
+                [
+                    (
+                        WATCH_URL.format(items[position]["video_id"]),
+                        items[position]["category"] or default_category,
+                    )
+                    for position in positions
+                ],
+                auto_categorize=auto_categorize,
+                item_budget=settings.batch_item_budget_seconds,
+            )
 
-        batch_status.updated_at = datetime.utcnow().isoformat()
+            for position, result in zip(positions, results):
+                item = items[position]
+                if isinstance(result, Exception):
+                    item["status"] = ProcessingStatus.FAILED.value
+                    item["error_message"] = str(result)
+                    summary.failed_count += 1
+                else:
+                    item["status"] = ProcessingStatus.COMPLETED.value
+                    item["category"] = result.get("category")
+                    summary.processed_count += 1
+            await _record_changes(store, progress, summary, page, items, positions)
 
     # Mark batch as completed
-    batch_status.status = ProcessingStatus.COMPLETED
-    batch_status.updated_at = datetime.utcnow().isoformat()
+    summary.status = ProcessingStatus.COMPLETED
+    await _record_changes(store, progress, summary)
 
 
 @router.get("/{video_id}", response_model=TranscriptResponse)
 async def get_transcript(
     video_id: str,
     category: str,
+    if_none_match: Optional[str] = Header(None),
     youtube_service: YouTubeService = Depends(get_youtube_service),
+    validators: ValidatorCache = Depends(get_validator_cache),
 ):
+    resource = transcript_resource(video_id, category)
+    not_modified = await validators.not_modified(resource, if_none_match)
+    if not_modified is not None:
+        return not_modified
+
     transcript = await youtube_service.get_transcript(video_id, category)
     if not transcript:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Transcript not found"
         )
-    return transcript
+    return await validators.respond(
+        resource, TranscriptResponse, transcript, if_none_match
+    )
 
 
 @router.get("/by-category/{category}", response_model=CategoryMaterialResponse)
 async def get_category_material(
     category: str,
     limit: int = 20,
+    include_material: bool = Query(
+        True, description="Set to false to list video IDs without transcript bodies"
+    ),
+    stream: Optional[StreamFormat] = Query(
+        None,
+        description="Stream the transcripts one by one instead, as NDJSON or a "
+        "JSON array, for large limits",
+    ),
+    if_none_match: Optional[str] = Header(None),
     youtube_service: YouTubeService = Depends(get_youtube_service),
+    validators: ValidatorCache = Depends(get_validator_cache),
 ):
     try:
+        if stream is not None:
+            return await stream_rows(
+                youtube_service.stream_transcripts_by_category(
+                    category, limit, include_material=include_material
+                ),
+                stream,
+                TranscriptListItem,
+            )
+
+        resource = category_resource(category)
+        variant = f"{category}:{limit}:{include_material}"
+        not_modified = await validators.not_modified(resource, if_none_match, variant)
+        if not_modified is not None:
+            return not_modified
+
         result = await youtube_service.get_transcripts_by_category(category, limit)
-        return CategoryMaterialResponse(
-            category=category,
-            total_transcripts=len(result),
-            material=[t.transcript for t in result],
-            video_ids=[t.video_id for t in result],
+        return await validators.respond(
+            resource,
+            CategoryMaterialResponse,
+            CategoryMaterialResponse(
+                category=category,
+                total_transcripts=len(result),
+                material=[t.transcript for t in result] if include_material else None,
+                video_ids=[t.video_id for t in result],
+            ),
+            if_none_match,
+            variant,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/search/{category}", response_model=List[TranscriptResponse])
+async def search_transcripts(
+    category: str,
+    q: str = Query(..., min_length=1, description="Transcript text prefix"),
+    limit: int = Query(20, ge=1),
+    stream: Optional[StreamFormat] = Query(
+        None, description="Stream the matches as NDJSON or a JSON array"
+    ),
+    youtube_service: YouTubeService = Depends(get_youtube_service),
+):
+    try:
+        if stream is not None:
+            return await stream_rows(
+                youtube_service.stream_transcripts_by_search_query(q, category, limit),
+                stream,
+                TranscriptResponse,
+            )
+
+        docs = await youtube_service.get_transcripts_by_search_query(
+            q, category, limit
+        )
+        return Response(
+            serialize(List[TranscriptResponse], docs), media_type="application/json"
         )
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -0,0 +1,40 @@
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+from app.schemas.jobs import JobStatus
+
+# A single path component under corpus_dir
+EXPORT_NAME_PATTERN = r"^[A-Za-z0-9_-][A-Za-z0-9_.-]*$"
+
+
+class AdminJobResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: JobStatus
+    created_at: str
+    updated_at: str
+    started_at: Optional[str] = None
+    progress: Optional[dict] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+
+
+class CorpusExportRequest(BaseModel):
+    name: Optional[str] = Field(
+        None,
+        pattern=EXPORT_NAME_PATTERN,
+        description="Export directory; defaults to a timestamp. Reuse a name "
+        "to resume an interrupted export.",
+    )
+    format: Literal["ndjson", "parquet"] = "ndjson"
+    categories: Optional[List[str]] = None
+    chunk_rows: int = Field(10000, ge=100, le=100000)
+
+
+class CorpusImportRequest(BaseModel):
+    name: str = Field(..., pattern=EXPORT_NAME_PATTERN)
+
+
+class CategoryMoveRequest(BaseModel):
+    target: str = Field(..., min_length=1, description="Category to move into")
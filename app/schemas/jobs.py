@@ -0,0 +1,31 @@
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel
+
+from app.schemas.stories import GeneratedStoryResponse
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class JobKind(str, Enum):
+    STORY = "story"
+    STORY_FROM_TRANSCRIPTS = "story-from-transcripts"
+    STORY_FROM_SYNOPSIS = "story-from-synopsis"
+
+
+class JobResponse(BaseModel):
+    job_id: str
+    kind: JobKind
+    status: JobStatus
+    created_at: str
+    updated_at: str
+    started_at: Optional[str] = None
+    result: Optional[GeneratedStoryResponse] = None
+    error: Optional[str] = None
@@ -1,5 +1,6 @@
 from datetime import datetime
-from typing import List
+from enum import Enum
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -11,8 +12,22 @@ class StoryResponse(Story):
     pass
 
 
+class StoryRevisionResponse(BaseModel):
+    revision: int
+    replaced_at: datetime
+    changed_fields: List[str]
+
+
+class PromptMode(str, Enum):
+    OMIT = "omit"
+    INLINE = "inline"
+    REFERENCE = "reference"  # stored server-side, fetch via GET /generate/prompts/{ref}
+
+
 class GeneratedStoryResponse(BaseModel):
     variations: List[str]
+    prompt: Optional[str] = None
+    prompt_ref: Optional[str] = None
     created_at: str = Field(default_factory=lambda: datetime.utcnow().isoformat())
 
 
@@ -22,6 +37,9 @@ class StoryGenerationRequest(BaseModel):
     style: str = Field("professional", enum=["casual", "professional", "creative"])
     material_per_category: int = Field(5, ge=1, le=20)
     length: int = Field(500, ge=100, le=2000)
+    prompt_mode: PromptMode = PromptMode.OMIT
+    # Leave out transcripts that are near-duplicates of one already drawn
+    dedupe_material: bool = False
 
 
 class StoryGenerationFromTranscriptsRequest(BaseModel):
@@ -29,6 +47,7 @@ class StoryGenerationFromTranscriptsRequest(BaseModel):
     variations_count: int = Field(3, ge=1, le=5)
     style: str = Field("professional", enum=["casual", "professional", "creative"])
     length: int = Field(500, ge=100, le=2000)
+    prompt_mode: PromptMode = PromptMode.OMIT
 
 
 class StoryRegenerationFromSynopsis(BaseModel):
@@ -36,3 +55,20 @@ class StoryRegenerationFromSynopsis(BaseModel):
     variations_count: int = Field(3, ge=1, le=5)
     style: str = Field("professional", enum=["casual", "professional", "creative"])
     length: int = Field(500, ge=100, le=2000)
+
+
+class ParagraphRange(BaseModel):
+    # Paragraphs start to stop - 1, counted from 0, as in a slice
+    start: int = Field(..., ge=0)
+    stop: int = Field(..., ge=1)
+
+
+class VariationRegenerationRequest(BaseModel):
+    # The synopsis the variations were generated from, and the variations
+    story: str
+    variations: List[str] = Field(..., min_length=1, max_length=5)
+    # Variations to regenerate, or with ``paragraphs`` the one to revise
+    indices: List[int] = Field(..., min_length=1)
+    paragraphs: Optional[ParagraphRange] = None
+    style: str = Field("professional", enum=["casual", "professional", "creative"])
+    length: int = Field(500, ge=100, le=2000)
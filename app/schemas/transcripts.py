@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import List, Optional
 from enum import Enum
 
@@ -7,6 +8,10 @@ from app.models.transcript import Transcript
 
 
 class TranscriptResponse(Transcript):
+    # Storage internals, kept out of responses and their ETags
+    random_key: Optional[float] = Field(None, exclude=True)
+    minhash: Optional[str] = Field(None, exclude=True)
+
     model_config = ConfigDict(
         json_schema_extra={
             "example": {
@@ -23,11 +28,26 @@ class TranscriptResponse(Transcript):
     )
 
 
+class TranscriptListItem(BaseModel):
+    """One transcript of a streamed category listing, without its text
+    unless the material was asked for"""
+
+    video_id: str
+    title: str = ""
+    category: str = ""
+    transcript: Optional[str] = None
+    token_count: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+
 class TranscriptProcessResponse(BaseModel):
     status: str
     video_id: str
-    category: str
+    # None when a duplicate was skipped before it was categorized
+    category: Optional[str]
     auto_generated: bool
+    duplicate_of: Optional[str] = None
+    duplicate_similarity: Optional[float] = None
 
 
 class CategoryCreate(BaseModel):
@@ -38,6 +58,12 @@ class CategoryResponse(BaseModel):
     name: str
 
 
+class CategoryStatsResponse(CategoryResponse):
+    transcript_count: int
+    total_tokens: int
+    last_updated: Optional[datetime] = None
+
+
 class CategoryWeight(BaseModel):
     name: str
     weight: float = Field(..., ge=0, le=1)  # 0-1 range for slider values
@@ -81,12 +107,23 @@ class BatchProcessResponse(BaseModel):
     videos: List[VideoProcessingItem]
 
 
-class BatchStatusResponse(BaseModel):
+class BatchSummary(BaseModel):
     batch_id: str
     status: ProcessingStatus
     total_videos: int
     processed_count: int
     failed_count: int
-    videos: List[VideoProcessingItem]
     created_at: str
     updated_at: str
+
+
+class BatchStatusResponse(BatchSummary):
+    # One page of the batch's videos, from ``offset``
+    videos: List[VideoProcessingItem]
+    offset: int = 0
+    next_offset: Optional[int] = None
+
+
+class BatchUploadResponse(BaseModel):
+    batch_id: str
+    total_videos: int
@@ -0,0 +1,10 @@
+import re
+
+
+def sanitize_category(category: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", category.lower())
+
+
+def category_collection(category: str) -> str:
+    """Name of the per-category transcripts collection"""
+    return f"transcripts_{sanitize_category(category)}"
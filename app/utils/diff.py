@@ -0,0 +1,39 @@
+"""
+Compact word-level text diffs.
+
+A diff is a list of ``[start, end, text]`` edits over the whitespace-
+preserving tokens of the source text: tokens ``start:end`` are replaced by
+``text``. Unchanged spans are not stored, so a small edit to a long story
+is a small diff.
+"""
+
+import re
+from difflib import SequenceMatcher
+from typing import List
+
+TOKEN_PATTERN = re.compile(r"\s+|\S+")
+
+Diff = List[list]
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text)
+
+
+def make_diff(source: str, target: str) -> Diff:
+    """Edits that turn ``source`` into ``target``"""
+    source_tokens, target_tokens = tokenize(source), tokenize(target)
+    matcher = SequenceMatcher(None, source_tokens, target_tokens, autojunk=False)
+    return [
+        [i1, i2, "".join(target_tokens[j1:j2])]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def apply_diff(source: str, diff: Diff) -> str:
+    tokens = tokenize(source)
+    # Back to front, so earlier token positions stay valid
+    for start, end, text in sorted(diff, key=lambda edit: edit[0], reverse=True):
+        tokens[start:end] = [text]
+    return "".join(tokens)
@@ -32,3 +32,23 @@ class NoVideoFoundError(CustomHTTPException):
 
 class NoChannelFoundError(CustomHTTPException):
     pass
+
+
+class DeadlineExceededError(CustomHTTPException):
+    pass
+
+
+class CircuitOpenError(CustomHTTPException):
+    pass
+
+
+class QuotaExceededError(CustomHTTPException):
+    pass
+
+
+class JobLimitError(CustomHTTPException):
+    pass
+
+
+class RevisionConflictError(CustomHTTPException):
+    pass
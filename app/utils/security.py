@@ -0,0 +1,24 @@
+import hmac
+from typing import Optional
+
+from fastapi import Header, HTTPException, status
+
+from app.core.config import get_settings
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    admin_token = get_settings().admin_token
+    return bool(admin_token and token and hmac.compare_digest(token, admin_token))
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Guard for maintenance endpoints, enabled by setting ``admin_token``"""
+    if not get_settings().admin_token:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin endpoints are disabled, set ADMIN_TOKEN to enable them",
+        )
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin token"
+        )
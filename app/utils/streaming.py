@@ -0,0 +1,77 @@
+"""
+Streamed JSON responses for large listings.
+
+Rows come from an async iterator and are serialized one at a time, so
+memory stays flat however many rows there are. ``ndjson`` sends one JSON
+object per line; ``json-array`` sends a regular JSON array, for clients that
+cannot read NDJSON. Given a ``row_model``, each row is validated and dumped
+as that model, so a streamed row has the same fields as the non-streamed
+response and no storage internals.
+"""
+
+import logging
+from enum import Enum
+from typing import AsyncIterator, Optional
+
+import orjson
+from fastapi.responses import StreamingResponse
+
+from app.core.validators import serialize
+
+logger = logging.getLogger(__name__)
+
+
+class StreamFormat(str, Enum):
+    NDJSON = "ndjson"
+    JSON_ARRAY = "json-array"
+
+
+MEDIA_TYPES = {
+    StreamFormat.NDJSON: "application/x-ndjson",
+    StreamFormat.JSON_ARRAY: "application/json",
+}
+
+
+def _dumps(row: dict, row_model=None) -> bytes:
+    if row_model is not None:
+        return serialize(row_model, row)
+    return orjson.dumps(row, default=str)
+
+
+async def _body(
+    first: bytes, rows: AsyncIterator[dict], fmt: StreamFormat, row_model
+) -> AsyncIterator[bytes]:
+    ndjson = fmt == StreamFormat.NDJSON
+    yield first + b"\n" if ndjson else b"[" + first
+    try:
+        async for row in rows:
+            body = _dumps(row, row_model)
+            yield body + b"\n" if ndjson else b"," + body
+    except Exception as e:
+        # The status line is long gone; a cut-off body is all the client
+        # can be told, plus an error line it can recognize in NDJSON
+        logger.error(f"Streamed response failed: {e}")
+        if ndjson:
+            yield _dumps({"error": str(e)}) + b"\n"
+        return
+    if not ndjson:
+        yield b"]"
+
+
+async def stream_rows(
+    rows: AsyncIterator[dict], fmt: StreamFormat, row_model: Optional[type] = None
+):
+    """Response streaming ``rows`` in ``fmt``, each as a ``row_model``.
+
+    The first row is read before the response starts, so failures up front
+    (missing collection, open circuit) still get a proper error status.
+    """
+    media_type = MEDIA_TYPES[fmt]
+    try:
+        first = await rows.__anext__()
+    except StopAsyncIteration:
+        empty = b"" if fmt == StreamFormat.NDJSON else b"[]"
+        return StreamingResponse(iter([empty]), media_type=media_type)
+    return StreamingResponse(
+        _body(_dumps(first, row_model), rows, fmt, row_model), media_type=media_type
+    )
@@ -0,0 +1,93 @@
+"""
+MinHash signing cost and duplicate index memory.
+
+Usage:
+    python -m benchmarks.minhash [--documents 2000] [--words 3000]
+
+Signs synthetic transcripts, reports the median signing time per document
+(with numpy if installed) and the memory the ``DuplicateIndex`` holds per
+document, measured with tracemalloc. Also checks that a lightly edited copy
+is found as a duplicate and an unrelated text is not; ``check_ms`` is
+signing plus lookup, the cost added to an ingest.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+import tracemalloc
+
+from app.core import dedupe
+
+WORDS = (
+    "the and you that it was for on are with they be at one have this from "
+    "story video people time like just know really going think right want "
+    "actually little thing world back because through never something"
+).split()
+
+
+def _text(words: int, rng: random.Random) -> str:
+    # A larger vocabulary than the word list alone, so shingles are varied
+    return " ".join(
+        f"{rng.choice(WORDS)}{rng.randrange(50)}" for _ in range(words)
+    )
+
+
+def _edited(text: str, rng: random.Random, fraction: float = 0.005) -> str:
+    words = text.split()
+    for _ in range(int(len(words) * fraction)):
+        words[rng.randrange(len(words))] = "edited"
+    return " ".join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=3000)
+    parser.add_argument("--threshold", type=float, default=0.85)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    texts = [_text(args.words, rng) for _ in range(args.documents)]
+
+    timings, signatures = [], []
+    for text in texts:
+        started = time.perf_counter()
+        signatures.append(dedupe.signature(text))
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    index = dedupe.DuplicateIndex(args.threshold)
+    for n, sig in enumerate(signatures):
+        index.add(f"video{n:06d}_science_transcript", sig)
+    index_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    copy = index.find_duplicate(dedupe.signature(_edited(texts[0], rng)))
+    unrelated = index.find_duplicate(dedupe.signature(_text(args.words, rng)))
+    check_ms = (time.perf_counter() - started) * 1000 / 2
+
+    print(
+        json.dumps(
+            {
+                "numpy": dedupe.numpy is not None,
+                "documents": args.documents,
+                "words": args.words,
+                "sign_ms_median": round(statistics.median(timings) * 1000, 3),
+                "sign_ms_max": round(max(timings) * 1000, 3),
+                "index_bytes_per_document": round(index_bytes / args.documents),
+                "check_ms": round(check_ms, 3),
+                "edited_copy_found": copy is not None,
+                "edited_copy_similarity": copy[1] if copy else None,
+                "unrelated_found": unrelated is not None,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Per-document overhead of model handling on the transcript listing paths.
+
+Usage:
+    python -m benchmarks.models [--documents 500] [--chars 20000]
+
+Compares, per document of a synthetic page:
+
+- ``model``: what the listing paths did before, a ``Transcript(**doc)`` per
+  document followed by FastAPI's response handling (dump, re-validate
+  against the response model, encode)
+- ``adapter``: one ``TypeAdapter`` list validation and ``dump_json``, as
+  the search endpoint now does
+- ``record``: ``TranscriptRecord.from_doc``, the unvalidated slotted
+  record internal reads now use when they only need a few fields
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timezone
+from typing import List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from app.core.validators import serialize
+from app.models.transcript import Transcript, TranscriptRecord
+from app.schemas.transcripts import TranscriptResponse
+from benchmarks.serialization import _text
+
+
+def build_documents(documents: int, chars: int) -> List[dict]:
+    rng = random.Random(42)
+    created_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "_id": f"{n:032x}",
+            "video_id": f"video{n:06d}",
+            "title": f"Video {n}",
+            "transcript": _text(chars, rng),
+            "category": "Science",
+            "sanitized_category": "science",
+            "metadata": {"auto_generated_category": False},
+            "token_count": chars // 4,
+            "created_at": created_at,
+            "random_key": rng.random(),
+        }
+        for n in range(documents)
+    ]
+
+
+def _model_path(docs: List[dict]) -> bytes:
+    transcripts = [Transcript(**doc) for doc in docs]
+    # FastAPI's serialize_response for a response_model
+    content = [t.model_dump(by_alias=True) for t in transcripts]
+    validated = [TranscriptResponse.model_validate(item) for item in content]
+    return orjson.dumps(jsonable_encoder(validated))
+
+
+def _adapter_path(docs: List[dict]) -> bytes:
+    return serialize(List[TranscriptResponse], docs)
+
+
+def _model_fields(docs: List[dict]) -> list:
+    return [(t.video_id, t.transcript) for t in (Transcript(**d) for d in docs)]
+
+
+def _record_fields(docs: List[dict]) -> list:
+    return [
+        (t.video_id, t.transcript) for t in (TranscriptRecord.from_doc(d) for d in docs)
+    ]
+
+
+def _per_document_us(fn, docs: List[dict], runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn(docs)
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) / len(docs) * 1e6, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--documents", type=int, default=500)
+    parser.add_argument("--chars", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    docs = build_documents(args.documents, args.chars)
+    assert orjson.loads(_model_path(docs)) == orjson.loads(_adapter_path(docs))
+
+    print(
+        json.dumps(
+            {
+                "documents": args.documents,
+                "chars": args.chars,
+                "response_us_per_document": {
+                    "model": _per_document_us(_model_path, docs, args.runs),
+                    "adapter": _per_document_us(_adapter_path, docs, args.runs),
+                },
+                "internal_read_us_per_document": {
+                    "model": _per_document_us(_model_fields, docs, args.runs),
+                    "record": _per_document_us(_record_fields, docs, args.runs),
+                },
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Payload size and serialization time for the heaviest endpoints.
+
+Usage:
+    python -m benchmarks.serialization [--transcripts 200] [--chars 20000]
+
+Builds synthetic payloads shaped like ``/transcripts/by-category`` and
+``/generate/story`` responses and compares stdlib ``json`` with ``orjson``,
+the prompt inlined vs. referenced, and gzip/brotli compression. Transcript
+text is drawn from a word list so it compresses like real speech rather
+than like random bytes.
+"""
+
+import argparse
+import gzip
+import json
+import random
+import statistics
+import time
+
+import orjson
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+# Same settings as the CompressionMiddleware in app.main
+GZIP_LEVEL = 4
+BROTLI_QUALITY = 4
+
+WORDS = (
+    "the and you that it was for on are with they be at one have this from "
+    "story video people time like just know really going think right want "
+    "actually little thing world back because through never something"
+).split()
+
+
+def _text(chars: int, rng: random.Random) -> str:
+    words = []
+    size = 0
+    while size < chars:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+
+def build_payloads(transcripts: int, chars: int) -> dict:
+    rng = random.Random(42)
+    bodies = [_text(chars, rng) for _ in range(transcripts)]
+    variations = [_text(3000, rng) for _ in range(3)]
+    created_at = "2025-01-01T00:00:00"
+
+    return {
+        "by_category": {
+            "category": "Science",
+            "total_transcripts": transcripts,
+            "material": bodies,
+            "video_ids": [f"video{i:06d}" for i in range(transcripts)],
+        },
+        "by_category_ids_only": {
+            "category": "Science",
+            "total_transcripts": transcripts,
+            "video_ids": [f"video{i:06d}" for i in range(transcripts)],
+        },
+        "story_prompt_inline": {
+            "variations": variations,
+            "prompt": " ".join(bodies[:20]),
+            "created_at": created_at,
+        },
+        "story_prompt_reference": {
+            "variations": variations,
+            "prompt_ref": "0" * 32,
+            "created_at": created_at,
+        },
+    }
+
+
+def _time(fn, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1000, 3)
+
+
+def measure(payload, runs: int) -> dict:
+    stdlib = json.dumps(payload).encode()
+    fast = orjson.dumps(payload)
+    result = {
+        "bytes": len(fast),
+        "json_ms": _time(lambda: json.dumps(payload).encode(), runs),
+        "orjson_ms": _time(lambda: orjson.dumps(payload), runs),
+        "gzip_bytes": len(gzip.compress(fast, compresslevel=GZIP_LEVEL)),
+        "gzip_ms": _time(lambda: gzip.compress(fast, compresslevel=GZIP_LEVEL), runs),
+    }
+    assert json.loads(stdlib) == orjson.loads(fast)
+
+    if brotli is not None:
+        compress = lambda: brotli.compress(fast, quality=BROTLI_QUALITY)  # noqa: E731
+        result["brotli_bytes"] = len(compress())
+        result["brotli_ms"] = _time(compress, runs)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--transcripts", type=int, default=200)
+    parser.add_argument("--chars", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    payloads = build_payloads(args.transcripts, args.chars)
+    print(
+        json.dumps(
+            {name: measure(payload, args.runs) for name, payload in payloads.items()},
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
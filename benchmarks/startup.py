@@ -0,0 +1,140 @@
+"""
+Startup-time benchmark: import time of ``app.main`` and time to first byte.
+
+Usage:
+    python -m benchmarks.startup [--runs 5] [--port 8765] [--path /health/dependencies]
+
+Import time is measured in a fresh interpreter per run. Time to first byte
+is measured from spawning uvicorn until the first response byte of
+``--path`` arrives, so it includes the lifespan warmup. Placeholder
+credentials are used for any setting missing from the environment; the
+warmup then fails fast and is reported, which is also what a cold start
+with a broken dependency looks like.
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+PLACEHOLDER_ENV = {
+    "FIREBASE_CONFIG_FILE": "firebase.config.json",
+    "OPENAI_API_KEY": "sk-benchmark",
+    "YOUTUBE_API_KEY": "benchmark",
+}
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    for key, value in PLACEHOLDER_ENV.items():
+        env.setdefault(key, value)
+    return env
+
+
+def measure_import(runs: int) -> dict:
+    timings = []
+    slowest = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import app.main"],
+            env=_env(),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        timings.append(time.perf_counter() - started)
+        slowest = _slowest_imports(result.stderr)
+
+    return {
+        "runs": runs,
+        "median_seconds": round(statistics.median(timings), 4),
+        "min_seconds": round(min(timings), 4),
+        "slowest_imports": slowest,
+    }
+
+
+def _slowest_imports(importtime_output: str, top: int = 10) -> list:
+    rows = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        rows.append((int(cumulative_us), name.strip()))
+
+    rows.sort(reverse=True)
+    return [{"module": name, "cumulative_ms": us / 1000} for us, name in rows[:top]]
+
+
+def _first_byte(port: int, path: str, timeout: float) -> float:
+    deadline = time.perf_counter() + timeout
+    request = f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n"
+    while time.perf_counter() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1) as sock:
+                sock.sendall(request.encode())
+                if sock.recv(1):
+                    return time.perf_counter()
+        except OSError:
+            time.sleep(0.01)
+    raise TimeoutError(f"No response on port {port} within {timeout}s")
+
+
+def measure_ttfb(runs: int, port: int, path: str, timeout: float) -> dict:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "app.main:app",
+                "--port",
+                str(port),
+                "--log-level",
+                "warning",
+            ],
+            env=_env(),
+        )
+        try:
+            timings.append(_first_byte(port, path, timeout) - started)
+        finally:
+            server.terminate()
+            server.wait()
+
+    return {
+        "runs": runs,
+        "path": path,
+        "median_seconds": round(statistics.median(timings), 4),
+        "min_seconds": round(min(timings), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--path", default="/health/dependencies")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    print(
+        json.dumps(
+            {
+                "import": measure_import(args.runs),
+                "time_to_first_byte": measure_ttfb(
+                    args.runs, args.port, args.path, args.timeout
+                ),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
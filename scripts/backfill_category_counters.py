@@ -0,0 +1,87 @@
+"""
+Rebuild the sharded category counters from the transcripts themselves.
+
+Usage:
+    python -m scripts.backfill_category_counters [--dry-run]
+
+Counts every ``transcripts_{category}`` collection with cursor-paginated
+projection reads (no transcript bodies) and replaces the category's
+counter shards with the totals. Run it once for categories created before
+the counters existed, or to repair drift; saves and deletes that happen
+while a category is being recounted may be lost from its totals.
+"""
+
+import argparse
+from datetime import datetime, timezone
+
+from app.core.counters import get_category_counters
+from app.core.firebase import get_firestore_db
+
+PAGE_SIZE = 1000
+
+
+def count_collection(collection) -> dict:
+    totals = {"name": None, "transcripts": 0, "tokens": 0}
+    last_doc = None
+
+    while True:
+        query = (
+            collection.select(["category", "token_count"])
+            .order_by("__name__")
+            .limit(PAGE_SIZE)
+        )
+        if last_doc is not None:
+            query = query.start_after(last_doc)
+        docs = query.get()
+        if not docs:
+            break
+
+        for doc in docs:
+            data = doc.to_dict() or {}
+            totals["name"] = totals["name"] or data.get("category")
+            totals["transcripts"] += 1
+            totals["tokens"] += data.get("token_count") or 0
+        last_doc = docs[-1]
+
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    client = get_firestore_db().db
+    counters = get_category_counters()
+    for collection in client.collections():
+        if not collection.id.startswith("transcripts_"):
+            continue
+
+        sanitized = collection.id[len("transcripts_") :]
+        totals = count_collection(collection)
+        print(
+            f"{sanitized}: {totals['transcripts']} transcripts, "
+            f"{totals['tokens']} tokens"
+        )
+        if args.dry_run:
+            continue
+
+        first, *rest = counters.shard_refs(sanitized)
+        batch = client.batch()
+        batch.set(
+            first,
+            {
+                "name": totals["name"] or sanitized,
+                "sanitized_category": sanitized,
+                "transcripts": totals["transcripts"],
+                "tokens": totals["tokens"],
+                "updated_at": datetime.now(timezone.utc),
+            },
+        )
+        for shard in rest:
+            batch.delete(shard)
+        batch.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Backfill MinHash signatures on transcripts saved before dedupe existed.
+
+Usage:
+    python -m scripts.backfill_minhash [--dry-run] [--page-size 200]
+
+Walks ``transcripts`` and every ``transcripts_{category}`` collection with
+cursor pagination and sets ``minhash`` on documents that lack one, using
+batched writes. Existing transcripts are not flagged as duplicates of each
+other; the signatures only make them visible to the ingest check and to
+deduplicated sampling. Safe to re-run.
+"""
+
+import argparse
+
+from app.core import dedupe
+from app.core.firebase import get_firestore_db
+from scripts.backfill_random_keys import _transcript_collections
+
+
+def backfill_collection(client, collection, page_size: int, dry_run: bool) -> dict:
+    scanned = updated = 0
+    last_doc = None
+
+    while True:
+        query = collection.order_by("__name__").limit(page_size)
+        if last_doc is not None:
+            query = query.start_after(last_doc)
+        docs = query.get()
+        if not docs:
+            break
+
+        batch = client.batch()
+        pending = 0
+        for doc in docs:
+            scanned += 1
+            data = doc.to_dict() or {}
+            if data.get("minhash"):
+                continue
+            signature = dedupe.signature(data.get("transcript") or "")
+            if signature is None:
+                continue
+            batch.update(doc.reference, {"minhash": dedupe.encode(signature)})
+            pending += 1
+
+        if pending and not dry_run:
+            batch.commit()
+        updated += pending
+        last_doc = docs[-1]
+
+    return {"collection": collection.id, "scanned": scanned, "updated": updated}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dry-run", action="store_true")
+    # Pages hold whole transcripts, keep them smaller than for other backfills
+    parser.add_argument("--page-size", type=int, default=200)
+    args = parser.parse_args()
+    # Firestore batches hold at most 500 writes
+    args.page_size = max(1, min(args.page_size, 500))
+
+    client = get_firestore_db().db
+    for collection in _transcript_collections(client):
+        result = backfill_collection(client, collection, args.page_size, args.dry_run)
+        print(
+            f"{result['collection']}: scanned {result['scanned']}, "
+            f"{'would update' if args.dry_run else 'updated'} {result['updated']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Backfill ``random_key`` on transcripts saved before it was introduced.
+
+Usage:
+    python -m scripts.backfill_random_keys [--dry-run] [--page-size 500]
+
+Walks ``transcripts`` and every ``transcripts_{category}`` collection with
+cursor pagination and sets a uniform random ``random_key`` on documents
+that lack one, using batched writes. Safe to re-run: documents that already
+have a key are left alone, so sampling stays stable for them.
+"""
+
+import argparse
+import random
+
+from app.core.firebase import get_firestore_db
+
+RANDOM_KEY_FIELD = "random_key"
+
+
+def _transcript_collections(client) -> list:
+    return [
+        col
+        for col in client.collections()
+        if col.id == "transcripts" or col.id.startswith("transcripts_")
+    ]
+
+
+def backfill_collection(client, collection, page_size: int, dry_run: bool) -> dict:
+    scanned = updated = 0
+    last_doc = None
+
+    while True:
+        query = collection.order_by("__name__").limit(page_size)
+        if last_doc is not None:
+            query = query.start_after(last_doc)
+        docs = query.get()
+        if not docs:
+            break
+
+        batch = client.batch()
+        pending = 0
+        for doc in docs:
+            scanned += 1
+            if RANDOM_KEY_FIELD in (doc.to_dict() or {}):
+                continue
+            batch.update(doc.reference, {RANDOM_KEY_FIELD: random.random()})
+            pending += 1
+
+        if pending and not dry_run:
+            batch.commit()
+        updated += pending
+        last_doc = docs[-1]
+
+    return {"collection": collection.id, "scanned": scanned, "updated": updated}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--page-size", type=int, default=500)
+    args = parser.parse_args()
+    # Firestore batches hold at most 500 writes
+    args.page_size = max(1, min(args.page_size, 500))
+
+    client = get_firestore_db().db
+    for collection in _transcript_collections(client):
+        result = backfill_collection(client, collection, args.page_size, args.dry_run)
+        print(
+            f"{result['collection']}: scanned {result['scanned']}, "
+            f"{'would update' if args.dry_run else 'updated'} {result['updated']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Export or import the transcript corpus.
+
+Usage:
+    python -m scripts.corpus export OUT_DIR [--format ndjson|parquet]
+        [--category NAME ...] [--chunk-rows 10000]
+    python -m scripts.corpus import EXPORT_DIR
+
+Both commands stream in bounded memory and resume where they stopped when
+re-run with the same directory, see app/core/corpus.py.
+"""
+
+import argparse
+import asyncio
+
+from app.core.corpus import FORMATS, export_corpus, import_corpus
+from app.core.counters import get_category_counters
+from app.core.firebase import get_firestore_db
+
+
+async def _print_progress(progress: dict):
+    print(", ".join(f"{key}: {value}" for key, value in progress.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export")
+    export.add_argument("out_dir")
+    export.add_argument("--format", choices=FORMATS, default="ndjson")
+    export.add_argument("--category", action="append", dest="categories")
+    export.add_argument("--chunk-rows", type=int, default=10000)
+
+    load = commands.add_parser("import")
+    load.add_argument("export_dir")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        result = asyncio.run(
+            export_corpus(
+                get_firestore_db(),
+                args.out_dir,
+                fmt=args.format,
+                categories=args.categories,
+                chunk_rows=args.chunk_rows,
+                progress=_print_progress,
+            )
+        )
+    else:
+        result = asyncio.run(
+            import_corpus(
+                get_firestore_db(),
+                get_category_counters(),
+                args.export_dir,
+                progress=_print_progress,
+            )
+        )
+    print(f"Done: {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+from app.core.batches import (
+    BATCH_PAGE_SIZE,
+    WATCH_URL,
+    BatchProgress,
+    BatchStore,
+    UploadFormat,
+    read_upload,
+)
+from app.core.state import MemoryState
+
+
+def _delta(batch_status: str, index=None) -> dict:
+    return {
+        "type": "batch" if index is None else "video",
+        "batch_status": batch_status,
+        "index": index,
+    }
+
+
+async def _collect(progress: BatchProgress, after, snapshot) -> list:
+    return [event async for event in progress.events("b1", after, snapshot)]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_then_live_deltas():
+    state = MemoryState()
+    progress = BatchProgress(state)
+    await progress.publish("b1", _delta("processing"))
+
+    async def snapshot():
+        return {"status": "processing", "videos": ["v1", "v2"]}
+
+    reader = asyncio.create_task(_collect(progress, None, snapshot))
+    await asyncio.sleep(0.05)
+    await progress.publish("b1", _delta("processing", 0))
+    await progress.publish("b1", _delta("processing", 1))
+    await progress.publish("b1", _delta("completed"))
+    events = await asyncio.wait_for(reader, timeout=5)
+
+    assert [event["type"] for event in events] == [
+        "snapshot",
+        "video",
+        "video",
+        "batch",
+    ]
+    assert [event["seq"] for event in events] == [1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_resume_after_sequence():
+    progress = BatchProgress(MemoryState())
+    for index in range(3):
+        await progress.publish("b1", _delta("processing", index))
+    await progress.publish("b1", _delta("completed"))
+
+    async def snapshot():
+        raise AssertionError("resuming must not need a snapshot")
+
+    events = await asyncio.wait_for(_collect(progress, 2, snapshot), timeout=5)
+    assert [event["seq"] for event in events] == [3, 4]
+
+
+@pytest.mark.asyncio
+async def test_expired_deltas_resync_from_snapshot():
+    state = MemoryState()
+    progress = BatchProgress(state)
+    for index in range(3):
+        await progress.publish("b1", _delta("processing", index))
+    await progress.publish("b1", _delta("completed"))
+    await state.delete("batch_delta:b1:2")
+
+    async def snapshot():
+        return {"status": "completed", "videos": []}
+
+    events = await asyncio.wait_for(_collect(progress, 0, snapshot), timeout=5)
+    assert [event["type"] for event in events] == ["video", "snapshot"]
+    assert events[-1]["seq"] == 4
+
+
+async def _chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+async def _rows(fmt: UploadFormat, *parts: bytes) -> list:
+    return [row async for row in read_upload(_chunks(*parts), fmt)]
+
+
+@pytest.mark.asyncio
+async def test_upload_lines_split_across_chunks():
+    rows = await _rows(
+        UploadFormat.NDJSON,
+        b'{"video_id": "aaaaaaaaaaa"}\n{"video_',
+        b'id": "bbbbbbbbbbb", "title": "B"}\n\n{"url": "u"}',
+    )
+    assert rows == [
+        (1, {"video_id": "aaaaaaaaaaa"}),
+        (2, {"video_id": "bbbbbbbbbbb", "title": "B"}),
+        (4, {"url": "u"}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_upload_csv_and_errors():
+    body = b'\xef\xbb\xbfvideo_id,title\r\nabc,"A, b"\n'
+    rows = await _rows(UploadFormat.CSV, body)
+    assert rows == [(2, {"video_id": "abc", "title": "A, b"})]
+
+    with pytest.raises(ValueError, match="Line 2"):
+        await _rows(UploadFormat.CSV, b"video_id,title\nabc\n")
+    with pytest.raises(ValueError, match="Line 1"):
+        await _rows(UploadFormat.NDJSON, b"[1, 2]\n")
+
+
+@pytest.mark.asyncio
+async def test_store_pages_items_compactly():
+    state = MemoryState()
+    store = BatchStore(state)
+    writer = store.writer("b1")
+    for n in range(BATCH_PAGE_SIZE + 10):
+        video_id = f"video{n:06d}"
+        await writer.append(
+            {"video_id": video_id, "title": "", "url": WATCH_URL.format(video_id)}
+        )
+    await writer.close()
+
+    items = await store.items("b1", BATCH_PAGE_SIZE - 5, 100)
+    assert [item["video_id"] for item in items] == [
+        f"video{n:06d}" for n in range(BATCH_PAGE_SIZE - 5, BATCH_PAGE_SIZE + 10)
+    ]
+    assert items[0]["url"] == WATCH_URL.format(items[0]["video_id"])
+    # The usual watch URL is not stored
+    assert (await state.get("batch_items:b1:1"))[0][2] is None
+
+    await writer.discard()
+    assert await store.items("b1", 0, 10) == []
@@ -0,0 +1,63 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core.blocking import BlockingPool
+
+
+@pytest.mark.asyncio
+async def test_per_host_limit_and_overlap():
+    pool = BlockingPool("test-io", {"slow.example": 2, "fast.example": 2})
+    active, peak = 0, 0
+    lock = threading.Lock()
+
+    def call(seconds: float) -> str:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(seconds)
+        with lock:
+            active -= 1
+        return threading.current_thread().name
+
+    started = time.perf_counter()
+    slow = [pool.run("slow.example", call, 0.2) for _ in range(4)]
+    fast = pool.run("fast.example", call, 0)
+    names = await asyncio.gather(*slow, fast)
+    elapsed = time.perf_counter() - started
+
+    # Four slow calls, two at a time; the fast host was not held up
+    assert peak <= 3
+    assert 0.35 < elapsed < 1.0
+    assert all(name.startswith("test-io") for name in names)
+    assert pool.stats()["slow.example"] == {"limit": 2, "running": 0, "waiting": 0}
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_call_holds_its_slot_until_the_thread_is_done():
+    pool = BlockingPool("test-io-cancel", {"slow.example": 1})
+    release = threading.Event()
+
+    try:
+        call = asyncio.create_task(pool.run("slow.example", release.wait))
+        await asyncio.sleep(0.05)
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+
+        # The thread is still in the call, so the host is still at its limit
+        assert pool.stats()["slow.example"]["running"] == 1
+        queued = asyncio.create_task(pool.run("slow.example", time.sleep, 0))
+        await asyncio.sleep(0.05)
+        assert not queued.done()
+        assert pool.stats()["slow.example"]["waiting"] == 1
+    finally:
+        release.set()
+
+    await asyncio.wait_for(queued, timeout=1)
+    assert pool.stats()["slow.example"] == {"limit": 1, "running": 0, "waiting": 0}
+    pool.shutdown()
@@ -0,0 +1,185 @@
+import pytest
+
+from app.core import bulk_categories
+from app.core.bulk_categories import delete_category, move_category
+
+
+class Snapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class Ref:
+    def __init__(self, store, collection, doc_id):
+        self.store, self.collection, self.id = store, collection, doc_id
+
+    def snapshot(self):
+        return Snapshot(self, self.store.get(self.collection, {}).get(self.id))
+
+
+class Collection:
+    def __init__(self, store, name, limit=None):
+        self.store, self.name, self._limit = store, name, limit
+
+    def document(self, doc_id):
+        return Ref(self.store, self.name, doc_id)
+
+    def limit(self, count):
+        return Collection(self.store, self.name, count)
+
+    def snapshots(self):
+        docs = sorted(self.store.get(self.name, {}))[: self._limit]
+        return [self.document(doc_id).snapshot() for doc_id in docs]
+
+
+class Transaction:
+    def __init__(self):
+        self.writes = []
+
+    def get(self, query):
+        return iter(query.snapshots())
+
+    def set(self, ref, data, merge=False):
+        self.writes.append((ref, data))
+
+    def delete(self, ref):
+        self.writes.append((ref, None))
+
+
+class Client:
+    def __init__(self, store):
+        self.store = store
+
+    def collection(self, name):
+        return Collection(self.store, name)
+
+    def get_all(self, refs, field_paths=None, transaction=None):
+        return [ref.snapshot() for ref in refs]
+
+
+class FakeDatabase:
+    """Firestore over nested dicts; transactions apply their writes at once"""
+
+    def __init__(self, store):
+        self.store = store
+        self.db = Client(store)
+        self.max_writes = 0
+
+    async def select_fields(self, collection, fields, limit=None):
+        docs = sorted(self.store.get(collection, {}))[:limit]
+        return [{"doc_id": doc_id} for doc_id in docs]
+
+    async def run_transaction(self, fn):
+        transaction = Transaction()
+        result = fn(transaction)
+        self.max_writes = max(self.max_writes, len(transaction.writes))
+        for ref, data in transaction.writes:
+            docs = self.store.setdefault(ref.collection, {})
+            if data is None:
+                docs.pop(ref.id, None)
+            else:
+                docs[ref.id] = data
+        return result
+
+
+class FakeCounters:
+    def __init__(self):
+        self.totals = {}
+
+    def shard_refs(self, category):
+        return [Ref(None, "counter_shards", category)]
+
+    def increment(self, writer, category, transcripts, tokens):
+        counts = self.totals.setdefault(category, [0, 0])
+        counts[0] += transcripts
+        counts[1] += tokens
+
+
+class FakePools:
+    def __init__(self):
+        self.dropped = []
+
+    def drop(self, category):
+        self.dropped.append(category)
+
+
+async def _no_caches(*args):
+    pass
+
+
+def _store(category, videos):
+    docs = {
+        f"{video}_{category}_transcript": {
+            "video_id": video,
+            "category": category,
+            "sanitized_category": category,
+            "token_count": 10,
+        }
+        for video in videos
+    }
+    return {
+        f"transcripts_{category}": docs,
+        "categories": {category: {"name": category}},
+    }
+
+
+@pytest.fixture
+def no_caches(monkeypatch):
+    pools = FakePools()
+    monkeypatch.setattr(bulk_categories, "_forget", _no_caches)
+    monkeypatch.setattr(bulk_categories, "get_sampling_pools", lambda: pools)
+    monkeypatch.setattr(
+        bulk_categories,
+        "get_validator_cache",
+        lambda: type("Validators", (), {"invalidate": staticmethod(_no_caches)}),
+    )
+    return pools
+
+
+@pytest.mark.asyncio
+async def test_delete_in_batches(no_caches):
+    store = _store("music", [f"v{n:03d}" for n in range(250)])
+    store["transcripts"] = {doc_id: {} for doc_id in store["transcripts_music"]}
+    db, counters, reports = FakeDatabase(store), FakeCounters(), []
+
+    async def progress(summary):
+        reports.append(summary)
+
+    result = await delete_category(db, counters, "music", progress=progress)
+
+    assert result["deleted"] == 250
+    assert [report["deleted"] for report in reports] == [200, 250]
+    assert db.max_writes <= 500
+    assert not store["transcripts_music"] and not store["transcripts"]
+    assert "music" not in store["categories"]
+    assert counters.totals["music"] == [-250, -2500]
+
+
+@pytest.mark.asyncio
+async def test_merge_keeps_the_targets_copy(no_caches):
+    store = _store("music", ["a", "b", "c"])
+    store.update(_store("songs", ["b"]))
+    store["categories"] = {"music": {"name": "music"}, "songs": {"name": "Songs"}}
+    db, counters = FakeDatabase(store), FakeCounters()
+
+    result = await move_category(db, counters, "music", "Songs", batch_size=2)
+
+    assert (result["moved"], result["dropped"]) == (2, 1)
+    assert sorted(store["transcripts_songs"]) == [
+        "a_songs_transcript",
+        "b_songs_transcript",
+        "c_songs_transcript",
+    ]
+    assert store["transcripts_songs"]["a_songs_transcript"]["category"] == "Songs"
+    assert store["transcripts"]["c_songs_transcript"]["collection_ref"] == (
+        "transcripts_songs"
+    )
+    assert list(store["categories"]) == ["songs"]
+    assert counters.totals == {"music": [-3, -30], "Songs": [2, 20]}
+    assert no_caches.dropped == ["music", "Songs"]
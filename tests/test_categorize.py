@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from app.core.chatgpt import ChatGPTClient
+from app.core.config import get_settings
+
+
+class FakeClient(ChatGPTClient):
+    """Answers batched prompts with ``batch_answer`` and single ones by text"""
+
+    def __init__(self, batch_answer: str):
+        self.settings = get_settings()
+        self.batch_answer = batch_answer
+        self.calls = []
+
+    async def generate_completion(self, prompt: str, **kwargs):
+        self.calls.append(kwargs.get("response_format"))
+        if kwargs.get("response_format"):
+            return {"content": self.batch_answer}
+        return {"content": "Single " + prompt.rsplit("Text: ", 1)[1][:6]}
+
+
+@pytest.mark.asyncio
+async def test_one_call_for_a_group():
+    client = FakeClient(
+        json.dumps({"categories": {"1": "science", "2": "Travel", "3": "Music!"}})
+    )
+
+    categories = await client.generate_categories(["a", "b", "c"], ["Science"])
+
+    assert categories == ["Science", "Travel", "Music"]
+    assert len(client.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_missing_answers_fall_back_to_single_calls():
+    client = FakeClient(json.dumps({"categories": {"1": "Science", "2": "x"}}))
+
+    categories = await client.generate_categories(
+        ["first", "second", "thirds"], ["Science"]
+    )
+
+    assert categories == ["Science", "Single Second", "Single Thirds"]
+    assert len(client.calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_unparseable_response_falls_back_for_the_group():
+    client = FakeClient("Science, Travel")
+
+    categories = await client.generate_categories(["alpha1", "beta22"])
+
+    assert categories == ["Single Alpha1", "Single Beta22"]
@@ -0,0 +1,121 @@
+import gzip
+import zlib
+from types import SimpleNamespace
+
+import pytest
+
+from app.middleware import compression
+from app.middleware.compression import CompressionMiddleware, choose_encoding
+
+BODY = b'{"transcript": "' + b"words " * 400 + b'"}'
+
+
+def _app(chunks, content_type=b"application/json", headers=()):
+    """An ASGI app sending ``chunks`` as one streamed or whole body"""
+
+    async def app(scope, receive, send):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", content_type), *headers],
+            }
+        )
+        for n, chunk in enumerate(chunks):
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": n < len(chunks) - 1,
+                }
+            )
+
+    return app
+
+
+async def _request(app, accept_encoding="gzip", minimum_size=1024):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    headers = [(b"accept-encoding", accept_encoding.encode())]
+    scope = {"type": "http", "headers": headers}
+    await CompressionMiddleware(app, minimum_size=minimum_size)(scope, None, send)
+    headers = dict(sent[0]["headers"])
+    return headers, [message["body"] for message in sent[1:]]
+
+
+def test_negotiation_follows_q_values(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", SimpleNamespace())
+    assert choose_encoding("gzip, deflate, br") == "br"
+    assert choose_encoding("br;q=0.5, gzip;q=0.8") == "gzip"
+    assert choose_encoding("br;q=0, gzip") == "gzip"
+    assert choose_encoding("*;q=0.2") == "br"
+    assert choose_encoding("identity") is None
+    assert choose_encoding("gzip;q=0, br;q=0") is None
+
+    monkeypatch.setattr(compression, "brotli", None)
+    assert choose_encoding("br") is None
+    assert choose_encoding("br, gzip;q=0.1") == "gzip"
+
+
+@pytest.mark.asyncio
+async def test_large_body_is_gzipped():
+    headers, bodies = await _request(
+        _app([BODY], headers=[(b"content-length", str(len(BODY)).encode())])
+    )
+
+    assert headers[b"content-encoding"] == b"gzip"
+    assert headers[b"vary"] == b"Accept-Encoding"
+    assert int(headers[b"content-length"]) == len(bodies[0]) < len(BODY)
+    assert gzip.decompress(bodies[0]) == BODY
+
+
+@pytest.mark.asyncio
+async def test_large_body_is_brotli_compressed_when_preferred():
+    brotli = pytest.importorskip("brotli")
+    headers, bodies = await _request(_app([BODY]), "gzip;q=0.5, br")
+
+    assert headers[b"content-encoding"] == b"br"
+    assert brotli.decompress(bodies[0]) == BODY
+
+
+@pytest.mark.asyncio
+async def test_small_body_is_sent_as_is():
+    headers, bodies = await _request(_app([b'{"ok": true}']))
+
+    assert b"content-encoding" not in headers
+    assert bodies == [b'{"ok": true}']
+
+
+@pytest.mark.asyncio
+async def test_encoded_body_is_not_encoded_again():
+    encoded = gzip.compress(BODY)
+    headers, bodies = await _request(
+        _app([encoded], headers=[(b"content-encoding", b"gzip")])
+    )
+
+    assert bodies == [encoded]
+    assert b"vary" not in headers
+
+
+@pytest.mark.asyncio
+async def test_streamed_body_is_flushed_per_chunk():
+    chunks = [b'{"row": %d}\n' % n * 50 for n in range(3)]
+    headers, bodies = await _request(_app(chunks), minimum_size=10**6)
+
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    # Each chunk decompresses as soon as it arrives, nothing is held back
+    decompressor = zlib.decompressobj(31)
+    assert [decompressor.decompress(body) for body in bodies] == chunks
+
+
+@pytest.mark.asyncio
+async def test_event_streams_are_not_compressed():
+    events = [b"data: " + b"x" * 2000 + b"\n\n", b"data: done\n\n"]
+    headers, bodies = await _request(_app(events, content_type=b"text/event-stream"))
+
+    assert b"content-encoding" not in headers
+    assert bodies == events
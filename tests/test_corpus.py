@@ -0,0 +1,192 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import corpus
+from app.core.corpus import EXPORT_CHECKPOINT, READERS, export_corpus, import_corpus
+from app.core.dedupe import DuplicateIndex, encode, signature
+
+
+class FakeDatabase:
+    """The cursor reads export_corpus relies on, over in-memory collections"""
+
+    def __init__(self, collections):
+        self.collections = collections
+        self.pages_read = 0
+
+    async def collection_ids(self, prefix=""):
+        return sorted(name for name in self.collections if name.startswith(prefix))
+
+    async def read_page(self, collection, limit, after_id=None):
+        self.pages_read += 1
+        docs = sorted(self.collections[collection], key=lambda d: d["doc_id"])
+        if after_id is not None:
+            docs = [doc for doc in docs if doc["doc_id"] > after_id]
+        return docs[:limit]
+
+
+def _transcripts(category, count):
+    return [
+        {
+            "doc_id": f"video{i:03d}_{category}_transcript",
+            "video_id": f"video{i:03d}",
+            "transcript": "words " * 10,
+            "category": category,
+        }
+        for i in range(count)
+    ]
+
+
+def _read_back(path):
+    rows = []
+    for file in sorted(path.glob("*/part-*")):
+        for batch in READERS[file.suffix](file, batch_size=7):
+            rows.extend(batch)
+    return rows
+
+
+@pytest.mark.asyncio
+async def test_export_writes_chunks_of_bounded_size(tmp_path):
+    db = FakeDatabase(
+        {
+            "transcripts_music": _transcripts("music", 25),
+            "transcripts_news": _transcripts("news", 3),
+        }
+    )
+
+    result = await export_corpus(db, str(tmp_path), chunk_rows=10, page_size=4)
+
+    assert result["rows"] == 28
+    assert result["collections_done"] == 2
+    assert len(list((tmp_path / "transcripts_music").glob("part-*"))) == 3
+    assert len(_read_back(tmp_path)) == 28
+    assert not list(tmp_path.rglob("*.partial"))
+
+
+@pytest.mark.asyncio
+async def test_export_resumes_from_checkpoint(tmp_path):
+    db = FakeDatabase({"transcripts_music": _transcripts("music", 25)})
+    await export_corpus(db, str(tmp_path), chunk_rows=10, page_size=10)
+
+    # Pretend the run stopped after the first chunk
+    checkpoint_path = tmp_path / EXPORT_CHECKPOINT
+    checkpoint = json.loads(checkpoint_path.read_text())
+    position = checkpoint["collections"]["transcripts_music"]
+    position.update(chunks=1, rows=10, done=False, after_id="video009_music_transcript")
+    checkpoint_path.write_text(json.dumps(checkpoint))
+    for file in sorted((tmp_path / "transcripts_music").glob("part-*"))[1:]:
+        file.unlink()
+
+    db.pages_read = 0
+    result = await export_corpus(db, str(tmp_path), chunk_rows=10, page_size=10)
+
+    assert result["rows"] == 25
+    assert db.pages_read == 2  # only the chunks after the checkpoint
+    exported = [row["doc_id"] for row in _read_back(tmp_path)]
+    expected = [doc["doc_id"] for doc in db.collections["transcripts_music"]]
+    assert exported == sorted(expected)
+
+
+class Snapshot:
+    def __init__(self, ref, data):
+        self.id, self.exists, self._data = ref.id, data is not None, data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class Ref:
+    def __init__(self, collection, doc_id):
+        self.collection, self.id = collection, doc_id
+
+
+class Collection:
+    def __init__(self, name):
+        self.name = name
+
+    def document(self, doc_id):
+        return Ref(self.name, doc_id)
+
+
+class Transaction:
+    def __init__(self):
+        self.writes = []
+
+    def set(self, ref, data):
+        self.writes.append((ref, data))
+
+
+class ImportDatabase:
+    """The transactional writes import_corpus makes, over nested dicts"""
+
+    def __init__(self):
+        self.store = {}
+        self.db = self
+
+    def collection(self, name):
+        return Collection(name)
+
+    def get_all(self, refs, transaction=None):
+        return [
+            Snapshot(ref, self.store.get(ref.collection, {}).get(ref.id))
+            for ref in refs
+        ]
+
+    async def run_transaction(self, fn):
+        transaction = Transaction()
+        result = fn(transaction)
+        for ref, data in transaction.writes:
+            self.store.setdefault(ref.collection, {})[ref.id] = data
+        return result
+
+
+class FakeCounters:
+    def increment(self, writer, category, transcripts, tokens):
+        pass
+
+
+class FakePools:
+    def __init__(self):
+        self.dropped = []
+
+    def drop(self, category):
+        self.dropped.append(category)
+
+
+@pytest.mark.asyncio
+async def test_imported_batches_reach_the_pools_and_duplicate_index(
+    tmp_path, monkeypatch
+):
+    sig = signature("words " * 10)
+    rows = [
+        {**row, "title": "t", "sanitized_category": "music", "minhash": encode(sig)}
+        for row in _transcripts("music", 3)
+    ]
+    await export_corpus(
+        FakeDatabase({"transcripts_music": rows}), str(tmp_path), chunk_rows=10
+    )
+
+    pools, index = FakePools(), DuplicateIndex(threshold=0.85)
+    invalidated = []
+
+    async def invalidate(*resources):
+        invalidated.extend(resources)
+
+    monkeypatch.setattr(corpus, "get_sampling_pools", lambda: pools)
+    monkeypatch.setattr(
+        corpus.dedupe, "get_duplicate_detector", lambda: SimpleNamespace(index=index)
+    )
+    monkeypatch.setattr(
+        corpus, "get_validator_cache", lambda: SimpleNamespace(invalidate=invalidate)
+    )
+
+    db = ImportDatabase()
+    result = await import_corpus(db, FakeCounters(), str(tmp_path), batch_size=2)
+
+    assert result["created"] == 3
+    assert len(db.store["transcripts_music"]) == 3
+    # Found and sampled before the next full rebuild
+    assert len(index) == 3
+    assert pools.dropped == ["music", "music"]
+    assert "category:music" in invalidated
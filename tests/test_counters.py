@@ -0,0 +1,67 @@
+from datetime import datetime, timezone
+
+import pytest
+from firebase_admin import firestore
+
+from app.core.counters import COUNTERS, SHARDS, CategoryCounters
+
+
+class Ref:
+    def __init__(self, path):
+        self.path = path
+
+    def collection(self, name):
+        return Ref(f"{self.path}/{name}")
+
+    def document(self, doc_id):
+        return Ref(f"{self.path}/{doc_id}")
+
+
+class Batch:
+    """Applies merged sets the way Firestore does, increments included"""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def set(self, ref, data, merge=False):
+        doc = self.docs.setdefault(ref.path, {})
+        for field, value in data.items():
+            if isinstance(value, firestore.Increment):
+                value = doc.get(field, 0) + value.value
+            doc[field] = value
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.docs = {}
+        self.db = Ref("")
+
+    async def get_collection_group(self, collection_id):
+        return [
+            doc
+            for path, doc in self.docs.items()
+            if path.split("/")[-2] == collection_id
+        ]
+
+
+@pytest.mark.asyncio
+async def test_increments_spread_over_shards_and_add_up():
+    db = FakeDatabase()
+    counters = CategoryCounters(db, shards=4)
+    batch = Batch(db.docs)
+
+    for _ in range(40):
+        counters.increment(batch, "Science Fiction", 1, 100)
+    counters.increment(batch, "science fiction", -1, -100)
+    counters.increment(batch, "History", 2, 50)
+
+    science = [p for p in db.docs if p.startswith(f"/{COUNTERS}/science_fiction/")]
+    assert 1 < len(science) <= 4
+    assert all(p.split("/")[-2] == SHARDS for p in science)
+
+    stats = await counters.all_stats()
+    assert [(s["name"], s["transcript_count"], s["total_tokens"]) for s in stats] == [
+        ("History", 2, 50),
+        ("Science Fiction", 39, 3900),
+    ]
+    assert stats[0]["last_updated"] <= datetime.now(timezone.utc)
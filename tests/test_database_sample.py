@@ -0,0 +1,99 @@
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import firebase
+from app.core.firebase import Database
+
+
+class Snapshot:
+    def __init__(self, doc_id, data):
+        self.id, self._data = doc_id, data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class Query:
+    """The range queries Database.sample makes, over a dict of documents"""
+
+    def __init__(self, docs, reads, start=None, count=None):
+        self.docs, self.reads = docs, reads
+        self.start, self.count = start, count
+
+    def where(self, field, operator, value):
+        assert operator == ">="
+        return Query(self.docs, self.reads, value, self.count)
+
+    def order_by(self, field):
+        assert field == "random_key"
+        return self
+
+    def limit(self, count):
+        return Query(self.docs, self.reads, self.start, count)
+
+    def get(self):
+        self.reads.append(self.start)
+        ordered = sorted(self.docs.items(), key=lambda item: item[1]["random_key"])
+        return [
+            Snapshot(doc_id, doc)
+            for doc_id, doc in ordered
+            if self.start is None or doc["random_key"] >= self.start
+        ][: self.count]
+
+
+def _database(keys):
+    docs = {f"doc{n}": {"random_key": key} for n, key in enumerate(keys)}
+    reads = []
+    db = Database.__new__(Database)
+    db.settings = SimpleNamespace(firestore_timeout_seconds=5)
+    db.db = SimpleNamespace(collection=lambda name: Query(docs, reads))
+    return db, reads
+
+
+def _random_points(monkeypatch, points):
+    points = itertools.cycle(points)
+    random = SimpleNamespace(random=lambda: next(points))
+    monkeypatch.setattr(firebase, "random", random)
+
+
+def test_first_key_at_or_after_the_point_wraps_around():
+    db, _ = _database([0.1, 0.5, 0.9])
+
+    assert db._first_from_key("transcripts_music", "random_key", 0.5).id == "doc1"
+    assert db._first_from_key("transcripts_music", "random_key", 0.6).id == "doc2"
+    # Past the largest key, the smallest one is next
+    assert db._first_from_key("transcripts_music", "random_key", 0.95).id == "doc0"
+    assert _database([])[0]._first_from_key("empty", "random_key", 0.5) is None
+
+
+@pytest.mark.asyncio
+async def test_k_larger_than_the_collection_returns_each_document_once(monkeypatch):
+    _random_points(monkeypatch, [0.05, 0.3, 0.7, 0.95])
+    db, reads = _database([0.1, 0.5, 0.9])
+
+    docs = await db.sample("transcripts_music", 10)
+
+    assert sorted(doc["doc_id"] for doc in docs) == ["doc0", "doc1", "doc2"]
+    assert len(reads) <= 2 * 3 * 10  # bounded, a wrap-around costs two reads
+
+
+@pytest.mark.asyncio
+async def test_repeated_draws_are_not_duplicated(monkeypatch):
+    # Every point lands on the same document
+    _random_points(monkeypatch, [0.2, 0.3, 0.4])
+    db, _ = _database([0.1, 0.5, 0.9])
+
+    docs = await db.sample("transcripts_music", 2)
+
+    assert [doc["doc_id"] for doc in docs] == ["doc1"]
+
+
+@pytest.mark.asyncio
+async def test_empty_collection_gives_up_after_one_round(monkeypatch):
+    _random_points(monkeypatch, [0.5])
+    db, reads = _database([])
+
+    assert await db.sample("transcripts_music", 3) == []
+    assert len(reads) == 2 * 3
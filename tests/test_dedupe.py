@@ -0,0 +1,158 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core import dedupe
+from app.core.dedupe import (
+    DuplicateFilter,
+    DuplicateIndex,
+    encode,
+    signature,
+    similarity,
+)
+
+WORDS = [f"word{i}" for i in range(500)]
+
+
+def _text(rng: random.Random, words: int = 400) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _edited(text: str, rng: random.Random, edits: int = 3) -> str:
+    words = text.split()
+    for _ in range(edits):
+        words[rng.randrange(len(words))] = "changed"
+    return " ".join(words)
+
+
+def test_signature_is_stable_and_estimates_similarity():
+    rng = random.Random(1)
+    text = _text(rng)
+
+    assert signature(text) == signature(text.upper())
+    assert similarity(signature(text), signature(_edited(text, rng))) > 0.85
+    assert similarity(signature(text), signature(_text(rng))) < 0.2
+    assert signature("") is None
+
+
+def test_index_finds_near_duplicates_only():
+    rng = random.Random(2)
+    texts = [_text(rng) for _ in range(50)]
+    index = DuplicateIndex(threshold=0.85)
+    for n, text in enumerate(texts):
+        index.add(f"video{n}_science_transcript", signature(text))
+
+    found = index.find_duplicate(signature(_edited(texts[7], rng)))
+    assert found is not None and found[0] == "video7_science_transcript"
+    assert index.find_duplicate(signature(_text(rng))) is None
+    # The video's own transcript is not a duplicate of itself
+    assert (
+        index.find_duplicate(signature(texts[7]), exclude_prefix="video7_") is None
+    )
+
+
+def test_index_discard():
+    rng = random.Random(3)
+    text = _text(rng)
+    index = DuplicateIndex(threshold=0.85)
+    index.add("a", signature(text))
+    index.add("b", signature(text))
+
+    index.discard("a")
+    assert index.find_duplicate(signature(text))[0] == "b"
+    index.discard("b")
+    assert index.find_duplicate(signature(text)) is None
+    assert len(index) == 0 and not index.buckets
+
+
+def test_filter_drops_near_duplicates():
+    rng = random.Random(4)
+    text = _text(rng)
+    unique = DuplicateFilter(threshold=0.85)
+
+    assert unique.admit(signature(text))
+    assert not unique.admit(signature(_edited(text, rng)))
+    assert unique.admit(signature(_text(rng)))
+    assert unique.admit(None)
+
+
+class PagedDatabase:
+    """Global transcripts with a created_at each, paged in (created_at, ID)
+    order like Database.select_fields"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.limits = []
+
+    async def select_fields(
+        self,
+        collection,
+        fields,
+        after_field=None,
+        after_value=None,
+        limit=None,
+        after_id=None,
+    ):
+        self.limits.append(limit)
+        rows = sorted(self.rows, key=lambda row: (row["created_at"], row["doc_id"]))
+        if after_id is None:
+            rows = [row for row in rows if row["created_at"] > after_value]
+        else:
+            rows = [
+                row
+                for row in rows
+                if (row["created_at"], row["doc_id"]) > (after_value, after_id)
+            ]
+        return rows[:limit]
+
+
+@pytest.mark.asyncio
+async def test_index_is_loaded_in_pages(monkeypatch):
+    monkeypatch.setattr(dedupe, "INDEX_PAGE_SIZE", 4)
+    rng = random.Random(5)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = [
+        {
+            "doc_id": f"video{n}_science_transcript",
+            "minhash": encode(signature(_text(rng))),
+            "created_at": start + timedelta(minutes=n),
+        }
+        for n in range(10)
+    ]
+    db = PagedDatabase(rows)
+    index = DuplicateIndex(threshold=0.85)
+
+    await index.refresh(db, ttl=0, rebuild_after=3600)
+    assert len(index) == 10 and index.watermark == rows[-1]["created_at"]
+    assert db.limits == [4, 4, 4]
+
+    rows.append({**rows[0], "doc_id": "new", "created_at": start + timedelta(1)})
+    await index.refresh(db, ttl=0, rebuild_after=3600)
+    assert len(index) == 11
+    assert len(db.limits) == 4  # only what is newer than the watermark
+
+
+@pytest.mark.asyncio
+async def test_pages_do_not_skip_documents_sharing_a_timestamp(monkeypatch):
+    monkeypatch.setattr(dedupe, "INDEX_PAGE_SIZE", 4)
+    rng = random.Random(6)
+    imported_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = [
+        {
+            "doc_id": f"video{n}_science_transcript",
+            "minhash": encode(signature(_text(rng))),
+            "created_at": imported_at,  # e.g. a batch import
+        }
+        for n in range(10)
+    ]
+    db = PagedDatabase(rows)
+    index = DuplicateIndex(threshold=0.85)
+
+    await index.refresh(db, ttl=0, rebuild_after=3600)
+    assert len(index) == 10
+
+    # Saved later with the same timestamp, after the watermark's doc ID
+    rows.append({**rows[0], "doc_id": "video9_zoology_transcript"})
+    await index.refresh(db, ttl=0, rebuild_after=3600)
+    assert len(index) == 11
@@ -0,0 +1,23 @@
+from app.utils.diff import apply_diff, make_diff
+
+
+def test_round_trip():
+    old = "The fox jumped over the lazy dog.\n\nThen it slept."
+    new = "The quick fox leapt over the dog.\n\nThen it slept soundly."
+
+    assert apply_diff(old, make_diff(old, new)) == new
+    assert apply_diff(new, make_diff(new, old)) == old
+
+
+def test_diff_only_stores_changes():
+    old = " ".join(f"word{i}" for i in range(1000))
+    new = old.replace("word500", "changed")
+
+    diff = make_diff(old, new)
+    assert diff == [[1000, 1001, "changed"]]
+
+
+def test_identical_and_empty_texts():
+    assert make_diff("same text", "same text") == []
+    assert apply_diff("", make_diff("", "new story")) == "new story"
+    assert apply_diff("old story", make_diff("old story", "")) == ""
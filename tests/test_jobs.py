@@ -0,0 +1,155 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from app.core.jobs import JobQueue
+from app.core.state import MemoryState
+from app.utils.errors import JobLimitError
+
+
+@pytest_asyncio.fixture
+async def queue():
+    queue = JobQueue(
+        "test",
+        MemoryState(),
+        workers=2,
+        queue_size=10,
+        max_per_user=2,
+        budget_seconds=5,
+        ttl_seconds=60,
+    )
+    yield queue
+    await queue.stop()
+
+
+async def _wait_for(queue, job_id, status):
+    for _ in range(100):
+        record = await queue.get(job_id)
+        if record["status"] == status:
+            return record
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} never reached {status}: {record}")
+
+
+@pytest.mark.asyncio
+async def test_job_runs_and_stores_result(queue):
+    async def story(payload):
+        return {"variations": [payload["story"].upper()]}
+
+    queue.register("story", story)
+    await queue.start()
+
+    record = await queue.submit("story", {"story": "once"}, user="alice")
+    assert record["status"] == "queued"
+
+    done = await _wait_for(queue, record["job_id"], "completed")
+    assert done["result"] == {"variations": ["ONCE"]}
+    assert done["started_at"]
+
+
+@pytest.mark.asyncio
+async def test_failed_job_records_error(queue):
+    async def story(payload):
+        raise ValueError("model unavailable")
+
+    queue.register("story", story)
+    await queue.start()
+
+    record = await queue.submit("story", {}, user="alice")
+    failed = await _wait_for(queue, record["job_id"], "failed")
+    assert failed["error"] == "model unavailable"
+
+
+@pytest.mark.asyncio
+async def test_per_user_limit(queue):
+    release = asyncio.Event()
+
+    async def story(payload):
+        await release.wait()
+        return {"variations": []}
+
+    queue.register("story", story)
+    await queue.start()
+
+    first = await queue.submit("story", {}, user="alice")
+    await queue.submit("story", {}, user="alice")
+    with pytest.raises(JobLimitError):
+        await queue.submit("story", {}, user="alice")
+    # Other users are not affected
+    await queue.submit("story", {}, user="bob")
+
+    release.set()
+    await _wait_for(queue, first["job_id"], "completed")
+    await asyncio.sleep(0.05)
+    await queue.submit("story", {}, user="alice")
+
+
+@pytest.mark.asyncio
+async def test_cancel_running_job(queue):
+    started = asyncio.Event()
+
+    async def story(payload):
+        started.set()
+        await asyncio.sleep(10)
+
+    queue.register("story", story)
+    await queue.start()
+
+    record = await queue.submit("story", {}, user="alice")
+    await started.wait()
+    await queue.cancel(record["job_id"])
+
+    await _wait_for(queue, record["job_id"], "cancelled")
+    assert queue.stats()["running"] == 0
+
+
+@pytest.mark.asyncio
+async def test_events_stream_until_terminal(queue):
+    release = asyncio.Event()
+
+    async def story(payload):
+        await release.wait()
+        return {"variations": ["done"]}
+
+    queue.register("story", story)
+    await queue.start()
+
+    record = await queue.submit("story", {}, user="alice")
+    statuses = []
+
+    async def collect():
+        async for update in queue.events(record["job_id"]):
+            statuses.append(update["status"])
+
+    collector = asyncio.ensure_future(collect())
+    await asyncio.sleep(0.05)
+    release.set()
+    await asyncio.wait_for(collector, timeout=1)
+
+    assert statuses[-1] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_handler_reports_progress(queue):
+    release = asyncio.Event()
+
+    async def export(payload):
+        await queue.report_progress({"rows": 10})
+        await release.wait()
+        return {"rows": 20}
+
+    queue.register("export", export)
+    await queue.start()
+
+    record = await queue.submit("export", {}, user="admin")
+    for _ in range(100):
+        running = await queue.get(record["job_id"])
+        if running.get("progress"):
+            break
+        await asyncio.sleep(0.01)
+    assert running["progress"] == {"rows": 10}
+
+    release.set()
+    done = await _wait_for(queue, record["job_id"], "completed")
+    assert done["result"] == {"rows": 20}
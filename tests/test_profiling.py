@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.config import get_settings
+from app.core.profiling import Capture, StackSampler, list_captures, load_capture
+from app.middleware.profiling import ProfilingMiddleware
+
+
+def _busy_wait(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_capture_samples_worker_threads(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "profile_dir", str(tmp_path))
+
+    capture = Capture.begin("GET", "/slow", "header")
+    assert Capture.begin("GET", "/other", "header") is None  # one at a time
+    await asyncio.to_thread(_busy_wait, 0.2)
+    summary = await asyncio.to_thread(capture.finish, 200)
+
+    assert summary["ticks"] > 0
+    assert any("_busy_wait" in frame for frame, _ in summary["hot_spots"]["self"])
+    assert "_busy_wait" in load_capture(capture.name, "folded")
+    assert [c["name"] for c in list_captures(10)] == [capture.name]
+    assert load_capture("../secrets", "folded") is None
+
+    second = Capture.begin("GET", "/slow", "sampled")
+    assert second is not None
+    await asyncio.to_thread(second.finish, 200)
+
+
+@pytest.mark.asyncio
+async def test_failed_start_releases_the_capture_slot(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "profile_dir", str(tmp_path))
+
+    def fail(self):
+        raise RuntimeError("can't start new thread")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(StackSampler, "start", fail)
+        with pytest.raises(RuntimeError):
+            Capture.begin("GET", "/slow", "header")
+
+    capture = Capture.begin("GET", "/slow", "header")
+    assert capture is not None
+    await asyncio.to_thread(capture.finish, 200)
+
+
+@pytest.mark.asyncio
+async def test_streamed_response_gives_up_the_capture_slot(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "profile_dir", str(tmp_path))
+    monkeypatch.setattr(get_settings(), "profile_sample_rate", 1.0)
+    first_chunk, disconnect = asyncio.Event(), asyncio.Event()
+
+    async def stream(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}\n", "more_body": True})
+        first_chunk.set()
+        await disconnect.wait()
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/stream", "headers": []}
+    response = asyncio.create_task(ProfilingMiddleware(stream)(scope, None, send))
+    await first_chunk.wait()
+
+    # The stream is still open, yet another request can be profiled
+    capture = Capture.begin("GET", "/other", "header")
+    assert capture is not None
+    await asyncio.to_thread(capture.finish, 200)
+
+    disconnect.set()
+    await response
+    assert len(list_captures(10)) == 2
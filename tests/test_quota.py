@@ -0,0 +1,114 @@
+from types import SimpleNamespace
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from app.core.blocking import BlockingPool
+from app.core.quota import YouTubeQuota
+from app.core.resilience import get_breaker
+from app.core.state import MemoryState
+from app.core.youtube import DATA_API_HOST, YouTubeService
+from app.utils.errors import QuotaExceededError
+
+
+class Unavailable(Exception):
+    status_code = 503
+    response = SimpleNamespace(headers={"retry-after": "0"})
+
+
+class FakeRequest:
+    def __init__(self, outcomes, calls):
+        self.outcomes = outcomes
+        self.calls = calls
+        self.headers = {}
+
+    def execute(self, http=None):
+        self.calls.append(dict(self.headers))
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class FakeAPI:
+    """playlistItems().list() answering with ``outcomes`` in turn"""
+
+    def __init__(self, outcomes):
+        self.outcomes = outcomes
+        self.calls = []
+
+    def playlistItems(self):
+        return self
+
+    def list(self, **kwargs):
+        return FakeRequest(self.outcomes, self.calls)
+
+
+class FakeService(YouTubeService):
+    def __init__(self, outcomes, daily_budget=100):
+        self.settings = SimpleNamespace(
+            youtube_timeout_seconds=5, channel_cache_ttl_seconds=0
+        )
+        self.api = FakeAPI(outcomes)
+        self.io = BlockingPool("test-youtube-io", {DATA_API_HOST: 2})
+        self.state = MemoryState()
+        self.quota = YouTubeQuota(self.state, daily_budget)
+
+
+def _page(video_id, etag="etag-1"):
+    return {
+        "etag": etag,
+        "items": [
+            {
+                "snippet": {
+                    "resourceId": {"videoId": video_id},
+                    "title": video_id,
+                    "publishedAt": "2024-01-01T00:00:00Z",
+                    "thumbnails": {"default": {"url": "thumbnail"}},
+                }
+            }
+        ],
+    }
+
+
+@pytest.mark.asyncio
+async def test_every_attempt_is_charged():
+    get_breaker("youtube").record_success()
+    service = FakeService([Unavailable(), _page("video000001")])
+
+    videos = await service.get_channel_videos("UCchannel")
+
+    assert [v["video_id"] for v in videos] == ["video000001"]
+    assert len(service.api.calls) == 2
+    usage = await service.quota.usage()
+    assert usage["used"] == 2
+    assert usage["by_method"] == {"playlistItems.list": 2}
+
+
+@pytest.mark.asyncio
+async def test_spent_budget_refuses_without_calling_or_retrying():
+    get_breaker("youtube").record_success()
+    service = FakeService([_page("video000001"), _page("video000002")], 1)
+
+    await service.get_channel_videos("UCchannel")
+    await service.state.delete("channel_videos:UCchannel")
+    with pytest.raises(QuotaExceededError):
+        await service.get_channel_videos("UCchannel")
+
+    assert len(service.api.calls) == 1
+    assert (await service.quota.usage())["used"] == 1
+
+
+@pytest.mark.asyncio
+async def test_unchanged_listing_is_revalidated_for_one_unit():
+    get_breaker("youtube").record_success()
+    not_modified = HttpError(httplib2.Response({"status": 304}), b"")
+    service = FakeService([_page("video000001"), not_modified])
+
+    first = await service.get_channel_videos("UCchannel")
+    second = await service.get_channel_videos("UCchannel")
+
+    assert second == first
+    assert service.api.calls[1] == {"If-None-Match": "etag-1"}
+    assert (await service.quota.usage())["used"] == 2
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from app.core.resilience import (
+    CircuitBreaker,
+    call_upstream,
+    deadline_scope,
+    get_breaker,
+    remaining_time,
+    retry_after,
+)
+from app.utils.errors import CircuitOpenError, DeadlineExceededError
+
+
+class UpstreamError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = type("Response", (), {"headers": headers or {}})()
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried():
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise UpstreamError(503)
+        return "ok"
+
+    result = await call_upstream("test-retry", flaky, retries=3, base_delay=0.001)
+    assert result == "ok"
+    assert len(attempts) == 3
+
+
+@pytest.mark.asyncio
+async def test_permanent_errors_are_not_retried():
+    attempts = []
+
+    async def missing():
+        attempts.append(1)
+        raise UpstreamError(404)
+
+    with pytest.raises(UpstreamError):
+        await call_upstream("test-permanent", missing, retries=3, base_delay=0.001)
+    assert len(attempts) == 1
+    assert get_breaker("test-permanent").state == CircuitBreaker.CLOSED
+
+
+def test_retry_after_header_is_honored():
+    assert retry_after(UpstreamError(429, {"retry-after": "7"})) == 7.0
+    assert retry_after(UpstreamError(429)) is None
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_after_repeated_failures():
+    breaker = get_breaker("test-circuit")
+    breaker.failure_threshold = 2
+
+    async def down():
+        raise UpstreamError(503)
+
+    for _ in range(2):
+        with pytest.raises(UpstreamError):
+            await call_upstream("test-circuit", down)
+
+    with pytest.raises(CircuitOpenError):
+        await call_upstream("test-circuit", down)
+
+
+@pytest.mark.asyncio
+async def test_calls_are_bounded_by_the_deadline():
+    async def hang():
+        await asyncio.sleep(10)
+
+    with deadline_scope(0.05):
+        assert remaining_time() <= 0.05
+        with pytest.raises(asyncio.TimeoutError):
+            await call_upstream("test-deadline", hang)
+        await asyncio.sleep(0.05)
+        with pytest.raises(DeadlineExceededError):
+            await call_upstream("test-deadline", hang)
+
+    assert remaining_time() is None
+
+
+@pytest.mark.asyncio
+async def test_cancelled_half_open_probe_lets_the_next_call_probe():
+    breaker = get_breaker("test-cancelled-probe")
+    breaker.failure_threshold = 1
+    breaker.reset_timeout = 0.01
+
+    async def down():
+        raise UpstreamError(503)
+
+    with pytest.raises(UpstreamError):
+        await call_upstream("test-cancelled-probe", down)
+    await asyncio.sleep(0.02)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    probe = asyncio.create_task(call_upstream("test-cancelled-probe", hang))
+    await asyncio.sleep(0.01)
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+
+    async def up():
+        return "ok"
+
+    assert await call_upstream("test-cancelled-probe", up) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,173 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import youtube
+from app.core.sampling import SamplingPools
+from app.core.youtube import YouTubeService
+from app.schemas.transcripts import CategoryWeight
+from app.utils.categories import category_collection
+
+
+class FakeDatabase:
+    """Transcripts per collection as ``{doc_id: doc}``, docs with a created_at"""
+
+    def __init__(self, store):
+        self.store = store
+        self.queries = []
+        self.body_reads = []
+        self.sampled = []
+
+    async def select_fields(
+        self, collection, fields, after_field=None, after_value=None, limit=None
+    ):
+        self.queries.append((collection, after_value, limit))
+        rows = [
+            {"doc_id": doc_id, **{f: doc.get(f) for f in fields}}
+            for doc_id, doc in sorted(self.store.get(collection, {}).items())
+            if after_field is None or doc[after_field] > after_value
+        ]
+        return rows[:limit]
+
+    async def get_documents(self, collection, doc_ids):
+        self.body_reads.extend(doc_ids)
+        docs = self.store.get(collection, {})
+        return {doc_id: docs[doc_id] for doc_id in doc_ids if doc_id in docs}
+
+    async def sample(self, collection, k):
+        self.sampled.append((collection, k))
+        return list(self.store.get(collection, {}).values())[:k]
+
+
+def _docs(category, count, start=0):
+    return {
+        f"{category}{n}": {
+            "video_id": f"{category}{n}",
+            "token_count": 10,
+            "created_at": n,
+            "transcript": f"{category} body {n}",
+        }
+        for n in range(start, start + count)
+    }
+
+
+def _pools(store, ttl=0.0, max_size=100):
+    pools = SamplingPools(FakeDatabase(store))
+    pools.settings = SimpleNamespace(
+        sampling_pool_ttl_seconds=ttl,
+        sampling_pool_rebuild_seconds=3600,
+        sampling_pool_max_size=max_size,
+    )
+    return pools
+
+
+@pytest.mark.asyncio
+async def test_pool_pages_in_new_transcripts_after_its_watermark():
+    collection = category_collection("science")
+    store = {collection: _docs("science", 3)}
+    pools = _pools(store)
+
+    pool = await pools.get_pool("science")
+    assert len(pool) == 3 and pool.watermark == 2
+
+    store[collection].update(_docs("science", 2, start=3))
+    pool = await pools.get_pool("science")
+
+    assert len(pool) == 5 and pool.watermark == 4
+    # A full load, then only what was created after the watermark
+    assert pools.db.queries == [(collection, None, 101), (collection, 2, None)]
+
+
+@pytest.mark.asyncio
+async def test_pool_is_not_refreshed_within_its_ttl():
+    store = {category_collection("science"): _docs("science", 3)}
+    pools = _pools(store, ttl=60)
+
+    await pools.get_pool("science")
+    await pools.get_pool("science")
+
+    assert len(pools.db.queries) == 1
+
+
+@pytest.mark.asyncio
+async def test_oversized_category_is_sampled_from_the_database():
+    collection = category_collection("science")
+    pools = _pools({collection: _docs("science", 5)}, max_size=3)
+
+    weights = [CategoryWeight(name="science", weight=1)]
+    material = await pools.sample_material(weights, 2)
+
+    assert (await pools.get_pool("science")).oversized
+    assert len(material["science"]) == 2
+    assert pools.db.sampled == [(collection, 2)]
+    assert pools.db.body_reads == []
+
+
+@pytest.mark.asyncio
+async def test_draws_follow_the_weights():
+    store = {
+        category_collection(name): _docs(name, 10) for name in ("a", "b", "c", "d")
+    }
+    pools = _pools(store)
+    weights = [
+        CategoryWeight(name="a", weight=0.75),
+        CategoryWeight(name="b", weight=0.2),
+        CategoryWeight(name="c", weight=0.01),
+        CategoryWeight(name="d", weight=0),
+    ]
+
+    material = await pools.sample_material(weights, 4)
+
+    # 16 draws in all: a capped at 4, b gets floor(3.2), c at least one
+    assert {name: len(texts) for name, texts in material.items()} == {
+        "a": 4,
+        "b": 3,
+        "c": 1,
+        "d": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_discarded_transcript_body_is_read_again():
+    collection = category_collection("science")
+    store = {collection: _docs("science", 1)}
+    pools = _pools(store)
+    pool = await pools.get_pool("science")
+
+    assert await pools.load_bodies(collection, pool.sample(1)) == ["science body 0"]
+    # Saved again, as save_transcript does
+    store[collection]["science0"].update(transcript="rewritten", created_at=1)
+    pools.discard("science", "science0")
+    pool = await pools.get_pool("science")
+
+    assert await pools.load_bodies(collection, pool.sample(1)) == ["rewritten"]
+
+
+@pytest.mark.asyncio
+async def test_saving_a_transcript_again_forgets_its_body(monkeypatch):
+    collection = category_collection("science")
+    pools = _pools({})
+    pools.bodies[(collection, "video000001_science_transcript")] = "old body"
+    monkeypatch.setattr(youtube, "get_sampling_pools", lambda: pools)
+
+    async def run_transaction(write):
+        write(SimpleNamespace(set=lambda *args: None))
+
+    document = SimpleNamespace(get=lambda transaction: SimpleNamespace(exists=False))
+    service = YouTubeService.__new__(YouTubeService)
+    collections = SimpleNamespace(document=lambda doc_id: document)
+    service.db = SimpleNamespace(
+        db=SimpleNamespace(collection=lambda name: collections),
+        run_transaction=run_transaction,
+    )
+    service.counters = SimpleNamespace(increment=lambda *args, **kwargs: None)
+
+    async def invalidate(*args):
+        pass
+
+    service._invalidate_validators = invalidate
+    doc_id = await service.save_transcript(
+        "video000001", "title", "rewritten", "science"
+    )
+
+    assert (collection, doc_id) not in pools.bodies
@@ -0,0 +1,91 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.chatgpt import ChatGPTClient
+from app.core.config import get_settings
+from app.core.resilience import get_breaker
+from app.core.scheduler import Priority, RateLimitScheduler, estimate_tokens
+
+
+def test_estimate_tokens_includes_output_budget():
+    messages = [{"role": "user", "content": "x" * 400}]
+    assert estimate_tokens(messages, max_tokens=100) == 4 + 100 + 100
+
+
+@pytest.mark.asyncio
+async def test_interactive_calls_jump_ahead_of_batch():
+    scheduler = RateLimitScheduler(requests_per_minute=600, tokens_per_minute=100000)
+    # Drain the request bucket so every caller has to queue
+    scheduler.requests.tokens = 0
+    order = []
+
+    async def call(name, priority):
+        async with scheduler.slot(10, priority):
+            order.append(name)
+
+    batch = [asyncio.create_task(call(f"batch{i}", Priority.BATCH)) for i in range(2)]
+    await asyncio.sleep(0)
+    interactive = asyncio.create_task(call("interactive", Priority.INTERACTIVE))
+    await asyncio.gather(*batch, interactive)
+
+    assert order[0] == "interactive", "Interactive call was not served first"
+    assert scheduler.stats()["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_actual_usage_is_reconciled():
+    scheduler = RateLimitScheduler(requests_per_minute=60, tokens_per_minute=1000)
+    async with scheduler.slot(500) as usage:
+        usage["total_tokens"] = 100
+
+    assert scheduler.tokens.tokens >= 900, "Unused token estimate was not returned"
+
+
+class RateLimited(Exception):
+    status_code = 429
+    response = SimpleNamespace(headers={"retry-after": "0"})
+
+
+class FlakyCompletions:
+    """Rate limited once, then answers"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            raise RateLimited()
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+            usage=SimpleNamespace(total_tokens=10),
+        )
+
+
+class StubbedClient(ChatGPTClient):
+    def __init__(self):
+        self.settings = get_settings()
+        self.completions = FlakyCompletions()
+        self.client = SimpleNamespace(
+            chat=SimpleNamespace(completions=self.completions)
+        )
+        self.default_model = "gpt-3.5-turbo"
+        self.scheduler = RateLimitScheduler(
+            requests_per_minute=60, tokens_per_minute=100000
+        )
+
+
+@pytest.mark.asyncio
+async def test_each_retry_takes_its_own_slot():
+    get_breaker("openai").record_success()
+    client = StubbedClient()
+
+    response = await client.generate_completion("prompt", max_tokens=50)
+
+    stats = client.scheduler.stats()
+    assert response["content"] == "ok" and client.completions.calls == 2
+    assert stats["wait_seconds"]["interactive"]["count"] == 2
+    assert stats["available_requests"] < 59
+    assert stats["in_flight"] == 0
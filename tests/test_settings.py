@@ -0,0 +1,18 @@
+import pytest
+
+from app.core.config import get_settings
+from app.router.common import main
+
+
+@pytest.mark.asyncio
+async def test_settings_route_leaves_out_secrets(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "admin_token", "admin-secret")
+    monkeypatch.setattr(settings, "openai_api_key", "sk-secret")
+    monkeypatch.setattr(settings, "youtube_api_key", "yt-secret")
+    monkeypatch.setattr(settings, "shared_state_url", "redis://:pw-secret@cache:6379")
+
+    response = await main()
+
+    assert response["settings"]["job_workers"] == settings.job_workers
+    assert "secret" not in repr(response)
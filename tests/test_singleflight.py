@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from app.core.singleflight import SingleFlight, make_key
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_run():
+    group = SingleFlight("test")
+    runs = []
+
+    async def fetch():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return ["doc"]
+
+    results = await asyncio.gather(*[group.do("key", fetch) for _ in range(5)])
+
+    assert len(runs) == 1, "Identical calls were not coalesced"
+    assert all(result == ["doc"] for result in results)
+    assert group.stats() == {"calls": 5, "executed": 1, "coalesced": 4, "in_flight": 0}
+
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_and_not_cached():
+    group = SingleFlight("test-errors")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    results = await asyncio.gather(
+        group.do("key", fail), group.do("key", fail), return_exceptions=True
+    )
+    assert all(isinstance(result, ValueError) for result in results)
+
+    async def succeed():
+        return "ok"
+
+    assert await group.do("key", succeed) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_call():
+    group = SingleFlight("test-cancel")
+
+    async def slow():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    first = asyncio.ensure_future(group.do("key", slow))
+    second = asyncio.ensure_future(group.do("key", slow))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == "done"
+
+
+def test_make_key_is_stable():
+    messages = [{"role": "user", "content": "hi"}]
+    assert make_key("gpt", messages, 0.7) == make_key("gpt", list(messages), 0.7)
+    assert make_key("gpt", messages, 0.7) != make_key("gpt", messages, 0.9)
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from app.core.state import MemoryState, RedisState, SQLiteState
+
+
+@pytest_asyncio.fixture(params=["memory", "sqlite"])
+async def state(request, tmp_path):
+    if request.param == "memory":
+        backend = MemoryState()
+    else:
+        backend = SQLiteState(str(tmp_path / "state.db"), poll_interval=0.01)
+    yield backend
+    await backend.close()
+
+
+@pytest.mark.asyncio
+async def test_set_get_delete(state):
+    await state.set("key", {"status": "pending", "count": 1})
+    assert await state.get("key") == {"status": "pending", "count": 1}
+
+    await state.delete("key")
+    assert await state.get("key") is None
+
+
+@pytest.mark.asyncio
+async def test_values_expire(state):
+    await state.set("short", "value", ttl=0.01)
+    await asyncio.sleep(0.02)
+    assert await state.get("short") is None
+
+
+@pytest.mark.asyncio
+async def test_incr_is_atomic(state):
+    results = await asyncio.gather(*[state.incr("counter") for _ in range(20)])
+    assert sorted(results) == list(range(1, 21))
+    assert await state.incr("counter", amount=5) == 25
+
+
+@pytest.mark.asyncio
+async def test_incr_restarts_after_ttl(state):
+    await state.incr("daily", ttl=0.01)
+    await asyncio.sleep(0.02)
+    assert await state.incr("daily", ttl=0.01) == 1
+
+
+@pytest.mark.asyncio
+async def test_publish_subscribe(state):
+    subscription = state.subscribe("events")
+    receiver = asyncio.ensure_future(subscription.__anext__())
+    await asyncio.sleep(0.05)
+
+    await state.publish("other", {"n": 0})
+    await state.publish("events", {"n": 1})
+
+    assert await asyncio.wait_for(receiver, timeout=1) == {"n": 1}
+    await subscription.aclose()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_state_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "shared.db")
+    first, second = SQLiteState(path), SQLiteState(path)
+
+    await first.set("batch:1", {"status": "processing"})
+    await first.incr("quota")
+    assert await second.get("batch:1") == {"status": "processing"}
+    assert await second.incr("quota") == 2
+
+
+class StandInRedis:
+    """The subset of redis.asyncio.Redis that RedisState relies on"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, px=None):
+        self.data[key] = value.encode()
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+    async def incrby(self, key, amount):
+        value = int(self.data.get(key, b"0")) + amount
+        self.data[key] = str(value).encode()
+        return value
+
+    async def pexpire(self, key, milliseconds):
+        pass
+
+    async def close(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_redis_adapter_with_stand_in():
+    state = RedisState(StandInRedis())
+    await state.set("key", [1, 2])
+    assert await state.get("key") == [1, 2]
+    assert await state.incr("counter", 3) == 3
@@ -0,0 +1,152 @@
+import pytest
+
+from app.core.stories import story_at_revision, update_story
+from app.utils.errors import RevisionConflictError
+
+
+class Snapshot:
+    def __init__(self, data):
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class Ref:
+    def __init__(self, store, path):
+        self.store, self.path = store, path
+
+    def collection(self, name):
+        return Collection(self.store, f"{self.path}/{name}")
+
+    def get(self, transaction=None):
+        collection, doc_id = self.path.rsplit("/", 1)
+        return Snapshot(self.store.get(collection, {}).get(doc_id))
+
+
+class Collection:
+    def __init__(self, store, path):
+        self.store, self.path = store, path
+
+    def document(self, doc_id):
+        return Ref(self.store, f"{self.path}/{doc_id}")
+
+
+class Transaction:
+    def __init__(self):
+        self.writes = []
+
+    def set(self, ref, data):
+        self.writes.append((ref, data, False))
+
+    def update(self, ref, data):
+        self.writes.append((ref, data, True))
+
+
+class FakeDatabase:
+    """Documents by collection path; a transaction's writes apply if it
+    returns"""
+
+    def __init__(self):
+        self.store = {}
+        self.db = self
+
+    def collection(self, name):
+        return Collection(self.store, name)
+
+    async def run_transaction(self, fn):
+        transaction = Transaction()
+        result = fn(transaction)
+        for ref, data, merge in transaction.writes:
+            collection, doc_id = ref.path.rsplit("/", 1)
+            docs = self.store.setdefault(collection, {})
+            docs[doc_id] = {**docs.get(doc_id, {}), **data} if merge else data
+        return result
+
+    async def get_document(self, collection, doc_id):
+        doc = self.store.get(collection, {}).get(doc_id)
+        return dict(doc) if doc is not None else None
+
+    async def query_collection(self, collection, field, operator, value):
+        assert operator == ">="
+        docs = self.store.get(collection, {}).values()
+        return [dict(doc) for doc in docs if doc[field] >= value]
+
+
+STORY = {
+    "title": "The Lighthouse",
+    "content": "The keeper climbed the stairs every night at dusk.",
+    "revision": 0,
+}
+
+
+@pytest.fixture
+def db():
+    db = FakeDatabase()
+    db.store["stories"] = {"s1": dict(STORY)}
+    return db
+
+
+@pytest.mark.asyncio
+async def test_edits_store_reverse_diffs_and_walk_back(db):
+    first = await update_story(
+        db, "s1", {"content": "The keeper climbed the stairs every night at dawn."}
+    )
+    second = await update_story(
+        db,
+        "s1",
+        {"title": "The Last Lighthouse", "content": first["content"]},
+        expected_revision=1,
+    )
+
+    assert second["revision"] == 2
+    assert second["content"] == first["content"]
+    revisions = db.store["stories/s1/revisions"]
+    # Only a word-level diff of the content, and only the field that changed
+    assert revisions["0"]["diffs"]["content"] == [[16, 17, "dusk."]]
+    assert revisions["0"]["fields"] == {}
+    assert revisions["1"]["changed_fields"] == ["title"]
+    assert revisions["1"]["fields"] == {"title": "The Lighthouse"}
+
+    original = await story_at_revision(db, "s1", 0)
+    assert (original["title"], original["content"]) == (
+        STORY["title"],
+        STORY["content"],
+    )
+    middle = await story_at_revision(db, "s1", 1)
+    assert (middle["title"], middle["content"]) == (STORY["title"], first["content"])
+    assert (await story_at_revision(db, "s1", 2))["title"] == "The Last Lighthouse"
+
+
+@pytest.mark.asyncio
+async def test_stale_revision_is_rejected_without_writing(db):
+    await update_story(db, "s1", {"title": "Renamed"}, expected_revision=0)
+
+    with pytest.raises(RevisionConflictError) as conflict:
+        await update_story(db, "s1", {"title": "Mine"}, expected_revision=0)
+
+    assert conflict.value.status_code == 412
+    assert db.store["stories"]["s1"]["title"] == "Renamed"
+    assert list(db.store["stories/s1/revisions"]) == ["0"]
+
+
+@pytest.mark.asyncio
+async def test_unchanged_fields_are_not_a_new_revision(db):
+    story = await update_story(db, "s1", {"title": STORY["title"]})
+
+    assert story["revision"] == 0
+    assert "stories/s1/revisions" not in db.store
+
+
+@pytest.mark.asyncio
+async def test_missing_story_or_history(db):
+    assert await update_story(db, "missing", {"title": "x"}) is None
+    assert await story_at_revision(db, "missing", 0) is None
+
+    await update_story(db, "s1", {"title": "Renamed"})
+    assert await story_at_revision(db, "s1", 2) is None  # not written yet
+
+    # Edited before revisions were kept: no history to walk back through
+    del db.store["stories/s1/revisions"]
+    assert await story_at_revision(db, "s1", 0) is None
@@ -0,0 +1,103 @@
+import json
+from dataclasses import fields
+from datetime import datetime, timezone
+from typing import List
+
+import pytest
+
+from app.core.validators import serialize
+from app.models.transcript import TranscriptRecord
+from app.schemas.transcripts import TranscriptListItem, TranscriptResponse
+from app.utils.streaming import StreamFormat, stream_rows
+
+# A stored transcript, with the fields only storage needs
+STORED = {
+    "_id": "066de609",
+    "doc_id": "dQw4w9WgXcQ_music_transcript",
+    "video_id": "dQw4w9WgXcQ",
+    "title": "Never Gonna Give You Up",
+    "transcript": "We're no strangers to love...",
+    "category": "Music",
+    "sanitized_category": "music",
+    "collection_ref": "transcripts_music",
+    "metadata": {"views": 1},
+    "token_count": 8,
+    "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc),
+    "random_key": 0.5,
+    "minhash": "AAAA",
+}
+
+
+async def _rows(count, fail_after=None):
+    for i in range(count):
+        if fail_after is not None and i == fail_after:
+            raise RuntimeError("stream broke")
+        yield {"video_id": f"video{i}", "token_count": i}
+
+
+async def _body(response):
+    return b"".join([chunk async for chunk in response.body_iterator])
+
+
+@pytest.mark.asyncio
+async def test_ndjson_stream():
+    response = await stream_rows(_rows(3), StreamFormat.NDJSON)
+    lines = (await _body(response)).splitlines()
+
+    assert response.media_type == "application/x-ndjson"
+    assert [json.loads(line)["video_id"] for line in lines] == [
+        "video0",
+        "video1",
+        "video2",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_json_array_stream_is_valid_json():
+    response = await stream_rows(_rows(3), StreamFormat.JSON_ARRAY)
+    assert len(json.loads(await _body(response))) == 3
+
+    empty = await stream_rows(_rows(0), StreamFormat.JSON_ARRAY)
+    assert json.loads(await _body(empty)) == []
+
+
+@pytest.mark.asyncio
+async def test_failure_before_first_row_raises():
+    with pytest.raises(RuntimeError):
+        await stream_rows(_rows(3, fail_after=0), StreamFormat.NDJSON)
+
+
+@pytest.mark.asyncio
+async def test_failure_mid_stream_ends_with_error_line():
+    response = await stream_rows(_rows(3, fail_after=2), StreamFormat.NDJSON)
+    lines = (await _body(response)).splitlines()
+
+    assert len(lines) == 3
+    assert json.loads(lines[-1]) == {"error": "stream broke"}
+
+
+async def _stored(docs):
+    for doc in docs:
+        yield doc
+
+
+@pytest.mark.asyncio
+async def test_streamed_rows_have_the_fields_of_the_response():
+    response = await stream_rows(
+        _stored([STORED, STORED]), StreamFormat.NDJSON, TranscriptResponse
+    )
+    streamed = [json.loads(line) for line in (await _body(response)).splitlines()]
+    listed = json.loads(serialize(List[TranscriptResponse], [STORED]))
+
+    assert [set(row) for row in streamed] == [set(listed[0])] * 2
+    assert "minhash" not in streamed[0] and "collection_ref" not in streamed[0]
+
+
+@pytest.mark.asyncio
+async def test_streamed_listing_rows_have_the_record_fields():
+    response = await stream_rows(
+        _stored([STORED]), StreamFormat.JSON_ARRAY, TranscriptListItem
+    )
+    streamed = json.loads(await _body(response))
+
+    assert set(streamed[0]) == {field.name for field in fields(TranscriptRecord)}
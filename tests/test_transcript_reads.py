@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+from typing import List
+
+import orjson
+import pytest
+
+from app.core.validators import serialize
+from app.core.youtube import YouTubeService
+from app.models.transcript import TranscriptRecord
+from app.schemas.transcripts import TranscriptResponse
+
+CREATED_AT = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _doc(video_id: str) -> dict:
+    return {
+        "_id": f"id-{video_id}",
+        "video_id": video_id,
+        "title": f"title {video_id}",
+        "transcript": f"transcript {video_id}",
+        "category": "Science",
+        "sanitized_category": "science",
+        "metadata": {"views": 1},
+        "token_count": 3,
+        "created_at": CREATED_AT,
+        "random_key": 0.5,
+        "minhash": "AAAA",
+    }
+
+
+class FakeDatabase:
+    def __init__(self, docs):
+        self.docs = docs
+        self.calls = []
+
+    async def get_documents_from_collection(self, collection, limit=None):
+        self.calls.append((collection, limit))
+        return self.docs[:limit]
+
+    async def search(self, collection, field, value, limit=20):
+        self.calls.append((collection, value, limit))
+        return [doc for doc in self.docs if doc[field].startswith(value)][:limit]
+
+
+def _service(docs) -> YouTubeService:
+    service = YouTubeService.__new__(YouTubeService)
+    service.db = FakeDatabase(docs)
+    return service
+
+
+def test_record_from_doc():
+    record = TranscriptRecord.from_doc(_doc("video000001"))
+
+    assert record == TranscriptRecord(
+        video_id="video000001",
+        title="title video000001",
+        category="Science",
+        transcript="transcript video000001",
+        token_count=3,
+        created_at=CREATED_AT,
+    )
+    # Listings read without the transcript field
+    sparse = TranscriptRecord.from_doc({"video_id": "video000002"})
+    assert sparse.transcript is None and sparse.title == ""
+
+
+@pytest.mark.asyncio
+async def test_category_listing_returns_records():
+    service = _service([_doc("video000001"), _doc("video000002")])
+
+    records = await service.get_transcripts_by_category("Science", limit=1)
+
+    assert records == [TranscriptRecord.from_doc(_doc("video000001"))]
+    assert service.db.calls == [("transcripts_science", 1)]
+
+
+@pytest.mark.asyncio
+async def test_search_results_serialize_as_transcript_responses():
+    service = _service([_doc("video000001"), _doc("other000001")])
+
+    docs = await service.get_transcripts_by_search_query("transcript vid", "Science")
+    body = orjson.loads(serialize(List[TranscriptResponse], docs))
+
+    assert [item["video_id"] for item in body] == ["video000001"]
+    assert body[0]["_id"] == "id-video000001"
+    assert body[0]["created_at"] == "2024-01-01T00:00:00Z"
+    assert "random_key" not in body[0] and "minhash" not in body[0]
@@ -0,0 +1,66 @@
+from typing import List
+
+import orjson
+import pytest
+
+from app.core.state import MemoryState
+from app.core.validators import ValidatorCache, etag_matches, make_etag, serialize
+from app.models.transcript import Transcript
+from app.schemas.transcripts import TranscriptResponse
+
+
+def test_etag_matching():
+    etag = make_etag(b'{"title":"story"}')
+
+    assert etag == make_etag(b'{"title":"story"}')
+    assert etag != make_etag(b'{"title":"other story"}')
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", {etag.removeprefix("W/")}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
+
+
+@pytest.mark.asyncio
+async def test_revalidation_skips_load_until_invalidated():
+    cache = ValidatorCache(MemoryState(), ttl=60)
+    rows = [{"name": "science"}]
+
+    assert await cache.not_modified("categories", None) is None
+    response = await cache.respond("categories", List[dict], rows)
+    etag = response.headers["ETag"]
+    assert response.status_code == 200
+
+    not_modified = await cache.not_modified("categories", etag)
+    assert not_modified.status_code == 304
+    assert await cache.not_modified("categories", etag, variant="stats") is None
+
+    await cache.invalidate("categories")
+    assert await cache.not_modified("categories", etag) is None
+    # Loaded again, but the body is unchanged so the client still gets a 304
+    response = await cache.respond("categories", List[dict], rows, etag)
+    assert response.status_code == 304
+
+    stats = await cache.stats()
+    assert stats["not_modified"] == 2
+    assert stats["reads_saved"] == 1
+    assert stats["validator_misses"] == 2
+    assert stats["bytes_saved"] == 2 * len(orjson.dumps(rows))
+
+
+def test_transcript_responses_leave_out_storage_fields():
+    legacy = {
+        "_id": "066de609",
+        "video_id": "dQw4w9WgXcQ",
+        "title": "Never Gonna Give You Up",
+        "transcript": "We're no strangers to love...",
+        "category": "Music",
+        "sanitized_category": "music",
+        "minhash": "AAAA",
+    }
+    transcript = Transcript(**legacy)
+
+    assert transcript.random_key is None  # not made up on every read
+    body = serialize(List[TranscriptResponse], [transcript])
+    assert body == serialize(List[TranscriptResponse], [Transcript(**legacy)])
+    assert set(orjson.loads(body)[0]).isdisjoint({"random_key", "minhash"})
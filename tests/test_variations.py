@@ -0,0 +1,137 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.chatgpt import ChatGPTClient
+from app.core.config import get_settings
+from app.core.scheduler import RateLimitScheduler
+from app.core.variations import (
+    join_paragraphs,
+    regenerate_paragraphs,
+    regenerate_variations,
+    split_paragraphs,
+)
+
+
+class FakeChatGPT:
+    def __init__(self):
+        self.calls = []
+
+    async def regenerate_variations(
+        self, synopsis, kept_openings, style, length, count=1
+    ):
+        self.calls.append((kept_openings, count))
+        return [f"new {n}" for n in range(count)]
+
+    async def rewrite_paragraphs(self, synopsis, before, paragraphs, after, style):
+        self.calls.append((before, paragraphs, after))
+        return "rewritten one\n\nrewritten two"
+
+
+@pytest.mark.asyncio
+async def test_only_selected_variations_are_regenerated():
+    chatgpt = FakeChatGPT()
+    old = ["first " + "word " * 200, "second", "third"]
+
+    variations = await regenerate_variations(
+        chatgpt, "synopsis", old, [2, 0, 2], "casual", 300
+    )
+
+    assert variations == ["new 0", "second", "new 1"]
+    # One completion for both, with only the kept variation as context
+    assert chatgpt.calls == [(["second"], 2)]
+
+
+class FakeCompletions:
+    """The SDK's chat.completions, numbering every choice it returns"""
+
+    def __init__(self):
+        self.requests = []
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        choices = [
+            SimpleNamespace(
+                message=SimpleNamespace(content=f"story {len(self.requests)}.{n}")
+            )
+            for n in range(kwargs.get("n", 1))
+        ]
+        return SimpleNamespace(
+            choices=choices, usage=SimpleNamespace(total_tokens=100)
+        )
+
+
+class StubbedClient(ChatGPTClient):
+    def __init__(self):
+        self.settings = get_settings()
+        self.completions = FakeCompletions()
+        self.client = SimpleNamespace(
+            chat=SimpleNamespace(completions=self.completions)
+        )
+        self.default_model = "gpt-3.5-turbo"
+        self.scheduler = RateLimitScheduler(10000, 10000000)
+
+
+@pytest.mark.asyncio
+async def test_regenerated_variations_are_distinct_through_the_client():
+    client = StubbedClient()
+
+    variations = await regenerate_variations(
+        client, "synopsis", ["a", "b", "c"], [0, 1], "casual", 300
+    )
+
+    assert variations[2] == "c"
+    assert variations[0] != variations[1]
+    assert [request["n"] for request in client.completions.requests] == [2]
+
+
+@pytest.mark.asyncio
+async def test_paragraph_range_is_spliced_with_compact_context():
+    chatgpt = FakeChatGPT()
+    paragraphs = ["long " * 500, "before", "target", "after", "end " * 500]
+
+    story = await regenerate_paragraphs(
+        chatgpt, "synopsis", join_paragraphs(paragraphs), 2, 3, "casual"
+    )
+
+    assert split_paragraphs(story) == [
+        paragraphs[0].strip(),
+        "before",
+        "rewritten one",
+        "rewritten two",
+        "after",
+        paragraphs[4].strip(),
+    ]
+    before, sent, after = chatgpt.calls[0]
+    assert sent == ["target"]
+    assert before.endswith("before") and len(before) < 1000
+    assert after.startswith("after") and len(after) < 1000
+
+
+@pytest.mark.asyncio
+async def test_paragraph_range_outside_the_variation():
+    with pytest.raises(ValueError):
+        await regenerate_paragraphs(FakeChatGPT(), "s", "one\n\ntwo", 1, 3, "casual")
+
+
+class ChoicesClient(ChatGPTClient):
+    """Answers with one choice per requested variation"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def generate_response(self, messages, **kwargs):
+        self.calls.append(kwargs)
+        choices = [f" story {n} " for n in range(kwargs["n"])]
+        return {"content": choices[0], "choices": choices, "total_tokens": 1}
+
+
+@pytest.mark.asyncio
+async def test_variations_come_from_one_multi_choice_request():
+    client = ChoicesClient()
+
+    variations = await client.generate_story_variations("material", 3, length=400)
+
+    assert variations == ["story 0", "story 1", "story 2"]
+    # Each story gets the whole budget for its length, not a share of it
+    assert client.calls == [{"temperature": 0.9, "max_tokens": 800, "n": 3}]
@@ -0,0 +1,84 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.youtube import YouTubeService
+from app.utils.errors import DeadlineExceededError
+
+
+class FakeChatGPT:
+    def __init__(self):
+        self.existing = []
+
+    async def generate_categories(self, texts, existing_categories=[]):
+        self.existing.append(existing_categories)
+        return ["Science" for _ in texts]
+
+
+class FakeService(YouTubeService):
+    """Batch processing over fake transcript, metadata and storage calls"""
+
+    def __init__(self, categories_error=None):
+        self.settings = SimpleNamespace(duplicate_policy="off")
+        self.ChatGPTClient = FakeChatGPT()
+        self.categories_error = categories_error
+        self.fetches = []
+        self.saves = []
+
+    async def get_video_transcript(self, video_id, languages=["en"]):
+        self.fetches.append(video_id)
+        await asyncio.sleep(0.01)
+        return f"transcript of {video_id} " * 20
+
+    async def get_existing_categories(self):
+        if self.categories_error is not None:
+            raise self.categories_error
+        return ["science"]
+
+    async def get_video_info(self, video_id):
+        return {"title": video_id}
+
+    async def save_transcript(self, **kwargs):
+        self.saves.append((kwargs["video_id"], kwargs["category"]))
+        await asyncio.sleep(0.01)
+
+
+def _url(video_id: str) -> str:
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+@pytest.mark.asyncio
+async def test_overlapping_batches_fetch_and_store_a_video_once():
+    service = FakeService()
+    shared = "sharedvid01"
+
+    first, second = await asyncio.gather(
+        service.process_youtube_videos(
+            [(_url(shared), "News"), (_url("firstvid001"), "News")], False
+        ),
+        service.process_youtube_videos([(_url(shared), "News")], False),
+    )
+
+    assert first[0]["status"] == second[0]["status"] == "success"
+    assert service.fetches.count(shared) == 1
+    assert service.saves.count((shared, "News")) == 1
+
+
+@pytest.mark.asyncio
+async def test_failing_category_lookup_fails_the_videos_needing_one():
+    service = FakeService(
+        categories_error=DeadlineExceededError(
+            status_code=504, error_code="deadline_exceeded", message="late"
+        )
+    )
+
+    results = await service.process_youtube_videos(
+        [(_url("autovideo01"), None), (_url("givenvideo1"), "News")], True
+    )
+
+    # Not categorized against an empty list of existing categories
+    assert service.ChatGPTClient.existing == []
+    assert isinstance(results[0], Exception)
+    assert results[1]["category"] == "News"
+    assert service.saves == [("givenvideo1", "News")]